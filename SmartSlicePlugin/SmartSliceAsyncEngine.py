@@ -0,0 +1,181 @@
+#   SmartSliceAsyncEngine.py
+#   Teton Simulation
+
+#
+#  Contains an asyncio based engine, which sends cloud jobs to the Smart Slice API
+#  and waits for their results, without blocking a worker thread per job
+#
+
+import time
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from UM.Logger import Logger
+
+'''
+  class SmartSliceAsyncEngine
+
+    Runs an asyncio event loop on a dedicated thread. Any number of jobs can be
+    submitted, polled and fetched at the same time. The outcome is reported through
+    Qt signals, which are delivered on the thread of the connected receivers:
+      * jobStatusChanged(job, status)
+      * jobFinished(job, task) - task is None if the job was canceled
+      * jobFailed(job, error)
+
+    The pywim client is blocking, so each request runs on a small thread pool.
+    Canceling a job cancels its coroutine right away, also while it waits for a
+    request. The client of a canceled job is dropped from the client pool, since
+    the abandoned request may still be using it.
+'''
+class SmartSliceAsyncEngine(QObject):
+    jobStatusChanged = pyqtSignal(object, object)
+    jobFinished = pyqtSignal(object, object)
+    jobFailed = pyqtSignal(object, object)
+
+    def __init__(self, client_pool, polling_factory, upload_callback = None, submit_callback = None,
+                 result_callback = None, finished_callback = None, max_workers : int = 8, parent = None):
+        super().__init__(parent)
+
+        self._client_pool = client_pool
+        self._polling_factory = polling_factory # Returns a new PollingBackoff
+        self._upload_callback = upload_callback # Called with the size and duration of each submit.post, not with submit_callback
+        self._submit_callback = submit_callback # Called with the client, the package and the job instead of submit.post
+        self._result_callback = result_callback # Called with the finished task and the job, result.get is skipped unless it returns None
+        self._finished_callback = finished_callback # Called with the finished task and the job before jobFinished, e.g. to prepare the result off the main thread
+        self._max_workers = max_workers
+
+        self._loop = None
+        self._thread = None
+        self._tasks = {} # job -> asyncio.Task, only touched on the loop thread
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(ThreadPoolExecutor(self._max_workers))
+
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.call_soon(ready.set)
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="SmartSliceAsyncEngine", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+        Logger.log("d", "SmartSlice async engine started")
+
+    def stop(self):
+        if not self.running:
+            return
+
+        def shutdown():
+            for task in self._tasks.values():
+                task.cancel()
+            self._loop.stop()
+
+        self._loop.call_soon_threadsafe(shutdown)
+        self._thread.join()
+        self._loop.close()
+        self._thread = None
+
+        Logger.log("d", "SmartSlice async engine stopped")
+
+    '''
+      submit(job, threemf_data)
+        Sends the package 'threemf_data' of 'job' and waits for its result on the event loop
+    '''
+    def submit(self, job, threemf_data : bytes):
+        self.start()
+        self._loop.call_soon_threadsafe(self._schedule, job, threemf_data)
+
+    '''
+      cancel(job)
+        Cancels 'job' immediately, also if a request of it is in flight
+    '''
+    def cancel(self, job):
+        if self.running:
+            self._loop.call_soon_threadsafe(self._cancel, job)
+
+    def _schedule(self, job, threemf_data):
+        task = self._loop.create_task(self._process(job, threemf_data))
+        task.add_done_callback(functools.partial(self._onTaskDone, job))
+        self._tasks[job] = task
+
+    def _cancel(self, job):
+        task = self._tasks.get(job)
+        if task is not None:
+            task.cancel()
+
+    def _onTaskDone(self, job, task):
+        self._tasks.pop(job, None)
+
+        if task.cancelled():
+            Logger.log("d", "SmartSlice async job canceled")
+            self.jobFinished.emit(job, None)
+        elif task.exception() is not None:
+            self.jobFailed.emit(job, task.exception())
+        else:
+            self.jobFinished.emit(job, task.result())
+
+    def _request(self, client, endpoint, method, *args, **kwargs):
+        return self._loop.run_in_executor(None, functools.partial(self._client_pool.request,
+                                                                  client, endpoint, method, *args, **kwargs))
+
+    async def _process(self, job, threemf_data):
+        import pywim
+
+        client = self._client_pool.acquire()
+
+        try:
+            start_time = time.perf_counter()
+            if self._submit_callback:
+                # Only the submit callback knows what it actually uploaded
+                task = await self._request(client, "submit", self._submit_callback, client, threemf_data, job)
+            else:
+                task = await self._request(client, "submit", client.submit.post, threemf_data)
+                if task is not None and self._upload_callback:
+                    self._upload_callback(len(threemf_data), time.perf_counter() - start_time)
+            if task is None:
+                raise asyncio.CancelledError()
+
+            polling = self._polling_factory()
+            while task.status not in (pywim.http.thor.TaskStatus.failed,
+                                      pywim.http.thor.TaskStatus.finished
+                                      ):
+                self.jobStatusChanged.emit(job, task.status)
+
+                await asyncio.sleep(polling.next(task))
+                task = await self._request(client, "status", client.status.get, id=task.id)
+
+            if task.status == pywim.http.thor.TaskStatus.finished:
+                # Get the task again, but this time with the results included
+                analysis = None
+                if self._result_callback:
+                    analysis = await self._request(client, "result", self._result_callback, task, job)
+                if analysis is None:
+                    task = await self._request(client, "result", client.result.get, id=task.id)
+
+                if self._finished_callback:
+                    await self._loop.run_in_executor(None, functools.partial(self._finished_callback, task, job))
+        except asyncio.CancelledError:
+            self._client_pool.discard(client)
+            raise
+        except Exception:
+            self._client_pool.release(client)
+            raise
+
+        self._client_pool.release(client)
+
+        return task
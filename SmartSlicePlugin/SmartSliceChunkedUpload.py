@@ -0,0 +1,267 @@
+#   SmartSliceChunkedUpload.py
+#   Teton Simulation
+
+#
+#  Contains a chunked and resumable upload of job packages and the delta upload,
+#  which sends the mesh only once
+#
+
+import json
+import mmap
+import time
+import http.client
+
+from UM.Logger import Logger
+
+'''
+  class SmartSliceChunkedUpload
+
+    Uploads a package in chunks, so a dropped connection only costs the chunk in
+    flight. The protocol follows the resumable upload scheme of tus.io:
+      * POST  /uploads              'Upload-Length' header -> 201, {"id": upload id}
+      * HEAD  /uploads/<id>         -> 200, 'Upload-Offset' header
+      * PATCH /uploads/<id>         'Upload-Offset' header, chunk as body -> 204, 'Upload-Offset' header
+      * POST  /uploads/<id>/submit  -> 200, {"id": task id}
+
+    After a failed request the upload asks the server for its offset and continues
+    from there, up to 'max_retries' times in a row.
+
+    The package may be given as bytes, a memory mapped file or any iterable of
+    chunks. For an iterable 'length' is required and the data is only held back
+    until the server acknowledged it.
+'''
+class SmartSliceChunkedUpload():
+    class UploadException(Exception):
+        pass
+
+    class NotFound(UploadException):
+        pass
+
+    # Errors of the server, which are worth another try
+    class ServerError(http.client.HTTPException):
+        pass
+
+    class Canceled(Exception):
+        pass
+
+    def __init__(self, protocol : str, hostname : str, port : int, chunk_size : int = 4 * 1024 * 1024,
+                 max_retries : int = 5, progress = None, canceled = None, timeout : float = 60.):
+        self.protocol = protocol
+        self.hostname = hostname
+        self.port = port
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        self._progress = progress # Called with the uploaded fraction
+        self._canceled = canceled # threading.Event, which aborts the upload if set
+        self._connection = None
+
+    '''
+      upload(source, length)
+        Uploads 'source' and submits it. Returns the id of the created task.
+    '''
+    def upload(self, source, length : int = None) -> str:
+        source = _ChunkSource(source, length)
+
+        try:
+            upload_id = self._retry(self._create, source.length)
+            Logger.log("d", "Started chunked upload {} ({} bytes)".format(upload_id, source.length))
+
+            offset = 0
+            failures = 0
+            while offset < source.length:
+                if self._canceled is not None and self._canceled.is_set():
+                    raise SmartSliceChunkedUpload.Canceled()
+
+                try:
+                    offset = self._patch(upload_id, offset, source.read(offset, self.chunk_size))
+                    failures = 0
+                except (OSError, http.client.HTTPException) as exc:
+                    failures += 1
+                    if failures > self.max_retries:
+                        raise SmartSliceChunkedUpload.UploadException("Upload failed: {}".format(exc))
+                    Logger.log("w", "Upload interrupted at {} bytes, resuming: {}".format(offset, exc))
+                    self._reconnect(failures)
+                    offset = self._retry(self._head, upload_id)
+
+                if self._progress:
+                    self._progress(offset / source.length if source.length else 1.)
+
+            return self._retry(self._submit, upload_id)
+        finally:
+            self._close()
+
+    def _retry(self, request, *args):
+        failures = 0
+        while True:
+            try:
+                return request(*args)
+            except (OSError, http.client.HTTPException) as exc:
+                failures += 1
+                if failures > self.max_retries:
+                    raise SmartSliceChunkedUpload.UploadException("Upload failed: {}".format(exc))
+                Logger.log("w", "Upload request failed, retrying: {}".format(exc))
+                self._reconnect(failures)
+
+    def _request(self, method, path, body = None, headers = None):
+        if self._connection is None:
+            if self.protocol == "https":
+                self._connection = http.client.HTTPSConnection(self.hostname, self.port, timeout=self.timeout)
+            else:
+                self._connection = http.client.HTTPConnection(self.hostname, self.port, timeout=self.timeout)
+
+        try:
+            self._connection.request(method, path, body=body, headers=headers or {})
+            response = self._connection.getresponse()
+            data = response.read()
+        except Exception:
+            self._close()
+            raise
+
+        # Unknown resources and endpoints the server doesn't implement
+        if response.status in (404, 405, 501):
+            raise SmartSliceChunkedUpload.NotFound("{} {} returned {}".format(method, path, response.status))
+        if response.status >= 500:
+            raise SmartSliceChunkedUpload.ServerError("{} {} returned {}".format(method, path, response.status))
+        if response.status >= 400:
+            raise SmartSliceChunkedUpload.UploadException("{} {} returned {}".format(method, path, response.status))
+
+        return response, data
+
+    def _create(self, length):
+        _, data = self._request("POST", "/uploads", headers={"Upload-Length": str(length)})
+        return json.loads(data.decode())["id"]
+
+    def _head(self, upload_id):
+        response, _ = self._request("HEAD", "/uploads/{}".format(upload_id))
+        return int(response.getheader("Upload-Offset"))
+
+    def _patch(self, upload_id, offset, chunk):
+        response, _ = self._request("PATCH", "/uploads/{}".format(upload_id),
+                                    body=chunk,
+                                    headers={"Upload-Offset": str(offset),
+                                             "Content-Type": "application/offset+octet-stream"}
+                                    )
+        return int(response.getheader("Upload-Offset"))
+
+    def _submit(self, upload_id):
+        _, data = self._request("POST", "/uploads/{}/submit".format(upload_id))
+        return json.loads(data.decode())["id"]
+
+    def _reconnect(self, failures):
+        self._close()
+        if self._canceled is not None:
+            if self._canceled.wait(min(0.5 * 2 ** (failures - 1), 10.)):
+                raise SmartSliceChunkedUpload.Canceled()
+        else:
+            time.sleep(min(0.5 * 2 ** (failures - 1), 10.))
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+'''
+  class SmartSliceDeltaUpload
+
+    Uploads the package once per mesh and afterwards only the job definition:
+      * POST /submit-delta  'Mesh-Digest' header, job.json as body -> 200, {"id": task id}
+                            or 404 if the server doesn't know the mesh
+      * PUT  /blobs/<digest>  package as body -> 201
+
+    If the server doesn't know the mesh, the package is stored as blob and the job
+    submitted again, which sets 'blob_uploaded'. submit() returns None if the server
+    doesn't support delta uploads at all or rejects them, so the caller can fall back
+    to a full upload. Rejected requests aren't retried, the fallback starts right away.
+'''
+class SmartSliceDeltaUpload(SmartSliceChunkedUpload):
+    '''
+      submit(mesh_digest, job_json, threemf_data)
+        Returns the id of the created task or None
+    '''
+    def submit(self, mesh_digest : str, job_json : bytes, threemf_data) -> str:
+        self.blob_uploaded = False
+        try:
+            task_id = self._retry(self._submitDelta, mesh_digest, job_json)
+            if task_id is not None:
+                Logger.log("d", "Submitted job for known mesh {} ({} bytes)".format(mesh_digest, len(job_json)))
+                return task_id
+
+            Logger.log("d", "Server doesn't know mesh {}, uploading it".format(mesh_digest))
+            if not self._retry(self._putBlob, mesh_digest, threemf_data):
+                return None
+            self.blob_uploaded = True
+
+            return self._retry(self._submitDelta, mesh_digest, job_json)
+        except SmartSliceChunkedUpload.UploadException as exc:
+            Logger.log("w", "Delta upload not possible: {}".format(exc))
+            return None
+        finally:
+            self._close()
+
+    def _submitDelta(self, mesh_digest, job_json):
+        try:
+            _, data = self._request("POST", "/submit-delta", body=job_json,
+                                    headers={"Mesh-Digest": mesh_digest,
+                                             "Content-Type": "application/json"}
+                                    )
+        except SmartSliceChunkedUpload.NotFound:
+            return None
+        return json.loads(data.decode())["id"]
+
+    def _putBlob(self, mesh_digest, threemf_data):
+        try:
+            self._request("PUT", "/blobs/{}".format(mesh_digest), body=memoryview(threemf_data),
+                          headers={"Content-Type": "application/vnd.ms-package.3dmanufacturing-3dmodel+xml"}
+                          )
+        except SmartSliceChunkedUpload.NotFound:
+            return False
+        return True
+
+    def _request(self, method, path, body = None, headers = None):
+        try:
+            return super()._request(method, path, body, headers)
+        except SmartSliceChunkedUpload.ServerError as exc:
+            raise SmartSliceChunkedUpload.UploadException(str(exc))
+
+'''
+  class _ChunkSource
+
+    Random access to the acknowledged end of the upload data. Bytes-like objects
+    and memory mapped files are sliced without copying. Iterables are buffered
+    from the lowest offset that may still be requested again.
+'''
+class _ChunkSource():
+    def __init__(self, source, length : int = None):
+        if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+            self._view = memoryview(source)
+            self.length = len(self._view)
+            self._chunks = None
+        else:
+            if length is None:
+                raise ValueError("The length of iterable upload sources must be given")
+            self._view = None
+            self.length = length
+            self._chunks = iter(source)
+            self._buffer = bytearray()
+            self._buffer_start = 0
+
+    def read(self, offset : int, size : int):
+        if self._view is not None:
+            return self._view[offset:offset + size]
+
+        if offset < self._buffer_start:
+            raise SmartSliceChunkedUpload.UploadException("Can't resume at {}, data was already released".format(offset))
+
+        # Everything before 'offset' is acknowledged by the server
+        del self._buffer[:offset - self._buffer_start]
+        self._buffer_start = offset
+
+        while len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+
+        return bytes(self._buffer[:size])
@@ -0,0 +1,169 @@
+#   SmartSliceClientPool.py
+#   Teton Simulation
+
+#
+#  Contains a pool of HTTP clients to the Smart Slice API, which are shared by
+#  all cloud jobs, and the latency metrics of their requests
+#
+
+import time
+import threading
+from contextlib import contextmanager
+
+from UM.Logger import Logger
+
+'''
+  class SmartSliceRequestMetrics
+
+    Collects the latency of the requests per endpoint. Requests on a client that
+    was just created are counted separately ("cold"), since they include the
+    connection setup and TLS handshake.
+'''
+class SmartSliceRequestMetrics():
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {} # (endpoint, cold) -> [count, total, min, max]
+
+    def record(self, endpoint : str, duration : float, cold : bool = False):
+        with self._lock:
+            entry = self._endpoints.setdefault((endpoint, cold), [0, 0., duration, duration])
+            entry[0] += 1
+            entry[1] += duration
+            entry[2] = min(entry[2], duration)
+            entry[3] = max(entry[3], duration)
+
+    def average(self, endpoint : str, cold : bool = False):
+        with self._lock:
+            entry = self._endpoints.get((endpoint, cold))
+        return entry[1] / entry[0] if entry else None
+
+    def summary(self) -> str:
+        with self._lock:
+            return ", ".join(
+                "{}{}: {} x {:.3f} s (min {:.3f} s, max {:.3f} s)".format(endpoint, " (cold)" if cold else "",
+                                                                         count, total / count, min_duration, max_duration)
+                for (endpoint, cold), (count, total, min_duration, max_duration) in sorted(self._endpoints.items())
+            )
+
+    def clear(self):
+        with self._lock:
+            self._endpoints.clear()
+
+'''
+  class SmartSliceClientPool
+
+    Keeps idle pywim.http.thor.Client2020POC instances around, so their
+    keep-alive connections can be reused by the next job. All clients are
+    dropped when the connection settings change.
+'''
+class SmartSliceClientPool():
+    def __init__(self, max_idle : int = 4):
+        self.max_idle = max_idle
+        self.metrics = SmartSliceRequestMetrics()
+
+        self._lock = threading.Lock()
+        self._settings = None # (protocol, hostname, port)
+        self._generation = 0 # increased whenever the settings change
+        self._idle = []
+        self._generations = {} # id of client -> generation it was built for
+        self._fresh = set() # ids of clients which didn't send a request yet
+
+    @property
+    def settings(self):
+        return self._settings
+
+    '''
+      configure(protocol, hostname, port)
+        Sets the connection settings. Existing clients are dropped only if they changed.
+    '''
+    def configure(self, protocol : str, hostname : str, port : int):
+        settings = (protocol, hostname, int(port))
+
+        with self._lock:
+            if settings == self._settings:
+                return
+            self._settings = settings
+            self._generation += 1
+            for client in self._idle:
+                self._generations.pop(id(client), None)
+                self._fresh.discard(id(client))
+            self._idle = []
+
+        Logger.log("d", "SmartSlice HTTP clients reset to {}://{}:{}".format(*settings))
+
+    '''
+      acquire()
+        Returns an idle client or a new one, if there's none
+    '''
+    def acquire(self):
+        with self._lock:
+            settings = self._settings
+            generation = self._generation
+            if self._idle:
+                return self._idle.pop()
+
+        client = self._createClient(*settings)
+
+        with self._lock:
+            self._generations[id(client)] = generation
+            self._fresh.add(id(client))
+
+        Logger.log("d", "SmartSlice HTTP Client: {}".format(client.address))
+
+        return client
+
+    # #  Returns a new client to the API at 'hostname'
+    def _createClient(self, protocol : str, hostname : str, port : int):
+        import pywim
+
+        return pywim.http.thor.Client2020POC(
+            protocol=protocol,
+            hostname=hostname,
+            port=port
+        )
+
+    '''
+      release(client)
+        Hands 'client' back to the pool. Clients built with outdated settings are dropped.
+    '''
+    def release(self, client):
+        with self._lock:
+            if self._generations.get(id(client)) == self._generation and len(self._idle) < self.max_idle:
+                self._idle.append(client)
+            else:
+                self._generations.pop(id(client), None)
+                self._fresh.discard(id(client))
+
+    '''
+      discard(client)
+        Forgets 'client' without reusing it, e.g. if a request of it was abandoned
+    '''
+    def discard(self, client):
+        with self._lock:
+            self._generations.pop(id(client), None)
+            self._fresh.discard(id(client))
+
+    @contextmanager
+    def client(self):
+        client = self.acquire()
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    '''
+      request(client, endpoint, method, *args, **kwargs)
+        Calls 'method' of 'client' and records its latency under 'endpoint'
+    '''
+    def request(self, client, endpoint : str, method, *args, **kwargs):
+        with self._lock:
+            cold = id(client) in self._fresh
+            self._fresh.discard(id(client))
+
+        start_time = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            duration = time.perf_counter() - start_time
+            self.metrics.record(endpoint, duration, cold)
+            Logger.log("d", "SmartSlice HTTP {}{}: {:.3f} s".format(endpoint, " (cold)" if cold else "", duration))
@@ -5,6 +5,10 @@ Created on 22.10.2019
 '''
 
 import copy
+import functools
+import hashlib
+import io
+import mmap
 from string import Formatter
 import time
 import os
@@ -13,7 +17,10 @@ import tempfile
 import json
 import zipfile
 import re
+import sys
 import math
+import random
+import threading
 import typing
 from pathlib import Path
 
@@ -25,6 +32,7 @@ from PyQt5.QtWidgets import QMessageBox
 from PyQt5.QtCore import pyqtSignal
 from PyQt5.QtCore import pyqtSlot
 from PyQt5.QtCore import QTime
+from PyQt5.QtCore import QTimer
 from PyQt5.QtNetwork import QNetworkReply
 from PyQt5.QtNetwork import QNetworkRequest
 from PyQt5.QtNetwork import QNetworkAccessManager
@@ -47,7 +55,7 @@ from UM.PluginRegistry import PluginRegistry
 from UM.Scene.SceneNode import SceneNode
 from UM.Scene.Iterator.DepthFirstIterator import DepthFirstIterator
 from UM.Settings.SettingInstance import SettingInstance, InstanceState
-from UM.Signal import Signal
+from UM.Signal import Signal, postponeSignals, CompressTechnique
 
 from UM.Platform import Platform
 
@@ -67,6 +75,16 @@ from .SmartSliceCloudProxy import SmartSliceCloudStatus
 from .SmartSliceCloudProxy import SmartSliceCloudProxy
 from .SmartSliceProperty import SmartSliceProperty
 from .SmartSlicePropertyHandler import SmartSlicePropertyHandler
+from .SmartSliceJobCache import SmartSliceJobCache
+from .SmartSliceResultStore import SmartSliceResultStore
+from .SmartSliceClientPool import SmartSliceClientPool
+from .SmartSliceAsyncEngine import SmartSliceAsyncEngine
+from .SmartSliceJobScheduler import SmartSliceJobScheduler
+from .SmartSliceChunkedUpload import SmartSliceChunkedUpload, SmartSliceDeltaUpload
+from .SmartSliceSettingsSnapshot import SmartSliceSettingsSnapshot
+from .SmartSliceMaterialRegistry import SmartSliceMaterialRegistry
+from .SmartSliceResultArchive import SmartSliceResultDownload
+from .utils import meshDataHash, modifierMeshArrays, parseListSetting
 
 i18n_catalog = i18nCatalog("smartslice")
 
@@ -112,6 +130,45 @@ class GcodeStartEndFormatter(Formatter):
 
         return value
 
+# #  Start/end g-code, parsed once into its literal and token segments
+#
+#   Renders the same as GcodeStartEndFormatter.format(), with the tokens resolved
+#   by GcodeStartEndFormatter.get_value, but without parsing the g-code again.
+class GcodeTemplate():
+
+    def __init__(self, segments) -> None:
+        self._segments = segments # (literal text, field name, format spec, conversion)
+
+    # #  Returns the template of 'text', which is only parsed on the first call
+    #   Raises ValueError if 'text' can't be formatted, like str.format would.
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def compile(text: str) -> "GcodeTemplate":
+        segments = tuple(Formatter().parse(text))
+        for _, field_name, _, _ in segments:
+            # Automatic field numbering refers to positional arguments, which are never given
+            if field_name == "":
+                raise ValueError("Positional placeholder '{}' in start/end g-code")
+        return GcodeTemplate(segments)
+
+    def render(self, default_extruder_nr: int, settings: dict) -> str:
+        fmt = GcodeStartEndFormatter(default_extruder_nr=default_extruder_nr)
+
+        result = []
+        for literal, field_name, format_spec, conversion in self._segments:
+            result.append(literal)
+            if field_name is None:
+                continue
+
+            if format_spec and "{" in format_spec:
+                format_spec = GcodeTemplate.compile(format_spec).render(default_extruder_nr, settings)
+
+            value, _ = fmt.get_field(field_name, (), settings)
+            value = fmt.convert_field(value, conversion)
+            result.append(fmt.format_field(value, format_spec))
+
+        return "".join(result)
+
 
 # # Draft of an connection check
 class ConnectivityChecker(QObject):
@@ -137,6 +194,40 @@ class ConnectivityChecker(QObject):
         print(code)
 
 
+# #  Delays between the status requests of a running cloud job
+#    Starts fast, since small jobs finish within seconds, and backs off exponentially
+#    with jitter up to a cap, so long running jobs don't flood the API with requests.
+class PollingBackoff:
+    def __init__(self, initial : float = 0.5, factor : float = 1.5, cap : float = 15.0, jitter : float = 0.2):
+        self.initial = initial
+        self.factor = factor
+        self.cap = cap
+        self.jitter = jitter
+
+        self._delay = initial
+
+    def reset(self):
+        self._delay = self.initial
+
+    # #  Returns the delay in seconds before the next status request
+    #   \param task Last task status. A 'retry_after' or 'eta' (in seconds) given
+    #               by the server takes precedence over our own backoff.
+    def next(self, task = None) -> float:
+        retry_after = getattr(task, "retry_after", None)
+        eta = getattr(task, "eta", None)
+
+        if retry_after:
+            return float(retry_after)
+
+        delay = self._delay
+        self._delay = min(self._delay * self.factor, self.cap)
+
+        if eta:
+            # Don't poll much before the expected end, but also not much after it
+            delay = min(max(delay, float(eta)), self.cap)
+
+        return delay * random.uniform(1. - self.jitter, 1. + self.jitter)
+
 class SmartSliceCloudJob(Job):
     # This job is responsible for uploading the backup file to cloud storage.
     # As it can take longer than some other tasks, we schedule this using a Cura Job.
@@ -152,33 +243,46 @@ class SmartSliceCloudJob(Job):
         self.job_type = None
         self._id = 0
 
-        self.canceled = False
+        self._canceled = threading.Event()
 
         self._job_status = None
-        self._wait_time = 1.0
+        self._polling = PollingBackoff()
 
         self.shouldRaiseWarning = True
+        self._client = None # Taken from the connector's client pool while the job talks to the API
+
+        self.engine = None # SmartSliceAsyncEngine, if the job shall be sent by it
+        self.deferred = False # True if the job is still processed by the engine after run() returned
+        self._previous_connector_status = None
+        self._digest = None
+        self.mesh_digest = None
+        self.job_json = None # job.json of the package, sent on its own by delta uploads
+        self.downloaded_analysis = None # analysis from a binary result archive
+        self._analysis = None # analysis prepared by prepareCloudResult
+        self._modifier_mesh_nodes = [] # scene nodes built by prepareResult, not in the scene yet
 
         self.ui_status_per_job_type = {pywim.smartslice.job.JobType.validation : SmartSliceCloudStatus.BusyValidating,
                                        pywim.smartslice.job.JobType.optimization : SmartSliceCloudStatus.BusyOptimizing,
                                        }
 
-        # get connection settings from preferences
-        preferences = Application.getInstance().getPreferences()
-
-        protocol = preferences.getValue(self.connector.http_protocol_preference)
-        hostname = preferences.getValue(self.connector.http_hostname_preference)
-        port = preferences.getValue(self.connector.http_port_preference)
-        if type(port) is not int:
-            port = int(port)
-
-        self._client = pywim.http.thor.Client2020POC(
-            protocol=protocol,
-            hostname=hostname,
-            port=port
-        )
+    # Set as soon as the job is canceled
+    @property
+    def cancel_event(self) -> threading.Event:
+        return self._canceled
 
-        Logger.log("d", "SmartSlice HTTP Client: {}".format(self._client.address))
+    # Setting this also wakes up the job if it is waiting for the next status request
+    @property
+    def canceled(self):
+        return self._canceled.is_set()
+
+    @canceled.setter
+    def canceled(self, value):
+        if value:
+            self._canceled.set()
+            if self.engine:
+                self.engine.cancel(self)
+        else:
+            self._canceled.clear()
 
     @property
     def job_status(self):
@@ -209,14 +313,77 @@ class SmartSliceCloudJob(Job):
 
         return abs_private_subdirectory_name
 
-    # Sending jobs to AWS
+    # Collecting everything the solver gets to see
+    # Returns the mesh nodes, the pywim job, the digest of both and the digest of the meshes only, or None
     # - job_type: Job type to be sent. Can be either:
     #             > pywim.smartslice.job.JobType.validation
     #             > pywim.smartslice.job.JobType.optimization
-    def prepareJob(self, job_type, filename = None, filedir = None):
-        # Using tempfile module to probe for a temporary file path
-        # TODO: We can do this more elegant of course, too.
+    def prepareInputs(self, job_type):
+        # Checking whether count of models == 1
+        mesh_nodes = self.connector.getSliceableNodes()
+        if len(mesh_nodes) != 1:
+            Logger.log("d", "Found {} meshes!".format(["no", "too many"][len(mesh_nodes) > 1]))
+            return None
+
+        job = self.connector.buildJob(mesh_nodes, job_type)
+        mesh_digest = self.connector.meshDigest(mesh_nodes)
+        digest = self.connector.jobDigest(mesh_nodes, job, mesh_digest) if job else None
+
+        return mesh_nodes, job, digest, mesh_digest
+
+    # Building the package of a job in memory, or taking it from the job cache
+    #   Packages sent in chunks are built in a temporary file instead and returned
+    #   memory mapped, so the upload reads them from the file.
+    # - job_type: See prepareInputs
+    # - inputs: Result of prepareInputs, if already available
+    def preparePackage(self, job_type, inputs = None):
+        if inputs is None:
+            inputs = self.prepareInputs(job_type)
+        if inputs is None:
+            return None
+
+        mesh_nodes, job, digest, mesh_digest = inputs
+
+        threemf_data = self.connector.job_cache.getPackage(digest)
+        if threemf_data is not None:
+            return threemf_data
+
+        streamed = self.connector.app_preferences.getValue(self.connector.chunked_upload_preference)
+        threemf_stream = tempfile.TemporaryFile() if streamed else io.BytesIO()
+        compression = self.connector.getPackageCompression(mesh_nodes)
+        start_time = time.perf_counter()
+
+        speculative_data = self.connector.getSpeculativePackage(mesh_digest)
+        if speculative_data is not None:
+            Logger.log("d", "Using the speculatively created 3MF package")
+            threemf_stream.write(speculative_data)
+        else:
+            Logger.log("d", "Creating initial 3MF package")
+            self.connector.prepareInitial3mf(threemf_stream, mesh_nodes, compression)
+        Logger.log("d", "Adding additional job info")
+        self.connector.extend3mf(threemf_stream,
+                                 mesh_nodes,
+                                 job_type,
+                                 compression,
+                                 job=job)
+
+        Logger.log("d", "Packaged job with compression {} in {:.3f} s ({} bytes)".format(compression,
+                                                                                         time.perf_counter() - start_time,
+                                                                                         threemf_stream.tell()
+                                                                                         ))
+
+        if streamed:
+            threemf_stream.flush()
+            threemf_data = mmap.mmap(threemf_stream.fileno(), 0, access=mmap.ACCESS_READ)
+            threemf_stream.close() # The mapping keeps the file open
+        else:
+            threemf_data = threemf_stream.getvalue()
+        self.connector.job_cache.putPackage(digest, threemf_data)
 
+        return threemf_data
+
+    # Saving the package of a job to a file, e.g. for debugging
+    def prepareJob(self, job_type, filename = None, filedir = None):
         # Setting up file output
         if not filename:
             filename = "{}.3mf".format(uuid.uuid1())
@@ -224,48 +391,59 @@ class SmartSliceCloudJob(Job):
             filedir = self.determineTempDirectory()
         filepath = os.path.join(filedir, filename)
 
-        Logger.log("d", "Saving temporary (and custom!) 3MF file at: {}".format(filepath))
-
-        # Checking whether count of models == 1
-        mesh_nodes = self.connector.getSliceableNodes()
-        if len(mesh_nodes) is not 1:
-            Logger.log("d", "Found {} meshes!".format(["no", "too many"][len(mesh_nodes) > 1]))
+        threemf_data = self.preparePackage(job_type)
+        if threemf_data is None:
             return None
 
-        Logger.log("d", "Creating initial 3MF file")
-        self.connector.prepareInitial3mf(filepath, mesh_nodes)
-        Logger.log("d", "Adding additional job info")
-        self.connector.extend3mf(filepath,
-                                 mesh_nodes,
-                                 job_type)
+        Logger.log("d", "Saving 3MF file at: {}".format(filepath))
 
-        if not os.path.exists(filepath):
-            return None
+        with open(filepath, 'wb') as threemf_file:
+            threemf_file.write(threemf_data)
 
         return filepath
 
-    def processCloudJob(self, filepath):
-        # Read the 3MF file into bytes
-        threemf_fd = open(filepath, 'rb')
-        threemf_data = threemf_fd.read()
-        threemf_fd.close()
+    def _request(self, endpoint, method, *args, **kwargs):
+        return self.connector.client_pool.request(self._client, endpoint, method, *args, **kwargs)
 
-        # Submit the 3MF data for a new task
-        task = self._client.submit.post(threemf_data)
+    def processCloudJob(self, threemf_data):
+        with self.connector.client_pool.client() as self._client:
+            try:
+                task = self._submitCloudJob(threemf_data)
+                if task is not None and not self.canceled and task.status == pywim.http.thor.TaskStatus.finished:
+                    # Get the task again, but this time with the results included
+                    if self._request("result", self.connector.downloadResult, task, self) is None:
+                        task = self._request("result", self._client.result.get, id=task.id)
+            finally:
+                self._client = None
+                Logger.log("d", "SmartSlice HTTP metrics: {}".format(self.connector.client_pool.metrics.summary()))
+
+        return self.checkCloudTask(task)
+
+    def _submitCloudJob(self, threemf_data):
+        # Submit the 3MF data for a new task, submitPackage measures the upload bandwidth
+        task = self._request("submit", self.connector.submitPackage, self._client, threemf_data, self)
+        if task is None:
+            return None
         Logger.log("d", "Status after post'ing: {}".format(task.status))
 
         # While the task status is not finished or failed continue to periodically
-        # check the status. This is a naive way of waiting, since this could take
-        # a while (minutes).
+        # check the status. The delay grows the longer the job runs, since this could
+        # take a while (minutes). Canceling the job ends the wait right away.
+        self._polling.reset()
         while task.status not in (pywim.http.thor.TaskStatus.failed,
                                   pywim.http.thor.TaskStatus.finished
                                   ) and not self.canceled:
             self.job_status = task.status
 
-            time.sleep(self._wait_time)
-            task = self._client.status.get(id=task.id)
+            if self._canceled.wait(self._polling.next(task)):
+                break
+            task = self._request("status", self._client.status.get, id=task.id)
 
-        if not self.canceled:
+        return task
+
+    # Returns the task with results if it finished, otherwise tells the user what went wrong
+    def checkCloudTask(self, task):
+        if not self.canceled and task is not None:
             if self.connector._proxy.confirmationWindowEnabled is False:
                 self.connector.propertyHandler._cancelChanges = False
 
@@ -280,8 +458,6 @@ class SmartSliceCloudJob(Job):
                 self.connector.propertyHandler._cancelChanges = False
                 return None
             elif task.status == pywim.http.thor.TaskStatus.finished:
-                # Get the task again, but this time with the results included
-                task = self._client.result.get(id=task.id)
                 return task
             else:
                 error_message = Message()
@@ -296,11 +472,17 @@ class SmartSliceCloudJob(Job):
         else:
             notification_message = Message()
             notification_message.setTitle("Smart Slice")
-            notification_message.setText(i18n_catalog.i18nc("@info:status", "Job has been canceled!".format(task.error)))
+            notification_message.setText(i18n_catalog.i18nc("@info:status", "Job has been canceled!"))
             notification_message.show()
-            self.connector.cancelCurrentJob()
+            # Whoever canceled this job already took care of the current one
+            if self.connector.isCurrentJob(self):
+                self.connector.cancelCurrentJob()
 
     def run(self) -> None:
+        # Canceled while it waited for a worker
+        if self.canceled:
+            return
+
         if not self.job_type:
             error_message = Message()
             error_message.setTitle("Smart Slice")
@@ -309,13 +491,23 @@ class SmartSliceCloudJob(Job):
             self.connector.cancelCurrentJob()
 
         # TODO: Add instructions how to send a verification job here
-        previous_connector_status = self.connector.status
+        self._previous_connector_status = previous_connector_status = self.connector.status
         self.connector.status = self.ui_status_per_job_type[self.job_type]
         Job.yieldThread()  # Should allow the UI to update earlier
 
         try:
-            job = self.prepareJob(self.job_type)
-            Logger.log("i", "Smart Slice job prepared: {}".format(job))
+            inputs = self.prepareInputs(self.job_type)
+            self._digest = digest = inputs[2] if inputs else None
+            self.mesh_digest = inputs[3] if inputs else None
+            self.job_json = inputs[1].to_json().encode() if inputs and inputs[1] else None
+
+            analysis = self.connector.job_cache.getResult(digest)
+            if analysis is None:
+                analysis = self.connector.result_store.load(digest)
+                self.connector.job_cache.putResult(digest, analysis)
+            if analysis is None:
+                threemf_data = self.preparePackage(self.job_type, inputs)
+                Logger.log("i", "Smart Slice job prepared: {} bytes".format(len(threemf_data) if threemf_data else None))
         except SmartSliceCloudJob.JobException as exc:
             Logger.log("w", "Smart Slice job cannot be prepared: {}".format(exc.problem))
 
@@ -328,16 +520,63 @@ class SmartSliceCloudJob(Job):
 
             return
 
-        task = self.processCloudJob(job)
+        if analysis is not None:
+            Logger.log("i", "Reusing the result of an identical Smart Slice job: {}".format(digest))
+            if self.connector._proxy.confirmationWindowEnabled is False:
+                self.connector.propertyHandler._cancelChanges = False
+        elif self.engine is not None:
+            # The engine sends the job and the connector calls finishCloudJob() once it's done
+            self.deferred = True
+            self.engine.submit(self, threemf_data)
+            return
+        else:
+            task = self.processCloudJob(threemf_data)
+            analysis = self._storeResult(task)
+
+        self.prepareResult(analysis)
+        self.applyResult(analysis)
+
+    # Called by the async engine on one of its workers with the finished task
+    def prepareCloudResult(self, task):
+        self._analysis = self._storeResult(task)
+        self.prepareResult(self._analysis)
+
+    # Called with the task returned by the async engine, after prepareCloudResult
+    def finishCloudJob(self, task):
+        task = self.checkCloudTask(task)
+        self.applyResult(self._analysis if task else None)
+
+    # Builds the scene nodes of the modifier meshes of 'analysis' ahead of applyResult,
+    # which only inserts them. This is done off the main thread, since it takes long
+    # for large meshes.
+    def prepareResult(self, analysis):
+        if analysis is None:
+            self._modifier_mesh_nodes = []
+        else:
+            self._modifier_mesh_nodes = [self._buildModifierMeshNode(modifier_mesh) for modifier_mesh in analysis.modifier_meshes]
+
+    def _storeResult(self, task):
+        if task and self.downloaded_analysis is not None:
+            analysis = self.downloaded_analysis
+        elif task and task.result and len(task.result.analyses) > 0:
+            analysis = task.result.analyses[0]
+        else:
+            analysis = None
+
+        if analysis is not None:
+            self.connector.job_cache.putResult(self._digest, analysis)
+            self.connector.result_store.save(self._digest, analysis)
+        return analysis
 
-        try:
-            os.remove(job)
-        except:
-            Logger.log("w", "Unable to remove temporary 3MF {}".format(job))
+    def applyResult(self, analysis):
+        if not self.connector.isCurrentJob(self):
+            Logger.log("d", "Dropping the result of Smart Slice job {}, it isn't the current job anymore".format(self._id))
+            return
+
+        previous_connector_status = self._previous_connector_status
 
         # self.job_type == pywim.smartslice.job.JobType.optimization
-        if task and task.result and len(task.result.analyses) > 0:
-            analysis = task.result.analyses[0]
+        if analysis is not None:
             optimized = previous_connector_status in SmartSliceCloudStatus.Optimizable
             self._process_analysis_result(analysis, optimized)
 
@@ -383,76 +622,10 @@ class SmartSliceCloudJob(Job):
 
         # MODIFIER MESHES STUFF
         #our_only_node_stack = our_only_node.callDecoration("getStack")
-        for modifier_mesh in analysis.modifier_meshes:
-            # Building the scene node
-            modifier_mesh_node = CuraSceneNode()
-            modifier_mesh_node.setName("SmartSliceMeshModifier")
-            modifier_mesh_node.setSelectable(True)
-            modifier_mesh_node.setCalculateBoundingBox(True)
-
-            # Building the mesh
-
-            # # Preparing the data from pywim for MeshBuilder
-            modifier_mesh_vertices = [[v.x, v.y, v.z] for v in modifier_mesh.vertices ]
-            modifier_mesh_indices = [[triangle.v1, triangle.v2, triangle.v3] for triangle in modifier_mesh.triangles]
-
-            # # Doing the actual build
-            modifier_mesh_data = MeshBuilder()
-            modifier_mesh_data.setVertices(numpy.asarray(modifier_mesh_vertices, dtype=numpy.float32))
-            modifier_mesh_data.setIndices(numpy.asarray(modifier_mesh_indices, dtype=numpy.int32))
-            modifier_mesh_data.calculateNormals()
-
-            modifier_mesh_node.setMeshData(modifier_mesh_data.build())
-            modifier_mesh_node.calculateBoundingBoxMesh()
-
-            active_build_plate = Application.getInstance().getMultiBuildPlateModel().activeBuildPlate
-            modifier_mesh_node.addDecorator(BuildPlateDecorator(active_build_plate))
-            modifier_mesh_node.addDecorator(SliceableObjectDecorator())
-
-            stack = modifier_mesh_node.callDecoration("getStack")
-            settings = stack.getTop()
-
-            modifier_mesh_node_infill_pattern = self.connector.infill_pattern_pywim_to_cura_dict[modifier_mesh.print_config.infill.pattern]
-            definition_dict = {
-                "infill_mesh" : True,
-                "infill_pattern" : modifier_mesh_node_infill_pattern,
-                "infill_sparse_density": modifier_mesh.print_config.infill.density,
-                }
-            Logger.log("d", "definition_dict: {}".format(definition_dict))
-
-            for key, value in definition_dict.items():
-                definition = stack.getSettingDefinition(key)
-                new_instance = SettingInstance(definition, settings)
-                new_instance.setProperty("value", value)
-
-                new_instance.resetState()  # Ensure that the state is not seen as a user state.
-                settings.addInstance(new_instance)
-
-            op = GroupedOperation()
-            # First add node to the scene at the correct position/scale, before parenting, so the eraser mesh does not get scaled with the parent
-            op.addOperation(AddSceneNodeOperation(modifier_mesh_node,
-                                                    Application.getInstance().getController().getScene().getRoot()
-                                                    )
-                            )
-            op.addOperation(SetParentOperation(modifier_mesh_node,
-                                                our_only_node)
-                            )
-            op.push()
-
-            # TODO: Not needed during POC. Decision needed whether this is superfluous or not.
-            #modifier_mesh_transform_matrix = Matrix(modifier_mesh.transform)
-            #modifier_mesh_node.setTransformation(modifier_mesh_transform_matrix)
-
-            our_only_node_position = our_only_node.getWorldPosition()
-            modifier_mesh_node.setOrientation(self.connector.propertyHandler.meshRotation)
-            modifier_mesh_node.setScale(self.connector.propertyHandler.meshScale)
-            modifier_mesh_node.setPosition(our_only_node_position,
-                                            SceneNode.TransformSpace.World)
-            Logger.log("d", "Moved modifiers to the global location: {}".format(our_only_node_position))
-
-            modifier_mesh_node.meshDataChanged.connect(self.connector.showConfirmDialog)
-
-            Application.getInstance().getController().getScene().sceneChanged.emit(modifier_mesh_node)
+        if self._modifier_mesh_nodes:
+            # The scene is only changed on the main thread
+            Application.getInstance().callLater(self._insertModifierMeshNodes, self._modifier_mesh_nodes, our_only_node)
+            self._modifier_mesh_nodes = []
 
         self.connector._proxy.resultSafetyFactor = analysis.structural.min_safety_factor
         self.connector._proxy.resultMaximalDisplacement = analysis.structural.max_displacement
@@ -491,6 +664,93 @@ class SmartSliceCloudJob(Job):
         #self.connector._proxy.materialName = material_extra_info[3][pos]
 
 
+    # #  Builds the scene node of 'modifier_mesh', without adding it to the scene yet
+    def _buildModifierMeshNode(self, modifier_mesh):
+        # Building the scene node
+        modifier_mesh_node = CuraSceneNode()
+        modifier_mesh_node.setName("SmartSliceMeshModifier")
+        modifier_mesh_node.setSelectable(True)
+        modifier_mesh_node.setCalculateBoundingBox(True)
+
+        # Building the mesh
+
+        # # Preparing the data from pywim for MeshBuilder
+        modifier_mesh_vertices, modifier_mesh_indices = modifierMeshArrays(modifier_mesh)
+
+        # # Doing the actual build
+        modifier_mesh_data = MeshBuilder()
+        modifier_mesh_data.setVertices(modifier_mesh_vertices)
+        modifier_mesh_data.setIndices(modifier_mesh_indices)
+        modifier_mesh_data.calculateNormals()
+
+        modifier_mesh_node.setMeshData(modifier_mesh_data.build())
+        modifier_mesh_node.calculateBoundingBoxMesh()
+
+        active_build_plate = Application.getInstance().getMultiBuildPlateModel().activeBuildPlate
+        modifier_mesh_node.addDecorator(BuildPlateDecorator(active_build_plate))
+        modifier_mesh_node.addDecorator(SliceableObjectDecorator())
+
+        stack = modifier_mesh_node.callDecoration("getStack")
+        settings = stack.getTop()
+
+        modifier_mesh_node_infill_pattern = self.connector.infill_pattern_pywim_to_cura_dict[modifier_mesh.print_config.infill.pattern]
+        definition_dict = {
+            "infill_mesh" : True,
+            "infill_pattern" : modifier_mesh_node_infill_pattern,
+            "infill_sparse_density": modifier_mesh.print_config.infill.density,
+            }
+        Logger.log("d", "definition_dict: {}".format(definition_dict))
+
+        for key, value in definition_dict.items():
+            definition = stack.getSettingDefinition(key)
+            new_instance = SettingInstance(definition, settings)
+            new_instance.setProperty("value", value)
+
+            new_instance.resetState()  # Ensure that the state is not seen as a user state.
+            settings.addInstance(new_instance)
+
+        return modifier_mesh_node
+
+    # #  Adds all 'modifier_mesh_nodes' to 'parent_node' in one operation and announces them
+    #    with a single sceneChanged, so the scene is only redrawn and walked once.
+    #    Runs on the main thread, where the nodes emit their signals directly, so
+    #    postponing sceneChanged catches all of them.
+    def _insertModifierMeshNodes(self, modifier_mesh_nodes, parent_node):
+        scene = Application.getInstance().getController().getScene()
+
+        # The scene forwards every change of its nodes as sceneChanged. Holding these back
+        # until all nodes are added and placed makes them a single notification.
+        with postponeSignals(scene.sceneChanged, compress=CompressTechnique.CompressSingle):
+            op = GroupedOperation()
+            for modifier_mesh_node in modifier_mesh_nodes:
+                # First add node to the scene at the correct position/scale, before parenting, so the eraser mesh does not get scaled with the parent
+                op.addOperation(AddSceneNodeOperation(modifier_mesh_node,
+                                                      scene.getRoot()
+                                                      )
+                                )
+                op.addOperation(SetParentOperation(modifier_mesh_node,
+                                                   parent_node)
+                                )
+            op.push()
+
+            # TODO: Not needed during POC. Decision needed whether this is superfluous or not.
+            #modifier_mesh_transform_matrix = Matrix(modifier_mesh.transform)
+            #modifier_mesh_node.setTransformation(modifier_mesh_transform_matrix)
+
+            parent_node_position = parent_node.getWorldPosition()
+            for modifier_mesh_node in modifier_mesh_nodes:
+                modifier_mesh_node.setOrientation(self.connector.propertyHandler.meshRotation)
+                modifier_mesh_node.setScale(self.connector.propertyHandler.meshScale)
+                modifier_mesh_node.setPosition(parent_node_position,
+                                               SceneNode.TransformSpace.World)
+
+                modifier_mesh_node.meshDataChanged.connect(self.connector.showConfirmDialog)
+            Logger.log("d", "Moved {} modifiers to the global location: {}".format(len(modifier_mesh_nodes), parent_node_position))
+
+            # The last emit is the one that is kept
+            scene.sceneChanged.emit(parent_node)
+
+
 class SmartSliceCloudVerificationJob(SmartSliceCloudJob):
 
     def __init__(self, connector) -> None:
@@ -508,6 +768,33 @@ class SmartSliceCloudOptimizeJob(SmartSliceCloudVerificationJob):
 
 
 
+# #  Creates the mesh part of the job package in the background, so only the
+#    job definition needs to be added once the user starts the job
+class SmartSliceSpeculativePackageJob(Job):
+    def __init__(self, connector, mesh_nodes) -> None:
+        super().__init__()
+        self.connector = connector
+        self.mesh_nodes = mesh_nodes
+        self.mesh_digest = None
+
+    def run(self) -> None:
+        start_time = time.perf_counter()
+
+        self.mesh_digest = self.connector.meshDigest(self.mesh_nodes)
+
+        threemf_stream = io.BytesIO()
+        self.connector.prepareInitial3mf(threemf_stream,
+                                         self.mesh_nodes,
+                                         self.connector.getPackageCompression(self.mesh_nodes)
+                                         )
+
+        Logger.log("d", "Speculatively created 3MF package in {:.3f} s ({} bytes)".format(time.perf_counter() - start_time,
+                                                                                          threemf_stream.tell()
+                                                                                          ))
+
+        self.setResult(threemf_stream.getvalue())
+
+
 class Force: # TODO - Move this or replace
     def __init__(self, normal : Vector = None, magnitude : float = 0.0, pull : bool = True):
         self.normal = normal if normal else Vector(1.0, 0.0, 0.0)
@@ -529,15 +816,146 @@ class Force: # TODO - Move this or replace
 
         return v
 
+# #  Picks the compression of the job package
+#
+#   The 3MFWriter always deflates with zipfile's default level. For any other
+#   mode the package is written from the model the 3MFWriter provides, so no
+#   mode compresses twice. Storing or a low level pays off on fast uploads, a
+#   high level on slow ones.
+class PackageCompression:
+    Auto = "auto"
+    Default = "default"
+    Store = "store"
+    WriterLevel = 6 # zlib's default, used by the 3MFWriter
+
+    # Rough ratio of compressed to raw size and compression throughput (bytes/s)
+    # of 3MF packages for each deflate level, 0 is storing
+    Estimates = {
+        0: (1.0, 1e9),
+        1: (0.30, 80e6),
+        2: (0.29, 70e6),
+        3: (0.28, 55e6),
+        4: (0.26, 40e6),
+        5: (0.25, 30e6),
+        6: (0.24, 20e6),
+        7: (0.235, 14e6),
+        8: (0.232, 9e6),
+        9: (0.23, 6e6),
+    }
+
+    # zipfile only takes a deflate level as of Python 3.7
+    LevelsSupported = sys.version_info >= (3, 7)
+
+    def __init__(self, compression : int = zipfile.ZIP_DEFLATED, level : int = None):
+        self.compression = compression
+        self.level = level
+
+    def __str__(self):
+        if self.compression == zipfile.ZIP_STORED:
+            return self.Store
+        if self.level is None:
+            return self.Default
+        return "deflate (level {})".format(self.level)
+
+    # #  Whether this is the compression of the 3MFWriter's output
+    @property
+    def isDefault(self) -> bool:
+        return self.compression == zipfile.ZIP_DEFLATED and self.level is None
+
+    # #  Returns the keyword arguments for ZipFile.writestr
+    def zipArguments(self) -> dict:
+        if self.level is None or not self.LevelsSupported:
+            return {"compress_type": self.compression}
+        return {"compress_type": self.compression, "compresslevel": self.level}
+
+    # #  Creates the compression from the preference value
+    #   \param mode "auto", "default", "store" or a deflate level from 1 to 9
+    #   \param raw_size Estimated uncompressed size of the package in bytes
+    #   \param bandwidth Measured upload bandwidth in bytes/s or None
+    @classmethod
+    def fromPreference(cls, mode, raw_size : int, bandwidth : float = None):
+        mode = str(mode).strip().lower()
+
+        if mode == cls.Default:
+            return cls()
+        if mode == cls.Store:
+            return cls(zipfile.ZIP_STORED)
+        if mode != cls.Auto:
+            try:
+                level = int(mode)
+            except ValueError:
+                level = None
+
+            if level is not None and 0 <= level <= 9:
+                return cls._fromLevel(level)
+            Logger.log("w", "Unknown package compression '{}', using auto".format(mode))
+
+        # Without a measured bandwidth we stick to the 3MFWriter's compression
+        if not bandwidth:
+            return cls()
+
+        # Otherwise take whatever is expected to finish compression and upload first.
+        # Building the model takes the same time for all of them.
+        levels = cls.Estimates.keys() if cls.LevelsSupported else (0, cls.WriterLevel)
+        best_level = min(levels, key=lambda level: raw_size / cls.Estimates[level][1] +
+                                                   raw_size * cls.Estimates[level][0] / bandwidth)
+
+        return cls._fromLevel(best_level)
+
+    @classmethod
+    def _fromLevel(cls, level : int):
+        if level == 0:
+            return cls(zipfile.ZIP_STORED)
+        if level == cls.WriterLevel:
+            return cls()
+        if not cls.LevelsSupported:
+            Logger.log("w", "Deflate level {} needs Python 3.7, using the default".format(level))
+            return cls()
+        return cls(zipfile.ZIP_DEFLATED, level)
+
 class SmartSliceCloudConnector(QObject):
     http_protocol_preference = "smartslice/http_protocol"
     http_hostname_preference = "smartslice/http_hostname"
     http_port_preference = "smartslice/http_port"
     http_token_preference = "smartslice/token"
+    async_engine_preference = "smartslice/async_engine"
+    max_concurrent_jobs_preference = "smartslice/max_concurrent_jobs"
+    speculative_packaging_preference = "smartslice/speculative_packaging"
+    chunked_upload_preference = "smartslice/chunked_upload"
+    upload_chunk_size_preference = "smartslice/upload_chunk_size" # MB
+    delta_upload_preference = "smartslice/delta_upload"
+    binary_results_preference = "smartslice/binary_results"
+
+    # The parts of the 3MF package around the model, as the 3MFWriter writes them
+    threemf_content_types = b'<?xml version="1.0" encoding="UTF-8"?> \n' \
+                            b'<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">' \
+                            b'<Default ContentType="application/vnd.openxmlformats-package.relationships+xml" Extension="rels" />' \
+                            b'<Default ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml" Extension="model" />' \
+                            b'</Types>'
+    threemf_relations = b'<?xml version="1.0" encoding="UTF-8"?> \n' \
+                        b'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">' \
+                        b'<Relationship Id="rel0" Target="/3D/3dmodel.model" ' \
+                        b'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel" />' \
+                        b'</Relationships>'
+
+    # Replacement tokens, which change with every build of a job, and the g-code using them
+    volatile_replacement_tokens = ("time", "date", "day")
+    expanded_gcode_settings = ("machine_start_gcode", "machine_end_gcode",
+                               "machine_extruder_start_code", "machine_extruder_end_code")
+
+    package_compression_preference = "smartslice/package_compression" # "auto", "default", "store" or 1-9
+    package_cache_size_preference = "smartslice/package_cache_size" # MB
+    result_store_size_preference = "smartslice/result_store_size" # MB
+    result_store_max_age_preference = "smartslice/result_store_max_age" # days
 
     debug_save_smartslice_package_preference = "smartslice/debug_save_smartslice_package"
     debug_save_smartslice_package_location = "smartslice/debug_save_smartslice_package_location"
 
+    interactive_mesh_cache_size_preference = "smartslice/interactive_mesh_cache_size" # MB
+    planar_face_angle_tolerance_preference = "smartslice/planar_face_angle_tolerance" # degrees
+    planar_face_distance_tolerance_preference = "smartslice/planar_face_distance_tolerance" # mm
+    topology_cache_size_preference = "smartslice/topology_cache_size" # MB
+    property_change_debounce_preference = "smartslice/property_change_debounce" # ms, 0 = next event loop iteration
 
     def __init__(self, extension):
         super().__init__()
@@ -545,9 +963,6 @@ class SmartSliceCloudConnector(QObject):
 
         # Variables
         self._job = None
-        self._jobs = {}
-        self._current_job = 0
-        self._jobs[self._current_job] = None
         self.infill_pattern_cura_to_pywim_dict = {
             "grid": pywim.am.InfillType.grid,
             "triangles": pywim.am.InfillType.triangle,
@@ -571,6 +986,57 @@ class SmartSliceCloudConnector(QObject):
         self.app_preferences.addPreference(self.http_port_preference, 443)
         self.app_preferences.addPreference(self.http_token_preference, "")
 
+        # Sharing the HTTP clients between all jobs
+        self.client_pool = SmartSliceClientPool()
+        self._configureClientPool()
+        self.app_preferences.preferenceChanged.connect(self._onPreferenceChanged)
+
+        # Sending the jobs from an asyncio event loop instead of one worker thread per job
+        self.app_preferences.addPreference(self.async_engine_preference, False)
+        self._async_engine = None
+
+        # Jobs are started by the scheduler
+        self.app_preferences.addPreference(self.max_concurrent_jobs_preference, 1)
+        self._scheduler = SmartSliceJobScheduler(int(self.app_preferences.getValue(self.max_concurrent_jobs_preference)))
+        self._scheduler.queueChanged.connect(self._onJobQueueChanged)
+
+        # Creating the mesh part of the package while the user is still busy with the setup
+        self.app_preferences.addPreference(self.speculative_packaging_preference, False)
+        self._speculative_job = None
+        self._speculative_package = None # (mesh digest, 3MF data)
+        self._speculative_placements = [] # placements of the nodes in the speculative package
+        self._speculative_timer = QTimer()
+        self._speculative_timer.setSingleShot(True)
+        self._speculative_timer.setInterval(500)
+        self._speculative_timer.timeout.connect(self._startSpeculativePackaging)
+
+        # Uploading the package in resumable chunks instead of a single request
+        self.app_preferences.addPreference(self.chunked_upload_preference, False)
+        self.app_preferences.addPreference(self.upload_chunk_size_preference, 4)
+
+        # Uploading each mesh only once and then just the job definition
+        self.app_preferences.addPreference(self.delta_upload_preference, False)
+
+        # Downloading results with the modifier meshes as binary buffers
+        self.app_preferences.addPreference(self.binary_results_preference, False)
+
+        # Interactive mesh stuff
+        self.app_preferences.addPreference(self.interactive_mesh_cache_size_preference, 512)
+        self.app_preferences.addPreference(self.planar_face_angle_tolerance_preference, 0.5)
+        self.app_preferences.addPreference(self.planar_face_distance_tolerance_preference, 0.01)
+        self.app_preferences.addPreference(self.topology_cache_size_preference, 1024)
+        self.app_preferences.addPreference(self.property_change_debounce_preference, 0)
+
+        self.app_preferences.addPreference(self.package_compression_preference, PackageCompression.Auto)
+        self._upload_bandwidth = None # bytes/s, measured on the last uploads
+        self.app_preferences.addPreference(self.package_cache_size_preference, 256)
+        self.job_cache = SmartSliceJobCache(int(self.app_preferences.getValue(self.package_cache_size_preference)) * 1024 * 1024)
+        self.app_preferences.addPreference(self.result_store_size_preference, 256)
+        self.app_preferences.addPreference(self.result_store_max_age_preference, 30)
+        self.result_store = SmartSliceResultStore(int(self.app_preferences.getValue(self.result_store_size_preference)) * 1024 * 1024,
+                                                  float(self.app_preferences.getValue(self.result_store_max_age_preference)) * 24 * 3600
+                                                  )
+
         # Debug stuff
         self.app_preferences.addPreference(self.debug_save_smartslice_package_preference, False)
         default_save_smartslice_package_location = str(Path.home())
@@ -584,6 +1050,9 @@ class SmartSliceCloudConnector(QObject):
         self.active_machine = None
         self.extruders = None
         self._all_extruders_settings = None
+        self._all_extruders_strings = None
+        self.settings_snapshot = SmartSliceSettingsSnapshot()
+        self.material_registry = SmartSliceMaterialRegistry(os.path.join(os.path.split(__file__)[0], "data", "POC_material_database.json"))
         self.propertyHandler = None # SmartSlicePropertyHandler
 
         # POC
@@ -600,13 +1069,144 @@ class SmartSliceCloudConnector(QObject):
 
     onSmartSlicePrepared = pyqtSignal()
 
+    def _configureClientPool(self):
+        port = self.app_preferences.getValue(self.http_port_preference)
+        if type(port) is not int:
+            port = int(port)
+
+        self.client_pool.configure(self.app_preferences.getValue(self.http_protocol_preference),
+                                   self.app_preferences.getValue(self.http_hostname_preference),
+                                   port
+                                   )
+
+    def _onPreferenceChanged(self, preference):
+        if preference.startswith("smartslice/http_"):
+            self._configureClientPool()
+        elif preference == self.property_change_debounce_preference and self.propertyHandler:
+            self.propertyHandler.updatePropertyChangeDebounce()
+
+    def getAsyncEngine(self):
+        if not self.app_preferences.getValue(self.async_engine_preference):
+            return None
+
+        if self._async_engine is None:
+            self._async_engine = SmartSliceAsyncEngine(self.client_pool,
+                                                       PollingBackoff,
+                                                       submit_callback=self.submitPackage,
+                                                       result_callback=self.downloadResult,
+                                                       finished_callback=self._prepareAsyncResult,
+                                                       parent=self
+                                                       )
+            self._async_engine.jobStatusChanged.connect(self._onAsyncJobStatusChanged)
+            self._async_engine.jobFinished.connect(self._onAsyncJobFinished)
+            self._async_engine.jobFailed.connect(self._onAsyncJobFailed)
+
+        return self._async_engine
+
+    def _onAsyncJobStatusChanged(self, job, status):
+        job.job_status = status
+
+    def _prepareAsyncResult(self, task, job):
+        job.prepareCloudResult(task)
+
+    def _onAsyncJobFinished(self, job, task):
+        Logger.log("d", "SmartSlice HTTP metrics: {}".format(self.client_pool.metrics.summary()))
+        if not job.canceled:
+            job.finishCloudJob(task)
+        self._concludeJob(job)
+
+    def _onAsyncJobFailed(self, job, error):
+        job.setError(error)
+        self._concludeJob(job)
+
+    # #  Whether 'job' is the one the user interacts with. Other jobs were canceled
+    #    or replaced by a newer one, so their results are outdated.
+    def isCurrentJob(self, job) -> bool:
+        return job is self._scheduler.current
+
     def cancelCurrentJob(self):
-        if self._jobs[self._current_job] is not None:
-            self._jobs[self._current_job].cancel()
-            self._jobs[self._current_job].canceled = True
-            self._jobs[self._current_job] = None
+        # Whatever is still queued was made for the old settings
+        self._scheduler.dropQueued()
+
+        job = self._scheduler.current
+        if job is not None:
+            job.cancel()
+            job.canceled = True
+            self._scheduler.cancel(job)
             self.prepareValidation()
 
+    def _requestSpeculativePackaging(self):
+        if self.app_preferences.getValue(self.speculative_packaging_preference):
+            self._speculative_timer.start()
+
+    def _onSceneChangedSpeculative(self, node):
+        if self._speculative_job is None and self._speculative_package is None:
+            return
+
+        # Camera moves, the select handle picking faces and the like don't change the
+        # package. Anything else getSpeculativePackage catches by the mesh digest.
+        if not isinstance(node, CuraSceneNode) or not node.callDecoration("isSliceable"):
+            return
+        if self._isSpeculativelyPlaced(node):
+            return
+
+        # Whatever has been built might be outdated now
+        if self._speculative_job is not None:
+            self._speculative_job.cancel()
+            self._speculative_job = None
+        self._speculative_package = None
+
+        if self.status is SmartSliceCloudStatus.ReadyToVerify:
+            self._requestSpeculativePackaging()
+
+    def _startSpeculativePackaging(self):
+        mesh_nodes = self.getSliceableNodes()
+        if len(mesh_nodes) != 1 or self.status is not SmartSliceCloudStatus.ReadyToVerify:
+            return
+
+        if self._speculative_job is not None:
+            self._speculative_job.cancel()
+
+        Logger.log("d", "Starting speculative packaging")
+        self._speculative_placements = [self._nodePlacement(mesh_node) for mesh_node in mesh_nodes]
+        self._speculative_job = SmartSliceSpeculativePackageJob(self, mesh_nodes)
+        self._speculative_job.finished.connect(self._onSpeculativePackagingFinished)
+        self._speculative_job.start()
+
+    def _onSpeculativePackagingFinished(self, job):
+        # Outdated jobs are ignored
+        if job is not self._speculative_job:
+            return
+        self._speculative_job = None
+
+        if job.getError():
+            Logger.log("w", "Speculative packaging failed: {}".format(job.getError()))
+            return
+
+        self._speculative_package = (job.mesh_digest, job.getResult())
+
+    # #  Returns what the speculative package depends on of 'node'
+    def _nodePlacement(self, node):
+        return (node, node.getMeshData(), node.getLocalTransformation().getData().tobytes())
+
+    # #  Whether 'node' has the same mesh and transformation as in the speculative package.
+    #    MeshData is replaced, not modified, on changes, so its identity is enough.
+    def _isSpeculativelyPlaced(self, node) -> bool:
+        _, mesh_data, transformation = self._nodePlacement(node)
+        return any(placed_node is node and placed_mesh_data is mesh_data and placed_transformation == transformation
+                   for placed_node, placed_mesh_data, placed_transformation in self._speculative_placements)
+
+    # #  Returns the speculatively created mesh part of the package, if it matches the meshes of 'mesh_digest'
+    def getSpeculativePackage(self, mesh_digest):
+        speculative_package = self._speculative_package
+        if speculative_package is not None and speculative_package[0] == mesh_digest:
+            return speculative_package[1]
+        return None
+
+    def _onJobQueueChanged(self):
+        self._proxy.jobsQueued = self._scheduler.queuedCount
+        self._proxy.jobsRunning = self._scheduler.runningCount
+
     def _onSaveDebugPackage(self, messageId: str, actionId: str) -> None:
         dummy_job = SmartSliceCloudVerificationJob(self)
         if self.status == SmartSliceCloudStatus.ReadyToVerify:
@@ -661,6 +1261,8 @@ class SmartSliceCloudConnector(QObject):
         self.propertyHandler.cacheChanges() # Setup Cache
         self.status = SmartSliceCloudStatus.NoModel
 
+        Application.getInstance().getController().getScene().sceneChanged.connect(self._onSceneChangedSpeculative)
+
         if self.app_preferences.getValue(self.debug_save_smartslice_package_preference):
             self.debug_save_smartslice_package_message = Message(title="[DEBUG] SmartSlicePlugin",
                                                                  text= "Click on the button below to generate a debug package, which contains all data as sent to the cloud. Make sure you provide all input as confirmed by an active button in the action menu in the SmartSlice tab.\nThanks!",
@@ -914,6 +1516,8 @@ class SmartSliceCloudConnector(QObject):
         Logger.log("d", "Setting status: {} -> {}".format(self._proxy.sliceStatusEnum, value))
         if self._proxy.sliceStatusEnum is not value:
             self._proxy.sliceStatusEnum = value
+            if value is SmartSliceCloudStatus.ReadyToVerify:
+                self._requestSpeculativePackaging()
         self.updateSliceWidget()
 
     @property
@@ -972,10 +1576,19 @@ class SmartSliceCloudConnector(QObject):
             pass
 
     def _onJobFinished(self, job):
-        if self._jobs[self._current_job] is None:
+        # The async engine concludes the job once it's really done
+        if job.deferred and not job.getError():
+            return
+
+        self._concludeJob(job)
+
+    def _concludeJob(self, job):
+        self._scheduler.finish(job)
+
+        if job is not self._scheduler.current:
             Logger.log("d", "Smart Slice Job was Cancelled")
         else:
-            error = self._jobs[self._current_job].getError()
+            error = job.getError()
 
             if error:
                 self.prepareValidation()
@@ -986,9 +1599,9 @@ class SmartSliceCloudConnector(QObject):
                 ).show()
                 return
 
-            if not self._jobs[self._current_job].canceled:
+            if not job.canceled:
                 self.propertyHandler._propertiesChanged = []
-                self._jobs[self._current_job] = None
+                self._scheduler.clearCurrent(job)
                 self._proxy.shouldRaiseConfirmation = False
 
 
@@ -1058,11 +1671,7 @@ class SmartSliceCloudConnector(QObject):
             self.propertyHandler.confirmOptimizeModMesh()
         else:
             self.propertyHandler._cancelChanges = False
-            self._current_job += 1
-            self._jobs[self._current_job] = SmartSliceCloudVerificationJob(self)
-            self._jobs[self._current_job]._id = self._current_job
-            self._jobs[self._current_job].finished.connect(self._onJobFinished)
-            self._jobs[self._current_job].start()
+            self._scheduleJob(SmartSliceCloudVerificationJob(self))
 
     """
       prepareOptimization()
@@ -1080,12 +1689,12 @@ class SmartSliceCloudConnector(QObject):
 
     def doOptimization(self):
         self.propertyHandler._cancelChanges = False
-        self._current_job += 1
-        self._jobs[self._current_job] = SmartSliceCloudOptimizeJob(self)
-        self._jobs[self._current_job]._id = self._current_job
-        self._jobs[self._current_job].finished.connect(self._onJobFinished)
-        self._jobs[self._current_job].start()
+        self._scheduleJob(SmartSliceCloudOptimizeJob(self))
 
+    def _scheduleJob(self, job, priority = SmartSliceJobScheduler.PriorityNormal):
+        job.engine = self.getAsyncEngine()
+        job.finished.connect(self._onJobFinished)
+        self._scheduler.schedule(job, priority, key=job.job_type)
 
     '''
       Primary Button Actions:
@@ -1094,7 +1703,7 @@ class SmartSliceCloudConnector(QObject):
         * Slice
     '''
     def onSliceButtonClicked(self):
-        if not self._jobs[self._current_job]:
+        if not self._scheduler.current:
             if self.status is SmartSliceCloudStatus.ReadyToVerify:
                 self.doVerfication()
             elif self.status in SmartSliceCloudStatus.Optimizable:
@@ -1102,8 +1711,7 @@ class SmartSliceCloudConnector(QObject):
             elif self.status is SmartSliceCloudStatus.Optimized:
                 Application.getInstance().getController().setActiveStage("PreviewStage")
         else:
-            self._jobs[self._current_job].cancel()
-            self._jobs[self._current_job] = None
+            self.cancelCurrentJob()
 
     '''
       Secondary Button Actions:
@@ -1111,14 +1719,15 @@ class SmartSliceCloudConnector(QObject):
         * Preview
     '''
     def onSecondaryButtonClicked(self):
-        if self._jobs[self._current_job] is not None:
+        job = self._scheduler.current
+        if job is not None:
             if self.status is SmartSliceCloudStatus.BusyOptimizing:
                 #
                 #  CANCEL SMART SLICE JOB HERE
                 #    Any connection to AWS server should be severed here
                 #
-                self._jobs[self._current_job].canceled = True
-                self._jobs[self._current_job] = None
+                job.canceled = True
+                self._scheduler.cancel(job)
                 if self._proxy.reqsSafetyFactor < self._proxy.resultSafetyFactor and (self._proxy.reqsMaxDeflect > self._proxy.resultMaximalDisplacement):
                     self.status = SmartSliceCloudStatus.Overdimensioned
                 else:
@@ -1129,8 +1738,8 @@ class SmartSliceCloudConnector(QObject):
                 #  CANCEL SMART SLICE JOB HERE
                 #    Any connection to AWS server should be severed here
                 #
-                self._jobs[self._current_job].canceled = True
-                self._jobs[self._current_job] = None
+                job.canceled = True
+                self._scheduler.cancel(job)
                 self.status = SmartSliceCloudStatus.ReadyToVerify
                 Application.getInstance().activityChanged.emit()
         else:
@@ -1140,14 +1749,257 @@ class SmartSliceCloudConnector(QObject):
     #
     #   3MF READER
     #
-    def prepareInitial3mf(self, threemf_path, mesh_nodes):
-        # Getting 3MF writer and write our file
+    def getPackageCompression(self, mesh_nodes) -> PackageCompression:
+        # Estimating the size of the 3MF model from the size of its XML elements
+        raw_size = 0
+        for mesh_node in mesh_nodes:
+            mesh_data = mesh_node.getMeshData()
+            if mesh_data:
+                raw_size += 70 * mesh_data.getVertexCount() + 50 * mesh_data.getFaceCount()
+
+        return PackageCompression.fromPreference(self.app_preferences.getValue(self.package_compression_preference),
+                                                 raw_size,
+                                                 self._upload_bandwidth
+                                                 )
+
+    # #  Uploads 'threemf_data' and creates a task for it
+    #   Uploads of the whole package are taken as sample of the upload bandwidth,
+    #   delta submits of only the job definition are not.
+    #   \param client pywim.http.thor.Client2020POC
+    #   \param job SmartSliceCloudJob the package belongs to. Its cancel event aborts a chunked upload.
+    def submitPackage(self, client, threemf_data, job = None):
+        protocol, hostname, port = self.client_pool.settings
+        start_time = time.perf_counter()
+
+        mesh_digest = job.mesh_digest if job else None
+        if mesh_digest and job.job_json and self.app_preferences.getValue(self.delta_upload_preference):
+            delta_upload = SmartSliceDeltaUpload(protocol, hostname, port, canceled=job.cancel_event)
+            try:
+                task_id = delta_upload.submit(mesh_digest, job.job_json, threemf_data)
+            except SmartSliceChunkedUpload.Canceled:
+                Logger.log("d", "Delta upload canceled")
+                return None
+            if task_id is not None:
+                if delta_upload.blob_uploaded:
+                    self.updateUploadBandwidth(len(threemf_data), time.perf_counter() - start_time)
+                return client.status.get(id=task_id)
+
+            Logger.log("d", "Falling back to a full upload")
+            start_time = time.perf_counter()
+
+        if not self.app_preferences.getValue(self.chunked_upload_preference):
+            task = client.submit.post(threemf_data)
+            self.updateUploadBandwidth(len(threemf_data), time.perf_counter() - start_time)
+            return task
+
+        upload = SmartSliceChunkedUpload(protocol, hostname, port,
+                                         chunk_size=int(float(self.app_preferences.getValue(self.upload_chunk_size_preference)) * 1024 * 1024),
+                                         progress=self._onUploadProgress,
+                                         canceled=job.cancel_event if job else None
+                                         )
+
+        self._proxy.uploadProgress = 0.0
+        try:
+            task_id = upload.upload(threemf_data)
+        except SmartSliceChunkedUpload.Canceled:
+            Logger.log("d", "Chunked upload canceled")
+            return None
+        self.updateUploadBandwidth(len(threemf_data), time.perf_counter() - start_time)
+
+        return client.status.get(id=task_id)
+
+    # #  Downloads the result of the finished 'task' as binary result archive
+    #   Returns the analysis, which is also kept as the job's downloaded_analysis, or
+    #   None if binary results are disabled or the server can't send them.
+    def downloadResult(self, task, job = None):
+        if not self.app_preferences.getValue(self.binary_results_preference):
+            return None
+
+        protocol, hostname, port = self.client_pool.settings
+        analysis = SmartSliceResultDownload(protocol, hostname, port).download(task.id)
+        if job is not None:
+            job.downloaded_analysis = analysis
+
+        return analysis
+
+    def _onUploadProgress(self, progress):
+        self._proxy.uploadProgress = progress
+
+    def updateUploadBandwidth(self, size, duration):
+        if duration <= 0:
+            return
+        bandwidth = size / duration
+        if self._upload_bandwidth is None:
+            self._upload_bandwidth = bandwidth
+        else:
+            self._upload_bandwidth = 0.5 * self._upload_bandwidth + 0.5 * bandwidth
+        Logger.log("d", "Upload bandwidth: {:.0f} bytes/s".format(self._upload_bandwidth))
+
+    def prepareInitial3mf(self, threemf_stream, mesh_nodes, compression : PackageCompression = None):
+        # Getting 3MF writer and write our package into the stream (or file path)
         threeMF_Writer = PluginRegistry.getInstance().getPluginObject("3MFWriter")
-        threeMF_Writer.write(threemf_path, mesh_nodes)
+
+        if compression is None or compression.isDefault:
+            threeMF_Writer.write(threemf_stream, mesh_nodes)
+            return True
+
+        # The 3MFWriter always uses zipfile's default deflate, so we write its model ourselves
+        try:
+            self._write3mf(threemf_stream, mesh_nodes, threeMF_Writer, compression)
+        except (ImportError, AttributeError, TypeError) as exc:
+            Logger.log("w", "Unable to write the 3MF model with {}, repacking the 3MFWriter's output: {}".format(compression, exc))
+            threemf_stream.seek(0)
+            threemf_stream.truncate()
+            threeMF_Writer.write(threemf_stream, mesh_nodes)
+            self._recompress3mf(threemf_stream, compression)
 
         return True
 
-    def extend3mf(self, filepath, mesh_nodes, job_type):
+    # #  Writes the same archive as the 3MFWriter, but with 'compression'. The model of
+    #    each node is converted by the 3MFWriter, so it includes the per-object settings.
+    def _write3mf(self, threemf_stream, mesh_nodes, threemf_writer, compression : PackageCompression):
+        import Savitar  # @UnresolvedImport
+
+        start_time = time.perf_counter()
+
+        # Copied from Cura/plugins/3MFWriter/ThreeMFWriter.py
+        # 3MF has y and z flipped and its origin in the left front corner of the build plate
+        transformation_matrix = Matrix()
+        transformation_matrix._data[1, 1] = 0
+        transformation_matrix._data[1, 2] = -1
+        transformation_matrix._data[2, 1] = 1
+        transformation_matrix._data[2, 2] = 0
+
+        global_stack = Application.getInstance().getGlobalContainerStack()
+        if global_stack:
+            translation_matrix = Matrix()
+            translation_matrix.setByTranslation(Vector(x=global_stack.getProperty("machine_width", "value") / 2,
+                                                       y=global_stack.getProperty("machine_depth", "value") / 2,
+                                                       z=0))
+            transformation_matrix.preMultiply(translation_matrix)
+
+        savitar_scene = Savitar.Scene()
+        savitar_scene.setMetaDataEntry("Application", CuraApplication.getInstance().getApplicationDisplayName())
+        for mesh_node in mesh_nodes:
+            savitar_node = threemf_writer._convertUMNodeToSavitarNode(mesh_node, transformation_matrix)
+            if savitar_node:
+                savitar_scene.addSceneNode(savitar_node)
+
+        scene_string = Savitar.ThreeMFParser().sceneToString(savitar_scene)
+
+        with zipfile.ZipFile(threemf_stream, 'w') as threemf_file:
+            threemf_file.writestr("3D/3dmodel.model", scene_string, **compression.zipArguments())
+            threemf_file.writestr("[Content_Types].xml", self.threemf_content_types, **compression.zipArguments())
+            threemf_file.writestr("_rels/.rels", self.threemf_relations, **compression.zipArguments())
+
+        Logger.log("d", "Wrote 3MF with {} in {:.3f} s".format(compression, time.perf_counter() - start_time))
+
+    def _recompress3mf(self, threemf_stream, compression : PackageCompression):
+        start_time = time.perf_counter()
+
+        threemf_stream.seek(0)
+        with zipfile.ZipFile(threemf_stream, 'r') as source:
+            entries = [(info, source.read(info)) for info in source.infolist()]
+
+        threemf_stream.seek(0)
+        threemf_stream.truncate()
+        with zipfile.ZipFile(threemf_stream, 'w') as target:
+            for info, data in entries:
+                target.writestr(info, data, **compression.zipArguments())
+
+        Logger.log("d", "Recompressed 3MF with {} in {:.3f} s".format(compression, time.perf_counter() - start_time))
+
+    # #  Returns a digest of everything the solver gets to see: the mesh buffers,
+    #    their placement and per-object settings as written by the 3MFWriter and the
+    #    job definition, which includes the material.
+    #    The slicer settings of the job contain the time of the build, as tokens and in
+    #    the g-code expanded with them. Instead of these, the settings of all stacks
+    #    the g-code was expanded from are hashed without the time tokens, so the same
+    #    job built again later has the same digest. These are the settings taken by
+    #    the last buildJob, so 'job' must be the job it returned.
+    def jobDigest(self, mesh_nodes, job, mesh_digest : str = None) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update((mesh_digest or self.meshDigest(mesh_nodes)).encode())
+
+        job_dict = json.loads(job.to_json())
+        self._removeVolatileSettings(job_dict)
+
+        # The key order of the JSON is not necessarily stable
+        job_json = json.dumps(job_dict, sort_keys=True, separators=(",", ":"))
+        digest.update(job_json.encode())
+
+        for extruder_nr, settings in sorted((self._all_extruders_strings or {}).items()):
+            stable_settings = {key: value for key, value in settings.items() if key not in self.volatile_replacement_tokens}
+            digest.update(extruder_nr.encode())
+            digest.update(json.dumps(stable_settings, sort_keys=True, separators=(",", ":")).encode())
+
+        return digest.hexdigest()
+
+    # #  Removes the time tokens and the g-code expanded with them from all slicer
+    #    settings ("auxiliary") in 'job_dict'
+    def _removeVolatileSettings(self, job_dict):
+        if isinstance(job_dict, dict):
+            for key, value in job_dict.items():
+                if key == "auxiliary" and isinstance(value, dict):
+                    for setting in self.volatile_replacement_tokens + self.expanded_gcode_settings:
+                        value.pop(setting, None)
+                else:
+                    self._removeVolatileSettings(value)
+        elif isinstance(job_dict, list):
+            for value in job_dict:
+                self._removeVolatileSettings(value)
+
+    # #  Returns a digest of what the 3MFWriter writes of 'mesh_nodes'
+    def meshDigest(self, mesh_nodes) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+
+        # The 3MFWriter places the meshes relative to the corner of the build plate
+        global_stack = Application.getInstance().getGlobalContainerStack()
+        if global_stack:
+            digest.update("{},{};".format(global_stack.getProperty("machine_width", "value"),
+                                          global_stack.getProperty("machine_depth", "value")).encode())
+
+        for mesh_node in mesh_nodes:
+            digest.update(meshDataHash(mesh_node.getMeshData()).encode())
+            digest.update(numpy.ascontiguousarray(mesh_node.getLocalTransformation().getData(), dtype=numpy.float64))
+
+            stack = mesh_node.callDecoration("getStack")
+            if stack:
+                settings = stack.getTop()
+                for key in sorted(settings.getAllKeys()):
+                    digest.update("{}={};".format(key, settings.getProperty(key, "value")).encode())
+
+        return digest.hexdigest()
+
+    def extend3mf(self, threemf_stream, mesh_nodes, job_type, compression : PackageCompression = None, job = None):
+        if job is None:
+            job = self.buildJob(mesh_nodes, job_type)
+        if job is None:
+            return False
+
+        if compression is None:
+            compression = PackageCompression(zipfile.ZIP_STORED)
+
+        threemf_file = zipfile.ZipFile(threemf_stream, 'a')
+        threemf_file.writestr('SmartSlice/job.json',
+                              job.to_json(),
+                              **compression.zipArguments()
+                              )
+        threemf_file.close()
+
+        return True
+
+    # #  Returns the list setting 'key' of the active extruder, e.g. skin_angles, as tuple
+    def _getExtruderListProperty(self, key):
+        value = self.propertyHandler.getExtruderProperty(key)
+        try:
+            return parseListSetting(value)
+        except ValueError:
+            raise SmartSliceCloudJob.JobException("Smart Slice can't read the setting {}: {}".format(key, value))
+
+    # #  Builds the pywim job from the current scene and settings
+    #    Returns None if the material is not in our material database
+    def buildJob(self, mesh_nodes, job_type):
         global_stack = Application.getInstance().getGlobalContainerStack()
 
         # NOTE: As agreed during the POC, we want to analyse and optimize only one model at the moment.
@@ -1163,20 +2015,11 @@ class SmartSliceCloudConnector(QObject):
         guid = machine_extruder.material.getMetaData().get("GUID", "")
 
         # Determine material properties from material database
-        this_dir = os.path.split(__file__)[0]
-        database_location = os.path.join(this_dir, "data", "POC_material_database.json")
-        jdata = json.loads(open(database_location).read())
-        material_found = None
-        for material in jdata["materials"]:
-            if "cura-guid" not in material.keys():
-                continue
-            if guid in material["cura-guid"]:
-                material_found = material
-                break
+        material_found = self.material_registry.find(guid)
 
         if not material_found:
             # TODO: Alternatively just raise an exception here
-            return False
+            return None
 
         job = pywim.smartslice.job.Job()
 
@@ -1267,11 +2110,9 @@ class SmartSliceCloudConnector(QObject):
 
         # skin angles - CuraEngine vs. pywim
         # > https://github.com/Ultimaker/CuraEngine/blob/master/src/FffGcodeWriter.cpp#L402
-        skin_angles = self.propertyHandler.getExtruderProperty("skin_angles")
-        if type(skin_angles) is str:
-            skin_angles = eval(skin_angles)
+        skin_angles = self._getExtruderListProperty("skin_angles")
         if len(skin_angles) > 0:
-            print_config.skin_orientations.extend(tuple(skin_angles))
+            print_config.skin_orientations.extend(skin_angles)
         else:
             print_config.skin_orientations.extend((45, 135))
 
@@ -1292,22 +2133,22 @@ class SmartSliceCloudConnector(QObject):
 
         # infill_angles - Setting defaults from the CuraEngine
         # > https://github.com/Ultimaker/CuraEngine/blob/master/src/FffGcodeWriter.cpp#L366
-        infill_angles = self.propertyHandler.getExtruderProperty("infill_angles")
-        if type(infill_angles) is str:
-            infill_angles = eval(infill_angles)
+        infill_angles = self._getExtruderListProperty("infill_angles")
         if not len(infill_angles):
             # Check the URL below for the default angles. They are infill type depended.
             print_config.infill.orientation = self._poc_default_infill_direction
         else:
             if len(infill_angles) > 1:
                 Logger.log("w", "More than one infill angle is set! Only the first will be taken!")
-                Logger.log("d", "Ignoring the angles: {}".format(infill_angles[1:]))
+                Logger.log("d", "Ignoring the angles: {}".format(list(infill_angles[1:])))
             print_config.infill.orientation = infill_angles[0]
         # ... and so on, check pywim.am.Config for full definition
 
         # The am.Config contains an "auxiliary" dictionary which should
         # be used to define the slicer specific settings. These will be
         # passed on directly to the slicer (CuraEngine).
+        settings_start_time = time.perf_counter()
+        self._cacheAllExtruderSettings()
         print_config.auxiliary = self._buildGlobalSettingsMessage()
 
         # Setup the slicer configuration. See each class for more
@@ -1332,6 +2173,8 @@ class SmartSliceCloudConnector(QObject):
 
             job.extruders.append(extruder_materials)
 
+        Logger.log("d", "Settings serialized in {:.1f} ms".format((time.perf_counter() - settings_start_time) * 1000))
+
         if len(extruders) == 0:
             Logger.log("e", "Did not find the extruder with position %i", machine_extruder.position)
 
@@ -1343,13 +2186,7 @@ class SmartSliceCloudConnector(QObject):
         job.chop.slicer = pywim.chop.slicer.CuraEngine(config=print_config,
                                                        printer=printer)
 
-        threemf_file = zipfile.ZipFile(filepath, 'a')
-        threemf_file.writestr('SmartSlice/job.json',
-                              job.to_json()
-                              )
-        threemf_file.close()
-
-        return True
+        return job
 
     def _updateForce0Magnitude(self):
         self._poc_force.magnitude = self._proxy.loadMagnitude
@@ -1444,34 +2281,39 @@ class SmartSliceCloudConnector(QObject):
 
         return settings
 
+    # #  Takes the settings of all stacks from the snapshot. Called once per job,
+    #   all message builders read from the result.
     def _cacheAllExtruderSettings(self):
-        global_stack = Application.getInstance().getGlobalContainerStack()
+        values, strings = self.settings_snapshot.take()
+        if values is None:
+            self._all_extruders_settings = None
+            self._all_extruders_strings = None
+            return
 
         # NB: keys must be strings for the string formatter
-        self._all_extruders_settings = {
-            "-1": self._buildReplacementTokens(global_stack)
-        }
-        for extruder_stack in ExtruderManager.getInstance().getActiveExtruderStacks():
-            extruder_nr = extruder_stack.getProperty("extruder_nr", "value")
-            self._all_extruders_settings[str(extruder_nr)] = self._buildReplacementTokens(extruder_stack)
+        self._all_extruders_settings = {}
+        self._all_extruders_strings = {}
+        for extruder_nr, settings in values.items():
+            tokens = self._buildReplacementTokens(settings)
+            self._all_extruders_settings[extruder_nr] = dict(settings, **tokens)
+            self._all_extruders_strings[extruder_nr] = dict(strings[extruder_nr],
+                                                            **{key: str(value) for key, value in tokens.items()}
+                                                            )
 
     # #  Creates a dictionary of tokens to replace in g-code pieces.
     #
-    #   This indicates what should be replaced in the start and end g-codes.
-    #   \param stack The stack to get the settings from to replace the tokens
-    #   with.
+    #   This indicates what should be replaced in the start and end g-codes,
+    #   in addition to the settings themselves.
+    #   \param values The settings of the stack to replace the tokens with.
     #   \return A dictionary of replacement tokens to the values they should be
     #   replaced with.
-    def _buildReplacementTokens(self, stack):
+    def _buildReplacementTokens(self, values):
 
         result = {}
-        for key in stack.getAllKeys():
-            value = stack.getProperty(key, "value")
-            result[key] = value
 
-        result["print_bed_temperature"] = result["material_bed_temperature"]  # Renamed settings.
-        result["print_temperature"] = result["material_print_temperature"]
-        result["travel_speed"] = result["speed_travel"]
+        result["print_bed_temperature"] = values["material_bed_temperature"]  # Renamed settings.
+        result["print_temperature"] = values["material_print_temperature"]
+        result["travel_speed"] = values["speed_travel"]
         result["time"] = time.strftime("%H:%M:%S")  # Some extra settings.
         result["date"] = time.strftime("%d-%m-%Y")
         result["day"] = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"][int(time.strftime("%w"))]
@@ -1486,29 +2328,22 @@ class SmartSliceCloudConnector(QObject):
     #   \param value A piece of g-code to replace tokens in.
     #   \param default_extruder_nr Stack nr to use when no stack nr is specified, defaults to the global stack
     def _expandGcodeTokens(self, value, default_extruder_nr) -> str:
-        self._cacheAllExtruderSettings()
-
         try:
             # any setting can be used as a token
-            fmt = GcodeStartEndFormatter(default_extruder_nr=default_extruder_nr)
             if self._all_extruders_settings is None:
                 return ""
-            settings = self._all_extruders_settings.copy()
-            settings["default_extruder_nr"] = default_extruder_nr
-            return str(fmt.format(value, **settings))
+            return GcodeTemplate.compile(value).render(default_extruder_nr, self._all_extruders_settings)
         except:
             Logger.logException("w", "Unable to do token replacement on start/end g-code")
             return str(value)
 
     def modifyInfillAnglesInSettingDict(self, settings):
-        for key, value in settings.items():
-            if key == "infill_angles":
-                if type(value) is str:
-                    value = eval(value)
-                if len(value) is 0:
-                    settings[key] = [self._poc_default_infill_direction]
-                else:
-                    settings[key] = [value[0]]
+        if "infill_angles" in settings:
+            value = parseListSetting(settings["infill_angles"])
+            if len(value) == 0:
+                settings["infill_angles"] = [self._poc_default_infill_direction]
+            else:
+                settings["infill_angles"] = [value[0]]
 
         return settings
 
@@ -1523,15 +2358,15 @@ class SmartSliceCloudConnector(QObject):
         if not stack:
             return
 
-        self._cacheAllExtruderSettings()
-
         if self._all_extruders_settings is None:
             return
 
-        settings = self._all_extruders_settings["-1"].copy()
+        # Only the settings changed since the last job were stringified again
+        settings = self._all_extruders_strings["-1"].copy()
+        tokens = self._all_extruders_settings["-1"]
 
         # Pre-compute material material_bed_temp_prepend and material_print_temp_prepend
-        start_gcode = settings["machine_start_gcode"]
+        start_gcode = tokens["machine_start_gcode"]
         bed_temperature_settings = ["material_bed_temperature", "material_bed_temperature_layer_0"]
         pattern = r"\{(%s)(,\s?\w+)?\}" % "|".join(bed_temperature_settings)  # match {setting} as well as {setting, extruder_nr}
         settings["material_bed_temp_prepend"] = re.search(pattern, start_gcode) == None
@@ -1544,8 +2379,8 @@ class SmartSliceCloudConnector(QObject):
         initial_extruder_stack = Application.getInstance().getExtruderManager().getUsedExtruderStacks()[0]
         initial_extruder_nr = initial_extruder_stack.getProperty("extruder_nr", "value")
 
-        settings["machine_start_gcode"] = self._expandGcodeTokens(settings["machine_start_gcode"], initial_extruder_nr)
-        settings["machine_end_gcode"] = self._expandGcodeTokens(settings["machine_end_gcode"], initial_extruder_nr)
+        settings["machine_start_gcode"] = self._expandGcodeTokens(tokens["machine_start_gcode"], initial_extruder_nr)
+        settings["machine_end_gcode"] = self._expandGcodeTokens(tokens["machine_end_gcode"], initial_extruder_nr)
 
         settings = self.modifyInfillAnglesInSettingDict(settings)
 
@@ -1716,21 +2551,21 @@ class SmartSliceCloudConnector(QObject):
     def _buildExtruderMessage(self, stack) -> dict:
         extruder_message = {}
         extruder_message["id"] = int(stack.getMetaDataEntry("position"))
-        self._cacheAllExtruderSettings()
 
         if self._all_extruders_settings is None:
             return
 
         extruder_nr = stack.getProperty("extruder_nr", "value")
-        settings = self._all_extruders_settings[str(extruder_nr)].copy()
+        settings = self._all_extruders_strings[str(extruder_nr)].copy()
+        tokens = self._all_extruders_settings[str(extruder_nr)]
 
         # Also send the material GUID. This is a setting in fdmprinter, but we have no interface for it.
         settings["material_guid"] = stack.material.getMetaDataEntry("GUID", "")
 
         # Replace the setting tokens in start and end g-code.
         extruder_nr = stack.getProperty("extruder_nr", "value")
-        settings["machine_extruder_start_code"] = self._expandGcodeTokens(settings["machine_extruder_start_code"], extruder_nr)
-        settings["machine_extruder_end_code"] = self._expandGcodeTokens(settings["machine_extruder_end_code"], extruder_nr)
+        settings["machine_extruder_start_code"] = self._expandGcodeTokens(tokens["machine_extruder_start_code"], extruder_nr)
+        settings["machine_extruder_end_code"] = self._expandGcodeTokens(tokens["machine_extruder_end_code"], extruder_nr)
 
         settings = self.modifyInfillAnglesInSettingDict(settings)
 
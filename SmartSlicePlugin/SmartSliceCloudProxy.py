@@ -88,6 +88,15 @@ class SmartSliceCloudProxy(QObject):
         self._hasModMesh = False # Currently ASSUMES a mod mesh is in place; TODO: Detect this property change
         self._confirmationText = ""
 
+        # Interactive mesh construction
+        self._analyzingGeometry = False
+        self._analyzingGeometryProgress = 0.0
+
+        # Job queue
+        self._jobsQueued = 0
+        self._jobsRunning = 0
+        self._uploadProgress = 0.0
+
         # Proxy Values (DO NOT USE DIRECTLY)
         self._targetFactorOfSafety = 1.5
         self._targetMaximalDisplacement = 1.0
@@ -344,6 +353,72 @@ class SmartSliceCloudProxy(QObject):
             self._confirmationText = value
             self.confirmationWindowTextChanged.emit()
 
+    #
+    #   INTERACTIVE MESH
+    #
+
+    analyzingGeometryChanged = pyqtSignal()
+    analyzingGeometryProgressChanged = pyqtSignal()
+
+    @pyqtProperty(bool, notify=analyzingGeometryChanged)
+    def analyzingGeometry(self):
+        return self._analyzingGeometry
+
+    @analyzingGeometry.setter
+    def analyzingGeometry(self, value):
+        if self._analyzingGeometry is not value:
+            self._analyzingGeometry = value
+            self.analyzingGeometryChanged.emit()
+
+    @pyqtProperty(float, notify=analyzingGeometryProgressChanged)
+    def analyzingGeometryProgress(self):
+        return self._analyzingGeometryProgress
+
+    @analyzingGeometryProgress.setter
+    def analyzingGeometryProgress(self, value):
+        if not self._analyzingGeometryProgress == value:
+            self._analyzingGeometryProgress = value
+            self.analyzingGeometryProgressChanged.emit()
+
+    #
+    #   JOB QUEUE
+    #
+
+    jobsQueuedChanged = pyqtSignal()
+    jobsRunningChanged = pyqtSignal()
+
+    @pyqtProperty(int, notify=jobsQueuedChanged)
+    def jobsQueued(self):
+        return self._jobsQueued
+
+    @jobsQueued.setter
+    def jobsQueued(self, value):
+        if self._jobsQueued != value:
+            self._jobsQueued = value
+            self.jobsQueuedChanged.emit()
+
+    @pyqtProperty(int, notify=jobsRunningChanged)
+    def jobsRunning(self):
+        return self._jobsRunning
+
+    @jobsRunning.setter
+    def jobsRunning(self, value):
+        if self._jobsRunning != value:
+            self._jobsRunning = value
+            self.jobsRunningChanged.emit()
+
+    uploadProgressChanged = pyqtSignal()
+
+    @pyqtProperty(float, notify=uploadProgressChanged)
+    def uploadProgress(self):
+        return self._uploadProgress
+
+    @uploadProgress.setter
+    def uploadProgress(self, value):
+        if not self._uploadProgress == value:
+            self._uploadProgress = value
+            self.uploadProgressChanged.emit()
+
     sliceIconImageChanged = pyqtSignal()
 
     @pyqtProperty(QUrl, notify=sliceIconImageChanged)
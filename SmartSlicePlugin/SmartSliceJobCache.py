@@ -0,0 +1,92 @@
+#   SmartSliceJobCache.py
+#   Teton Simulation
+
+#
+#  Contains an in-memory cache of job packages and solver results, keyed by the
+#  digest of all inputs the solver gets to see
+#
+
+from collections import OrderedDict
+
+from UM.Logger import Logger
+
+'''
+  class SmartSliceJobCache
+
+    Least recently used cache of
+      * job packages (3MF bytes or memory mapped 3MF files), dropped as soon as their
+        total size exceeds 'max_size' bytes
+      * analysis results (pywim.smartslice.result.Analysis), of which 'max_results' are kept
+
+    A key of None is never cached, so callers don't need to check whether a digest
+    could be computed.
+'''
+class SmartSliceJobCache():
+    def __init__(self, max_size : int = 256 * 1024 * 1024, max_results : int = 32):
+        self.max_size = max_size
+        self.max_results = max_results
+
+        self._packages = OrderedDict() # digest -> package
+        self._packages_size = 0
+        self._results = OrderedDict() # digest -> analysis
+
+    '''
+      getPackage(digest)
+        Returns the cached package for 'digest' or None
+    '''
+    def getPackage(self, digest):
+        package = self._packages.get(digest) if digest else None
+
+        if package is not None:
+            self._packages.move_to_end(digest)
+            Logger.log("d", "Job package cache hit: {}".format(digest))
+
+        return package
+
+    def putPackage(self, digest, package):
+        if not digest or package is None:
+            return
+
+        if digest in self._packages:
+            self._packages_size -= len(self._packages.pop(digest))
+
+        if len(package) > self.max_size:
+            Logger.log("d", "Job package {} is too large to be cached".format(digest))
+            return
+
+        self._packages[digest] = package
+        self._packages_size += len(package)
+
+        while self._packages_size > self.max_size:
+            evicted_digest, evicted_package = self._packages.popitem(last=False)
+            self._packages_size -= len(evicted_package)
+            Logger.log("d", "Evicted job package {} from cache".format(evicted_digest))
+
+    '''
+      getResult(digest)
+        Returns the cached analysis for 'digest' or None
+    '''
+    def getResult(self, digest):
+        analysis = self._results.get(digest) if digest else None
+
+        if analysis is not None:
+            self._results.move_to_end(digest)
+            Logger.log("d", "Job result cache hit: {}".format(digest))
+
+        return analysis
+
+    def putResult(self, digest, analysis):
+        if not digest or analysis is None:
+            return
+
+        self._results[digest] = analysis
+        self._results.move_to_end(digest)
+
+        while len(self._results) > self.max_results:
+            evicted_digest, _ = self._results.popitem(last=False)
+            Logger.log("d", "Evicted job result {} from cache".format(evicted_digest))
+
+    def clear(self):
+        self._packages.clear()
+        self._packages_size = 0
+        self._results.clear()
@@ -0,0 +1,139 @@
+#   SmartSliceJobScheduler.py
+#   Teton Simulation
+
+#
+#  Contains the scheduler of the Smart Slice cloud jobs
+#
+
+import heapq
+import itertools
+
+from UM.Logger import Logger
+from UM.Signal import Signal, signalemitter
+
+'''
+  class SmartSliceJobScheduler
+
+    Starts the scheduled jobs by priority, with at most 'max_concurrent' jobs
+    running at the same time. Jobs with the same priority run in the order they
+    were scheduled.
+
+    A job scheduled with a 'key' makes queued jobs with the same key obsolete,
+    e.g. a new validation of a part after its settings changed. Obsolete jobs are
+    dropped from the queue and never run.
+
+    'current' is the job the user interacts with, i.e. the one the cancel button
+    refers to. It's the last scheduled job until it is cleared.
+'''
+@signalemitter
+class SmartSliceJobScheduler():
+    PriorityBackground = 0
+    PriorityNormal = 1
+    PriorityHigh = 2
+
+    def __init__(self, max_concurrent : int = 1):
+        self.max_concurrent = max(1, max_concurrent)
+
+        self._queue = [] # heap of (-priority, sequence number, job)
+        self._keys = {} # job -> key
+        self._running = []
+        self._sequence = itertools.count()
+        self._current = None
+
+    queueChanged = Signal()
+
+    @property
+    def current(self):
+        return self._current
+
+    def clearCurrent(self, job = None):
+        if job is None or job is self._current:
+            self._current = None
+
+    @property
+    def queuedCount(self) -> int:
+        return len(self._queue)
+
+    @property
+    def runningCount(self) -> int:
+        return len(self._running)
+
+    def isActive(self, job) -> bool:
+        return job in self._running or any(queued is job for _, _, queued in self._queue)
+
+    '''
+      schedule(job, priority, key)
+        Queues 'job' and starts it as soon as a slot is free
+    '''
+    def schedule(self, job, priority : int = PriorityNormal, key = None):
+        if key is not None:
+            self._dropQueued(lambda queued: self._keys.get(queued) == key)
+            self._keys[job] = key
+
+        job._id = next(self._sequence)
+        heapq.heappush(self._queue, (-priority, job._id, job))
+        self._current = job
+
+        self._dispatch()
+        self.queueChanged.emit()
+
+    '''
+      cancel(job)
+        Removes 'job' from the queue. A running job keeps its slot until finish() is called.
+        A job, which was started but not yet picked up by a worker of the JobQueue,
+        is removed from the JobQueue. It never finishes, so its slot is freed right away.
+    '''
+    def cancel(self, job):
+        self.clearCurrent(job)
+        self._dropQueued(lambda queued: queued is job)
+
+        if job in self._running and not job.isRunning() and not job.isFinished():
+            Logger.log("d", "Canceling Smart Slice job {} before it ran".format(job._id))
+            job.cancel()
+            self.finish(job)
+        else:
+            self.queueChanged.emit()
+
+    '''
+      dropQueued()
+        Drops all queued jobs, e.g. because the settings they were made for changed
+    '''
+    def dropQueued(self):
+        self._dropQueued(lambda queued: True)
+        self.queueChanged.emit()
+
+    '''
+      finish(job)
+        Frees the slot of 'job' and starts the next queued job
+    '''
+    def finish(self, job):
+        if job in self._running:
+            self._running.remove(job)
+        self._keys.pop(job, None)
+
+        self._dispatch()
+        self.queueChanged.emit()
+
+    def _dropQueued(self, predicate):
+        kept = []
+        for entry in self._queue:
+            job = entry[2]
+            if predicate(job):
+                Logger.log("d", "Dropping obsolete Smart Slice job {}".format(job._id))
+                self._keys.pop(job, None)
+                self.clearCurrent(job)
+            else:
+                kept.append(entry)
+
+        if len(kept) != len(self._queue):
+            heapq.heapify(kept)
+            self._queue = kept
+
+    def _dispatch(self):
+        while self._queue and len(self._running) < self.max_concurrent:
+            _, _, job = heapq.heappop(self._queue)
+            self._running.append(job)
+            Logger.log("d", "Starting Smart Slice job {} ({} running, {} queued)".format(job._id,
+                                                                                    len(self._running),
+                                                                                    len(self._queue)))
+            job.start()
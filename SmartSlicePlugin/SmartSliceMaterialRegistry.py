@@ -0,0 +1,110 @@
+#   SmartSliceMaterialRegistry.py
+#   Teton Simulation
+
+#
+#  Contains the registry of the materials Smart Slice knows, looked up by the
+#  GUIDs of the Cura materials
+#
+
+import os
+import json
+import numbers
+import threading
+
+from UM.Logger import Logger
+
+'''
+  class SmartSliceMaterialRegistry
+
+    Loads the material database at 'path' on first use and indexes its materials
+    by each of their 'cura-guid' entries. Entries are validated while loading,
+    invalid ones are logged and skipped. If several materials claim the same GUID,
+    the first one wins, as with the previous linear search.
+
+    The file is loaded again when its modification time or size changes, so the
+    database can be edited while Cura is running. If it can't be read, the last
+    loaded materials are kept.
+
+    The returned material dictionaries are shared and must not be modified.
+'''
+class SmartSliceMaterialRegistry():
+    def __init__(self, path : str):
+        self.path = path
+
+        self._lock = threading.Lock()
+        self._stat = None # (mtime, size) of the loaded file
+        self._by_guid = {} # cura GUID -> entry
+
+    '''
+      find(guid)
+        Returns the material with the Cura material GUID 'guid' or None
+    '''
+    def find(self, guid : str):
+        self._reloadIfChanged()
+        return self._by_guid.get(guid)
+
+    def _reloadIfChanged(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError as exc:
+            if self._stat is not None:
+                Logger.log("w", "Material database {} is gone, keeping the loaded materials: {}".format(self.path, exc))
+                self._stat = None
+            return
+
+        stat = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            if stat == self._stat:
+                return
+            self._load(stat)
+
+    def _load(self, stat):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                jdata = json.load(f)
+        except (OSError, ValueError) as exc:
+            Logger.log("e", "Can't load the material database {}: {}".format(self.path, exc))
+            # Not trying again until the file changes
+            self._stat = stat
+            return
+
+        count = 0
+        by_guid = {}
+        entries = jdata.get("materials", []) if isinstance(jdata, dict) else []
+        for index, material in enumerate(entries):
+            error = self._validate(material)
+            if error:
+                Logger.log("w", "Skipping material {} of {}: {}".format(index, self.path, error))
+                continue
+
+            count += 1
+            for guid in material["cura-guid"]:
+                if guid in by_guid:
+                    Logger.log("w", "Material GUID {} is used by {} and {}, using the first".format(guid,
+                                                                                                   by_guid[guid]["name"],
+                                                                                                   material["name"]))
+                    continue
+                by_guid[guid] = material
+
+        # Concurrent lookups see either the old or the new index
+        self._by_guid = by_guid
+        self._stat = stat
+
+        Logger.log("d", "Loaded {} materials with {} GUIDs from {}".format(count, len(by_guid), self.path))
+
+    # #  Returns what's wrong with the entry 'material' or None
+    def _validate(self, material):
+        if not isinstance(material, dict):
+            return "not an object"
+        if not isinstance(material.get("name"), str):
+            return "no name"
+        guids = material.get("cura-guid")
+        if not isinstance(guids, list) or not all(isinstance(guid, str) for guid in guids):
+            return "cura-guid is not a list of GUIDs"
+        if not isinstance(material.get("density"), numbers.Real):
+            return "no density"
+        for key in ("elastic", "failure_yield"):
+            if not isinstance(material.get(key), dict):
+                return "no {} properties".format(key)
+        return None
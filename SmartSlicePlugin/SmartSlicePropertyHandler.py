@@ -7,7 +7,7 @@
 
 import time, threading
 
-from PyQt5.QtCore import QObject
+from PyQt5.QtCore import QObject, QTimer
 
 #  Cura
 from UM.i18n import i18nCatalog
@@ -57,6 +57,13 @@ class SmartSlicePropertyHandler(QObject):
         self._hasChanges = False
         self._global_cache = {}
         self._extruder_cache = {}
+        #  Property changes waiting to be processed as one batch
+        self._pendingGlobalKeys = []
+        self._pendingExtruderKeys = []
+        self._propertyChangeTimer = QTimer()
+        self._propertyChangeTimer.setSingleShot(True)
+        self._propertyChangeTimer.timeout.connect(self._processPropertyChanges)
+        self.updatePropertyChangeDebounce()
         #  General Purpose properties which affect Smart Slice
         self._container_properties = SmartSliceContainerProperties()
 
@@ -480,7 +487,9 @@ class SmartSlicePropertyHandler(QObject):
                 return
 
         select_tool = Application.getInstance().getController().getTool("SmartSlicePlugin_SelectTool")
-        selected_triangles = list(select_tool._interactive_mesh.select_planar_face(face_id))
+        selected_triangles = select_tool.selectPlanarFace(face_id)
+        if not selected_triangles:
+            return
                 
         #  If busy, add it to 'pending changes' and ask user to confirm
         if self.connector.status in {SmartSliceCloudStatus.BusyValidating, SmartSliceCloudStatus.BusyOptimizing, SmartSliceCloudStatus.Optimized}:
@@ -598,38 +607,64 @@ class SmartSlicePropertyHandler(QObject):
     #   CURA PROPERTY SIGNAL LISTENERS
     #
 
+    #  Changes are only collected here, e.g. a profile switch changes dozens of
+    #   settings at once. They are processed as one batch by _processPropertyChanges
+    #   once the event loop is idle again, or after the debounce interval.
+
     # On GLOBAL Property Changed
     def _onGlobalPropertyChanged(self, key: str, property_name: str):
         if key not in self._container_properties.global_keys:
             return
-        if self._globalStack.getProperty(key, property_name) == self._global_cache[key]:
-            return
-
-        if self.connector.status in {SmartSliceCloudStatus.BusyValidating, SmartSliceCloudStatus.BusyOptimizing, SmartSliceCloudStatus.Optimized}:
-            if self._addProperties:
-                self._propertiesChanged.append(SmartSliceProperty.GlobalProperty)
-                self._changedValues.append(self._activeExtruder.getProperty(key, "value"))
-                self.connector.confirmPendingChanges()
-        else:
-            self.connector.prepareValidation()
-            self._global_cache[key] = self._globalStack.getProperty(key, "value")
+        if key not in self._pendingGlobalKeys:
+            self._pendingGlobalKeys.append(key)
+        self._propertyChangeTimer.start()
 
     # On EXTRUDER Property Changed
     def _onExtruderPropertyChanged(self, key: str, property_name: str):
         if key not in self._container_properties.extruder_keys:
             return
-        elif self._activeExtruder.getProperty(key, property_name) == self._extruder_cache[key]:
+        if key not in self._pendingExtruderKeys:
+            self._pendingExtruderKeys.append(key)
+        self._propertyChangeTimer.start()
+
+    #  Takes the debounce interval of the batch from the preferences, also when it changes
+    def updatePropertyChangeDebounce(self):
+        self._propertyChangeTimer.setInterval(int(float(self.connector.app_preferences.getValue(self.connector.property_change_debounce_preference))))
+
+    """
+      _processPropertyChanges()
+        Handles all collected Global/Extruder property changes at once:
+          * During/after Validation/Optimization, prompts only once for all of them
+          * Otherwise updates the cache and prepares the validation only once
+    """
+    def _processPropertyChanges(self):
+        changes = []
+        for key in self._pendingGlobalKeys:
+            value = self._globalStack.getProperty(key, "value")
+            if value != self._global_cache[key]:
+                changes.append((SmartSliceProperty.GlobalProperty, self._global_cache, key, value))
+        for key in self._pendingExtruderKeys:
+            value = self._activeExtruder.getProperty(key, "value")
+            if value != self._extruder_cache[key]:
+                changes.append((SmartSliceProperty.ExtruderProperty, self._extruder_cache, key, value))
+
+        self._pendingGlobalKeys = []
+        self._pendingExtruderKeys = []
+
+        if not changes:
             return
 
         if self.connector.status in {SmartSliceCloudStatus.BusyValidating, SmartSliceCloudStatus.BusyOptimizing, SmartSliceCloudStatus.Optimized}:
             if self._addProperties:
                 #  Confirm Settings Changes
-                self._propertiesChanged.append(SmartSliceProperty.ExtruderProperty)
-                self._changedValues.append(self._activeExtruder.getProperty(key, "value"))
+                for prop, _, _, value in changes:
+                    self._propertiesChanged.append(prop)
+                    self._changedValues.append(value)
                 self.connector.confirmPendingChanges()
         else:
+            for _, cache, key, value in changes:
+                cache[key] = value
             self.connector.prepareValidation()
-            self._extruder_cache[key] = self._activeExtruder.getProperty(key, "value")
 
 
     #  Configure Extruder/Machine Settings for Smart Slice
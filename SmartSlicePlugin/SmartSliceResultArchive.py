@@ -0,0 +1,122 @@
+#   SmartSliceResultArchive.py
+#   Teton Simulation
+
+#
+#  Contains the binary encoding of analysis results, which carries the modifier
+#  meshes as raw buffers instead of JSON vertex objects, and its download
+#
+
+import io
+import json
+import zipfile
+
+import numpy
+
+from UM.Logger import Logger
+
+from .SmartSliceChunkedUpload import SmartSliceChunkedUpload
+from .utils import modifierMeshArrays
+
+'''
+  Result archive
+
+    A zip archive with
+      * analysis.json                      the analysis, with empty 'vertices' and 'triangles'
+                                           lists in its modifier meshes
+      * modifier_meshes/<i>/vertices       float32, little-endian, x y z per vertex
+      * modifier_meshes/<i>/triangles      int32, little-endian, v1 v2 v3 per triangle
+
+    The buffers of the i-th modifier mesh are decoded without copying and attached
+    to it as 'vertex_array' and 'triangle_array', which utils.modifierMeshArrays
+    prefers over the vertex and triangle objects.
+'''
+ResultArchiveContentType = "application/vnd.smartslice.result+zip"
+ResultArchiveCapability = "binary-mesh"
+
+_VertexType = numpy.dtype("<f4")
+_IndexType = numpy.dtype("<i4")
+
+def encodeResultArchive(analysis) -> bytes:
+    analysis_dict = analysis.to_dict()
+
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, "w") as archive:
+        for i, modifier_mesh in enumerate(analysis.modifier_meshes):
+            vertices, triangles = modifierMeshArrays(modifier_mesh)
+            archive.writestr("modifier_meshes/{}/vertices".format(i),
+                             numpy.ascontiguousarray(vertices, dtype=_VertexType).tobytes())
+            archive.writestr("modifier_meshes/{}/triangles".format(i),
+                             numpy.ascontiguousarray(triangles, dtype=_IndexType).tobytes())
+
+            analysis_dict["modifier_meshes"][i]["vertices"] = []
+            analysis_dict["modifier_meshes"][i]["triangles"] = []
+
+        archive.writestr("analysis.json", json.dumps(analysis_dict), compress_type=zipfile.ZIP_DEFLATED)
+
+    return stream.getvalue()
+
+def decodeResultArchive(data : bytes):
+    import pywim
+
+    with zipfile.ZipFile(io.BytesIO(data), "r") as archive:
+        analysis = pywim.smartslice.result.Analysis.from_dict(json.loads(archive.read("analysis.json").decode()))
+
+        for i, modifier_mesh in enumerate(analysis.modifier_meshes):
+            vertices = numpy.frombuffer(archive.read("modifier_meshes/{}/vertices".format(i)), dtype=_VertexType)
+            triangles = numpy.frombuffer(archive.read("modifier_meshes/{}/triangles".format(i)), dtype=_IndexType)
+
+            if len(vertices) % 3 or len(triangles) % 3:
+                raise ValueError("Modifier mesh {} has incomplete vertices or triangles".format(i))
+            if len(triangles) and (triangles.min() < 0 or triangles.max() >= len(vertices) // 3):
+                raise ValueError("Modifier mesh {} refers to vertices it doesn't have".format(i))
+
+            # Only copies on big-endian machines
+            modifier_mesh.vertex_array = vertices.astype(numpy.float32, copy=False).reshape(-1, 3)
+            modifier_mesh.triangle_array = triangles.astype(numpy.int32, copy=False).reshape(-1, 3)
+
+    return analysis
+
+'''
+  class SmartSliceResultDownload
+
+    Downloads the result of a task as result archive:
+      * GET /results/<task id>  'Accept' and 'SmartSlice-Capabilities' headers -> 200, result archive
+
+    download() returns None if the server can't send the result this way, e.g. it
+    doesn't know the capability or answers with JSON, so the caller can fall back
+    to the JSON result.
+'''
+class SmartSliceResultDownload(SmartSliceChunkedUpload):
+    '''
+      download(task_id)
+        Returns the decoded analysis or None
+    '''
+    def download(self, task_id : str):
+        try:
+            response, data = self._retry(self._get, task_id)
+        except SmartSliceChunkedUpload.UploadException as exc:
+            Logger.log("d", "Binary result not available: {}".format(exc))
+            return None
+        finally:
+            self._close()
+
+        content_type = response.getheader("Content-Type", "").split(";")[0].strip()
+        if content_type != ResultArchiveContentType:
+            Logger.log("d", "Binary result not available, the server sent {}".format(content_type))
+            return None
+
+        try:
+            analysis = decodeResultArchive(data)
+        except Exception as exc:
+            Logger.log("w", "Unable to decode the binary result of task {}: {}".format(task_id, exc))
+            return None
+
+        Logger.log("d", "Downloaded binary result of task {} ({} bytes)".format(task_id, len(data)))
+
+        return analysis
+
+    def _get(self, task_id):
+        return self._request("GET", "/results/{}".format(task_id),
+                             headers={"Accept": "{}, application/json".format(ResultArchiveContentType),
+                                      "SmartSlice-Capabilities": ResultArchiveCapability}
+                             )
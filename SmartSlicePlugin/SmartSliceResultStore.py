@@ -0,0 +1,172 @@
+#   SmartSliceResultStore.py
+#   Teton Simulation
+
+#
+#  Contains a persistent store of the analyses returned by the solver, keyed by
+#  the digest of the job inputs
+#
+
+import os
+import time
+import sqlite3
+import tempfile
+
+from UM.Logger import Logger
+from UM.Resources import Resources
+
+from .SmartSliceResultArchive import encodeResultArchive, decodeResultArchive
+
+'''
+  class SmartSliceResultStore
+
+    Keeps an SQLite index of all stored analyses with their key figures (safety factor,
+    max displacement, print time and material volume) next to one result archive
+    per analysis, which holds the complete analysis including the modifier meshes.
+
+    Entries older than 'max_age' seconds are dropped and the least recently used
+    entries are dropped as soon as the blobs exceed 'max_size' bytes.
+'''
+class SmartSliceResultStore():
+    FormatVersion = 2
+    Suffix = ".result"
+    LegacySuffixes = (".json.gz", )
+
+    def __init__(self, max_size : int = 256 * 1024 * 1024, max_age : float = 30 * 24 * 3600, directory : str = None):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.directory = directory or os.path.join(Resources.getCacheStoragePath(), "smartslice", "results")
+
+        self._database = os.path.join(self.directory, "results.db")
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with self._connect() as db:
+                db.execute("CREATE TABLE IF NOT EXISTS results ("
+                           "digest TEXT PRIMARY KEY, "
+                           "version INTEGER, "
+                           "created REAL, "
+                           "accessed REAL, "
+                           "safety_factor REAL, "
+                           "max_displacement REAL, "
+                           "print_time REAL, "
+                           "material_volume REAL, "
+                           "blob_size INTEGER)"
+                           )
+        except (OSError, sqlite3.Error) as exc:
+            Logger.log("w", "Unable to open result store: {}".format(exc))
+            self._database = None
+
+    def _connect(self):
+        # A new connection per call, since jobs access the store from their own threads
+        return sqlite3.connect(self._database, timeout=10)
+
+    def _path(self, digest, suffix = None):
+        return os.path.join(self.directory, digest + (suffix or self.Suffix))
+
+    '''
+      load(digest)
+        Returns the stored pywim.smartslice.result.Analysis for 'digest' or None
+    '''
+    def load(self, digest):
+        if not digest or not self._database:
+            return None
+
+        try:
+            with self._connect() as db:
+                row = db.execute("SELECT version FROM results WHERE digest = ?", (digest, )).fetchone()
+                if row is None:
+                    return None
+                if row[0] != self.FormatVersion:
+                    self._remove(db, digest)
+                    return None
+
+                with open(self._path(digest), "rb") as f:
+                    analysis = decodeResultArchive(f.read())
+
+                db.execute("UPDATE results SET accessed = ? WHERE digest = ?", (time.time(), digest))
+        except Exception as exc:
+            Logger.log("w", "Unable to load result {} from store: {}".format(digest, exc))
+            return None
+
+        Logger.log("d", "Loaded result {} from store".format(digest))
+
+        return analysis
+
+    '''
+      save(digest, analysis)
+        Stores 'analysis' under 'digest' and evicts old entries if needed
+    '''
+    def save(self, digest, analysis):
+        if not digest or analysis is None or not self._database:
+            return
+
+        if len(analysis.extruders) > 0:
+            material_volume = analysis.extruders[0].material_volume
+        else:
+            material_volume = 0.0
+
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, "wb") as f:
+                f.write(encodeResultArchive(analysis))
+            blob_size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, self._path(digest))
+
+            now = time.time()
+            with self._connect() as db:
+                db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           (digest,
+                            self.FormatVersion,
+                            now,
+                            now,
+                            analysis.structural.min_safety_factor,
+                            analysis.structural.max_displacement,
+                            analysis.print_time,
+                            material_volume,
+                            blob_size
+                            )
+                           )
+        except Exception as exc:
+            Logger.log("w", "Unable to save result {} to store: {}".format(digest, exc))
+            return
+
+        Logger.log("d", "Saved result {} to store ({} bytes)".format(digest, blob_size))
+
+        self.evict()
+
+    '''
+      evict()
+        Removes entries older than 'max_age' and the least recently used entries
+        until the store fits into 'max_size'
+    '''
+    def evict(self):
+        if not self._database:
+            return
+
+        try:
+            with self._connect() as db:
+                expired = db.execute("SELECT digest FROM results WHERE created < ?",
+                                     (time.time() - self.max_age, )).fetchall()
+                for digest, in expired:
+                    self._remove(db, digest)
+
+                total_size = db.execute("SELECT COALESCE(SUM(blob_size), 0) FROM results").fetchone()[0]
+                if total_size <= self.max_size:
+                    return
+
+                for digest, blob_size in db.execute("SELECT digest, blob_size FROM results ORDER BY accessed").fetchall():
+                    if total_size <= self.max_size:
+                        break
+                    self._remove(db, digest)
+                    total_size -= blob_size
+        except sqlite3.Error as exc:
+            Logger.log("w", "Unable to evict results from store: {}".format(exc))
+
+    def _remove(self, db, digest):
+        db.execute("DELETE FROM results WHERE digest = ?", (digest, ))
+        for suffix in (self.Suffix, ) + self.LegacySuffixes:
+            try:
+                os.remove(self._path(digest, suffix))
+            except OSError:
+                pass
+        Logger.log("d", "Evicted result {} from store".format(digest))
@@ -0,0 +1,155 @@
+#   SmartSliceSettingsSnapshot.py
+#   Teton Simulation
+
+#
+#  Contains a snapshot of the global and extruder settings, which is shared by
+#  all message builders of a job and kept up to date incrementally
+#
+
+import threading
+
+from UM.Application import Application
+from UM.Logger import Logger
+from UM.Settings.SettingRelation import RelationType
+
+from cura.Settings.ExtruderManager import ExtruderManager
+
+'''
+  class SmartSliceSettingsSnapshot
+
+    Holds the values of all settings of the global stack ("-1") and of each active
+    extruder stack (its extruder_nr as string), both as they are and as strings.
+
+    All stacks are read completely only once. Afterwards a propertyChanged signal
+    just marks the setting and all settings depending on it (its 'relations') as
+    dirty. Only these are read and stringified again on the next access. Since
+    global and extruder settings depend on each other, a dirty key is read again on
+    every stack. Changing a container of a stack, e.g. the material or the quality
+    profile, or switching the machine, reads everything again.
+
+    take() may be called from a job thread. The returned dictionaries are replaced,
+    never modified, on updates and must not be modified by the caller either.
+'''
+class SmartSliceSettingsSnapshot():
+    def __init__(self):
+        self._lock = threading.Lock() # protects the state below
+        self._update_lock = threading.Lock() # only one update at a time
+        self._stacks = [] # watched stacks
+        self._values = None # "-1" / extruder_nr -> {key: value}
+        self._strings = None # "-1" / extruder_nr -> {key: str(value)}
+        self._dirty = set() # keys to read again
+        self._generation = 0 # increased on every full invalidation
+
+    '''
+      take()
+        Returns the settings of all stacks and the same as strings, updated if they changed
+    '''
+    def take(self):
+        return self._update()
+
+    '''
+      invalidate()
+        Reads all settings again on the next access
+    '''
+    def invalidate(self, *args):
+        with self._lock:
+            self._values = None
+            self._strings = None
+            self._dirty.clear()
+            self._generation += 1
+
+    def _onPropertyChanged(self, key : str, property_name : str):
+        if property_name not in ("value", "limit_to_extruder"):
+            return
+
+        with self._lock:
+            if self._values is None or key in self._dirty:
+                return
+            stacks = self._stacks
+
+        keys = {key}
+        for stack in stacks:
+            self._addRelations(keys, stack, key)
+
+        with self._lock:
+            self._dirty |= keys
+
+    # #  Adds all settings, which depend on the setting 'key' of 'stack', to 'keys'
+    def _addRelations(self, keys, stack, key):
+        definition = stack.getSettingDefinition(key)
+        if definition is None:
+            return
+
+        for relation in definition.relations:
+            if relation.type == RelationType.RequiresTarget:
+                continue
+            if relation.role not in ("value", "limit_to_extruder"):
+                continue
+            if relation.target.key in keys:
+                continue
+            keys.add(relation.target.key)
+            self._addRelations(keys, stack, relation.target.key)
+
+    def _update(self):
+        global_stack = Application.getInstance().getGlobalContainerStack()
+        if not global_stack:
+            return None, None
+
+        stacks = [global_stack] + list(ExtruderManager.getInstance().getActiveExtruderStacks())
+
+        with self._update_lock:
+            with self._lock:
+                if stacks != self._stacks:
+                    self._watch(stacks)
+                values, strings = self._values, self._strings
+                dirty, self._dirty = self._dirty, set()
+                generation = self._generation
+
+            if values is not None and not dirty:
+                return values, strings
+
+            if values is None:
+                values, strings = {}, {}
+                for stack in stacks:
+                    stack_values = {key: stack.getProperty(key, "value") for key in stack.getAllKeys()}
+                    values[self._stackKey(stack)] = stack_values
+                    strings[self._stackKey(stack)] = {key: self._toString(value) for key, value in stack_values.items()}
+                Logger.log("d", "Settings snapshot taken of {} stacks".format(len(stacks)))
+            else:
+                values, strings = dict(values), dict(strings)
+                for stack in stacks:
+                    changed = {key: stack.getProperty(key, "value") for key in dirty if stack.hasProperty(key, "value")}
+                    values[self._stackKey(stack)] = dict(values[self._stackKey(stack)], **changed)
+                    strings[self._stackKey(stack)] = dict(strings[self._stackKey(stack)],
+                                                          **{key: self._toString(value) for key, value in changed.items()}
+                                                          )
+                Logger.log("d", "Settings snapshot updated for {} settings".format(len(dirty)))
+
+            with self._lock:
+                # Only keep the settings if no container changed while reading them
+                if generation == self._generation:
+                    self._values, self._strings = values, strings
+
+        return values, strings
+
+    def _watch(self, stacks):
+        for stack in self._stacks:
+            stack.propertyChanged.disconnect(self._onPropertyChanged)
+            stack.containersChanged.disconnect(self.invalidate)
+        for stack in stacks:
+            stack.propertyChanged.connect(self._onPropertyChanged)
+            stack.containersChanged.connect(self.invalidate)
+
+        self._stacks = stacks
+        self._values = None
+        self._strings = None
+        self._dirty.clear()
+        self._generation += 1
+
+    def _stackKey(self, stack):
+        if stack is self._stacks[0]:
+            return "-1"
+        return str(stack.getProperty("extruder_nr", "value"))
+
+    def _toString(self, value):
+        return value if type(value) is str else str(value)
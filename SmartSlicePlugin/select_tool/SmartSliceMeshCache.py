@@ -0,0 +1,83 @@
+#   SmartSliceMeshCache.py
+#   Teton Simulation
+
+#
+#  Contains an in-memory cache of the data derived from meshes (e.g. their planar
+#  regions), keyed by the hash of the mesh data it was computed from
+#
+
+from collections import OrderedDict
+
+from UM.Logger import Logger
+
+'''
+  class SmartSliceMeshCache
+
+    Least recently used cache of the data derived from meshes. The least recently
+    used entries are dropped as soon as their total size exceeds 'max_size' bytes.
+'''
+class SmartSliceMeshCache():
+    def __init__(self, max_size : int = 512 * 1024 * 1024):
+        self.max_size = max_size
+
+        self._entries = OrderedDict() # mesh hash -> (entry, size)
+        self._size = 0
+
+        #  Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    '''
+      get(key)
+        Returns the cached entry for 'key' or None and updates the hit/miss counters
+    '''
+    def get(self, key):
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            Logger.log("d", "Mesh cache miss: {} (hits: {}, misses: {})".format(key, self.hits, self.misses))
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        Logger.log("d", "Mesh cache hit: {} (hits: {}, misses: {})".format(key, self.hits, self.misses))
+
+        return entry[0]
+
+    '''
+      put(key, entry, size)
+        Stores 'entry' under 'key' and evicts the least recently used entries
+        until the cache fits into its memory budget again
+    '''
+    def put(self, key, entry, size : int):
+        if key in self._entries:
+            self._size -= self._entries.pop(key)[1]
+
+        if size > self.max_size:
+            Logger.log("d", "Mesh entry {} is too large to be cached".format(key))
+            return
+
+        self._entries[key] = (entry, size)
+        self._size += size
+
+        while self._size > self.max_size:
+            evicted_key, (_, evicted_size) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+            self.evictions += 1
+            Logger.log("d", "Evicted mesh entry {} from cache".format(evicted_key))
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
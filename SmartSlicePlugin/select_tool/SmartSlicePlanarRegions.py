@@ -0,0 +1,216 @@
+#   SmartSlicePlanarRegions.py
+#   Teton Simulation
+
+#
+#  Contains a precomputed index of the planar regions (faces) of a triangle mesh
+#
+
+import math
+
+import numpy
+
+'''
+  class SmartSlicePlanarRegions
+
+    Labels every triangle of a mesh with the planar region it belongs to. A planar
+    region is grown from its seed, the smallest triangle id not in a region yet, over
+    shared edges. A triangle joins it if its normal and its vertices lie within the
+    given tolerances of the seed's plane, so regions don't creep along curved surfaces
+    and don't depend on where the mesh is placed. Triangles of a region are stored in CSR layout:
+    region 'r' owns region_triangles[region_offsets[r]:region_offsets[r + 1]].
+
+    Triangle ids are the row numbers of the index buffer, i.e. the face ids used by
+    Cura and the interactive mesh.
+'''
+class SmartSlicePlanarRegions():
+    #  Stored with the regions in the topology cache. Increase it whenever fromArrays
+    #  labels the triangles differently, so cached regions are computed again.
+    AlgorithmVersion = 2
+
+    def __init__(self, triangle_regions, region_offsets, region_triangles, region_normals, region_areas):
+        self.triangle_regions = triangle_regions    # triangle id -> region id
+        self.region_offsets = region_offsets        # region id -> start in region_triangles
+        self.region_triangles = region_triangles    # triangle ids, grouped by region
+        self.region_normals = region_normals        # unit normal of each region
+        self.region_areas = region_areas            # surface area of each region
+
+    @property
+    def regionCount(self) -> int:
+        return len(self.region_offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.triangle_regions, self.region_offsets, self.region_triangles,
+                                      self.region_normals, self.region_areas))
+
+    def regionOf(self, face_id : int) -> int:
+        return int(self.triangle_regions[face_id])
+
+    def trianglesOf(self, region : int) -> numpy.ndarray:
+        return self.region_triangles[self.region_offsets[region]:self.region_offsets[region + 1]]
+
+    '''
+      faceTriangles(face_id)
+        Returns the ids of all triangles on the same planar face as 'face_id'
+    '''
+    def faceTriangles(self, face_id : int) -> numpy.ndarray:
+        return self.trianglesOf(self.regionOf(face_id))
+
+    '''
+      fromArrays(vertices, indices, angle_tolerance, distance_tolerance)
+        vertices: (N, 3) vertex buffer
+        indices: (M, 3) index buffer, or None if every three vertices form a triangle
+        angle_tolerance: Maximal angle in degrees between the normal of a triangle and the normal of its region's seed
+        distance_tolerance: Maximal distance of the vertices of a triangle to the plane of its region's seed
+    '''
+    @classmethod
+    def fromArrays(cls, vertices, indices = None, angle_tolerance : float = 0.5, distance_tolerance : float = 0.01):
+        vertices = numpy.asarray(vertices, dtype=numpy.float64).reshape(-1, 3)
+        if indices is None:
+            faces = numpy.arange(len(vertices) - len(vertices) % 3).reshape(-1, 3)
+        else:
+            faces = numpy.asarray(indices, dtype=numpy.int64).reshape(-1, 3)
+
+        triangle_count = len(faces)
+
+        #  Weld vertices by position, so edges of unindexed meshes are shared
+        _, vertex_ids = numpy.unique(vertices, axis=0, return_inverse=True)
+        welded_faces = vertex_ids.reshape(-1)[faces]
+
+        #  Normals
+        corners = vertices[faces]
+        cross = numpy.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        double_areas = numpy.linalg.norm(cross, axis=1)
+        degenerate = double_areas == 0.
+        normals = cross / numpy.where(degenerate, 1., double_areas)[:, None]
+
+        #  Edges shared by two triangles. After sorting, equal edges are neighbours.
+        edges = numpy.sort(welded_faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+        edge_triangles = numpy.repeat(numpy.arange(triangle_count), 3)
+        order = numpy.lexsort((edges[:, 1], edges[:, 0]))
+        edges = edges[order]
+        edge_triangles = edge_triangles[order]
+        shared = numpy.all(edges[1:] == edges[:-1], axis=1)
+        tri_a = edge_triangles[:-1][shared]
+        tri_b = edge_triangles[1:][shared]
+
+        #  Two triangles within the angle tolerance of the same seed are at most twice
+        #  that apart, so every region lies within a component of these connections.
+        max_angle = math.radians(min(2. * angle_tolerance, 180.))
+        connected = numpy.einsum("ij,ij->i", normals[tri_a], normals[tri_b]) >= math.cos(max_angle)
+        connected &= ~(degenerate[tri_a] | degenerate[tri_b])
+        tri_a = tri_a[connected]
+        tri_b = tri_b[connected]
+
+        #  The label of a component is its smallest triangle id, its first seed
+        labels = cls._connectedComponents(triangle_count, tri_a, tri_b)
+
+        fits = cls._fitsSeedPlane(numpy.arange(triangle_count), labels, corners, normals,
+                                  angle_tolerance, distance_tolerance)
+
+        #  Usually a component is a planar face as a whole. Only components with a
+        #  triangle off the plane of their seed are split up into regions.
+        split = numpy.unique(labels[~fits])
+        if len(split):
+            cls._growRegions(labels, numpy.isin(labels, split), tri_a, tri_b, corners, normals,
+                             angle_tolerance, distance_tolerance)
+
+        #  Region ids are numbered in the order of their smallest triangle id
+        _, triangle_regions = numpy.unique(labels, return_inverse=True)
+        triangle_regions = triangle_regions.reshape(-1).astype(numpy.int32)
+
+        region_count = int(triangle_regions.max()) + 1 if triangle_count else 0
+        region_sizes = numpy.bincount(triangle_regions, minlength=region_count)
+        region_offsets = numpy.zeros(region_count + 1, dtype=numpy.int64)
+        numpy.cumsum(region_sizes, out=region_offsets[1:])
+        region_triangles = numpy.argsort(triangle_regions, kind="stable").astype(numpy.int32)
+
+        region_areas = numpy.bincount(triangle_regions, weights=double_areas / 2., minlength=region_count)
+        region_normals = numpy.zeros((region_count, 3))
+        region_normals[triangle_regions[region_triangles[region_offsets[:-1]]]] = normals[region_triangles[region_offsets[:-1]]]
+
+        return cls(triangle_regions, region_offsets, region_triangles, region_normals, region_areas)
+
+    # #  Returns for each of 'triangles' whether it lies on the plane of its seed in 'seeds'.
+    #    A seed always lies on its own plane, even if it's degenerate.
+    @staticmethod
+    def _fitsSeedPlane(triangles, seeds, corners, normals, angle_tolerance, distance_tolerance):
+        seed_normals = normals[seeds]
+        fits = numpy.einsum("ij,ij->i", normals[triangles], seed_normals) >= math.cos(math.radians(angle_tolerance))
+
+        distances = numpy.einsum("ikj,ij->ik", corners[triangles] - corners[seeds, :1], seed_normals)
+        fits &= numpy.abs(distances).max(axis=1) <= distance_tolerance
+
+        return fits | (triangles == seeds)
+
+    # #  Splits the components in 'selected' into regions: each one grows from its seed over
+    #    the connections 'a'-'b' and takes all triangles on the seed's plane. These are
+    #    mostly curved surfaces with small regions, so the growing is done triangle by
+    #    triangle, which costs much less than numpy calls for fronts of a few triangles.
+    @staticmethod
+    def _growRegions(labels, selected, a, b, corners, normals, angle_tolerance, distance_tolerance):
+        inside = selected[a]
+        source = numpy.concatenate((a[inside], b[inside]))
+        target = numpy.concatenate((b[inside], a[inside]))
+        order = numpy.argsort(source, kind="stable")
+        neighbours = target[order].tolist()
+        neighbour_offsets = numpy.zeros(len(labels) + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(source, minlength=len(labels)), out=neighbour_offsets[1:])
+        neighbour_offsets = neighbour_offsets.tolist()
+
+        triangles = numpy.flatnonzero(selected)
+        triangle_normals = dict(zip(triangles.tolist(), normals[triangles].tolist()))
+        triangle_corners = dict(zip(triangles.tolist(), corners[triangles].tolist()))
+        min_cos = math.cos(math.radians(angle_tolerance))
+
+        region_of = {}
+        for seed in triangles.tolist():
+            if seed in region_of:
+                continue
+
+            region_of[seed] = seed
+            nx, ny, nz = triangle_normals[seed]
+            offset = nx * triangle_corners[seed][0][0] + ny * triangle_corners[seed][0][1] + nz * triangle_corners[seed][0][2]
+
+            front = [seed]
+            while front:
+                triangle = front.pop()
+                for candidate in neighbours[neighbour_offsets[triangle]:neighbour_offsets[triangle + 1]]:
+                    if candidate in region_of:
+                        continue
+                    cx, cy, cz = triangle_normals[candidate]
+                    if nx * cx + ny * cy + nz * cz < min_cos:
+                        continue
+                    if any(abs(nx * x + ny * y + nz * z - offset) > distance_tolerance
+                           for x, y, z in triangle_corners[candidate]):
+                        continue
+                    region_of[candidate] = seed
+                    front.append(candidate)
+
+        labels[list(region_of)] = list(region_of.values())
+
+    @staticmethod
+    def _connectedComponents(count, a, b):
+        #  Union-find on arrays: hook the root with the larger label onto the smaller
+        #  one and compress the paths, until no connection joins two components.
+        labels = numpy.arange(count)
+
+        while True:
+            root_a = labels[a]
+            root_b = labels[b]
+            joined = root_a != root_b
+            if not joined.any():
+                return labels
+
+            root_a = root_a[joined]
+            root_b = root_b[joined]
+            numpy.minimum.at(labels, numpy.maximum(root_a, root_b), numpy.minimum(root_a, root_b))
+
+            while True:
+                compressed = labels[labels]
+                if numpy.array_equal(compressed, labels):
+                    break
+                labels = compressed
+
+            a = a[joined]
+            b = b[joined]
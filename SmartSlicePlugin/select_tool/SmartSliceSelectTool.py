@@ -7,6 +7,7 @@ from UM.PluginRegistry import PluginRegistry
 from UM.Logger import Logger
 from UM.Event import Event, MouseEvent, KeyEvent
 from UM.Tool import Tool
+from UM.Job import Job
 from UM.Math.Vector import Vector
 from UM.Signal import Signal
 
@@ -21,13 +22,49 @@ from PyQt5.QtCore import Qt, QUrl
 from PyQt5.QtQml import QQmlComponent, QQmlContext # @UnresolvedImport
 
 #  Local Imports
-from ..utils import makeInteractiveMesh
+from ..utils import makeInteractiveMeshFromArrays, meshDataHash
 from ..SmartSliceExtension import SmartSliceExtension
 from .SmartSliceSelectHandle import SelectionMode
 from .SmartSliceSelectHandle import SmartSliceSelectHandle
+from .SmartSliceMeshCache import SmartSliceMeshCache
+from .SmartSlicePlanarRegions import SmartSlicePlanarRegions
+from .SmartSliceTopologyCache import SmartSliceTopologyCache
 
 i18n_catalog = i18nCatalog("smartslice")
 
+##  Computes the planar region index of a MeshData on a worker thread, so analyzing
+#   the topology of large parts doesn't block the UI. The index is read from the
+#   topology cache on disk if possible and written to it otherwise.
+class SmartSliceMeshJob(Job):
+    def __init__(self, mesh_key, mesh_data, topology_cache, angle_tolerance, distance_tolerance) -> None:
+        super().__init__()
+        self.mesh_key = mesh_key
+        self.angle_tolerance = angle_tolerance
+        self.distance_tolerance = distance_tolerance
+
+        self._topology_cache = topology_cache
+        self._vertices = mesh_data.getVertices()
+        self._indices = mesh_data.getIndices()
+
+    def run(self) -> None:
+        planar_regions = self._topology_cache.load(self.mesh_key, self.angle_tolerance, self.distance_tolerance)
+
+        if planar_regions is None:
+            self.progress.emit(self, 10)
+
+            planar_regions = SmartSlicePlanarRegions.fromArrays(self._vertices,
+                                                                self._indices,
+                                                                angle_tolerance=self.angle_tolerance,
+                                                                distance_tolerance=self.distance_tolerance
+                                                                )
+            self.progress.emit(self, 90)
+
+            self._topology_cache.save(self.mesh_key, planar_regions, self.angle_tolerance, self.distance_tolerance)
+
+        self.progress.emit(self, 100)
+
+        self.setResult(planar_regions)
+
 ##  Provides the tool to rotate meshes and groups
 #
 #   The tool exposes a ToolHint to show the rotation angle of the current operation
@@ -47,11 +84,22 @@ class SmartSliceSelectTool(Tool):
         Selection.selectedFaceChanged.connect(self._onSelectedFaceChanged)
 
         self._scene = self.getController().getScene()
-        self._scene_node_name = None
-        self._interactive_mesh = None # pywim.geom.tri.Mesh
+        self._mesh_data = None # MeshData the planar regions were looked up for
+        self._mesh_key = None # Hash of the mesh data
+        self._planar_regions = None # SmartSlicePlanarRegions
+        self._mesh_job = None # SmartSliceMeshJob
+        self._pending_faces = [] # Face selections received while the mesh job is running
         self._load_face = None
         self._anchor_face = None
 
+        preferences = Application.getInstance().getPreferences()
+        cache_size = preferences.getValue(self.extension.cloud.interactive_mesh_cache_size_preference)
+        self._mesh_cache = SmartSliceMeshCache(int(cache_size) * 1024 * 1024)
+        self._angle_tolerance = float(preferences.getValue(self.extension.cloud.planar_face_angle_tolerance_preference))
+        self._distance_tolerance = float(preferences.getValue(self.extension.cloud.planar_face_distance_tolerance_preference))
+        topology_cache_size = preferences.getValue(self.extension.cloud.topology_cache_size_preference)
+        self._topology_cache = SmartSliceTopologyCache(int(topology_cache_size) * 1024 * 1024)
+
         self._controller.activeToolChanged.connect(self._onActiveStateChanged)
 
     ##  Handle mouse and keyboard events
@@ -68,15 +116,36 @@ class SmartSliceSelectTool(Tool):
             sn = nodes[0]
             #self._handle._connector._proxy._activeExtruderStack = nodes[0].callDecoration("getExtruderStack")
 
-            if self._scene_node_name is None or sn.getName() != self._scene_node_name:
+            mesh_data = sn.getMeshData()
+
+            # MeshData is immutable, so we only need to hash it when the node got new mesh data
+            if mesh_data and mesh_data is not self._mesh_data:
+                self._mesh_data = mesh_data
+                mesh_key = meshDataHash(mesh_data)
+
+                if mesh_key != self._mesh_key:
+                    self._mesh_key = mesh_key
+                    self._planar_regions = self._mesh_cache.get(mesh_key)
+                    self._pending_faces = []
+
+                    if self._planar_regions is None:
+                        Logger.log('d', 'Compute planar faces of SceneNode {}'.format(sn.getName()))
+
+                        self._mesh_job = SmartSliceMeshJob(mesh_key,
+                                                           mesh_data,
+                                                           self._topology_cache,
+                                                           self._angle_tolerance,
+                                                           self._distance_tolerance
+                                                           )
+                        self._mesh_job.progress.connect(self._onMeshJobProgress)
+                        self._mesh_job.finished.connect(self._onMeshJobFinished)
+                        self._handle._connector._proxy.analyzingGeometryProgress = 0.0
+                        self._handle._connector._proxy.analyzingGeometry = True
+                        self._mesh_job.start()
+                    else:
+                        self._mesh_job = None
+                        self._handle._connector._proxy.analyzingGeometry = False
 
-                mesh_data = sn.getMeshData()
-
-                if mesh_data:
-                    Logger.log('d', 'Compute interactive mesh from SceneNode {}'.format(sn.getName()))
-                    
-                    self._scene_node_name = sn.getName()
-                    self._interactive_mesh = makeInteractiveMesh(mesh_data)
                     self._load_face = None
                     self._anchor_face = None
 
@@ -91,6 +160,68 @@ class SmartSliceSelectTool(Tool):
                     if aabb:
                         camTool.setOrigin(aabb.center)
 
+    def _onMeshJobProgress(self, job, amount):
+        if job is self._mesh_job:
+            self._handle._connector._proxy.analyzingGeometryProgress = amount / 100.
+
+    def _onMeshJobFinished(self, job):
+        planar_regions = job.getResult()
+
+        if job.getError() or planar_regions is None:
+            Logger.log("e", "Unable to compute planar faces: {}".format(job.getError()))
+        else:
+            Logger.log("d", "Found {} planar faces".format(planar_regions.regionCount))
+            self._mesh_cache.put(job.mesh_key, planar_regions, planar_regions.nbytes)
+
+        #  A newer mesh may have been requested in the meantime
+        if job is not self._mesh_job:
+            return
+
+        self._mesh_job = None
+        self._planar_regions = planar_regions
+        self._handle._connector._proxy.analyzingGeometry = False
+
+        pending_faces = self._pending_faces
+        self._pending_faces = []
+
+        if planar_regions is None:
+            #  Forget the mesh, so the next activation computes it again
+            self._mesh_key = None
+            self._mesh_data = None
+            return
+
+        #  Resolve the face selections made while the mesh was computed.
+        #  Only the last selection per selection mode has any effect.
+        ph = self._handle._connector.propertyHandler
+        current_mode = ph._selection_mode
+        latest_faces = {}
+        for selection_mode, scene_node, face_id in pending_faces:
+            latest_faces[selection_mode] = (scene_node, face_id)
+
+        for selection_mode, (scene_node, face_id) in latest_faces.items():
+            ph._selection_mode = selection_mode
+            ph.onSelectedFaceChanged(scene_node, face_id)
+
+        ph._selection_mode = current_mode
+
+    ##  Returns the triangles (pywim.geom.tri.Triangle) on the same planar face as 'face_id'
+    #   Only the triangles of this face are turned into an interactive mesh.
+    #   Returns an empty list if the planar faces couldn't be computed.
+    def selectPlanarFace(self, face_id):
+        if self._planar_regions is None or self._mesh_data is None:
+            return []
+
+        triangle_ids = self._planar_regions.faceTriangles(face_id)
+        int_mesh = makeInteractiveMeshFromArrays(self._mesh_data.getVertices(),
+                                                 self._mesh_data.getIndices(),
+                                                 triangle_ids=triangle_ids
+                                                 )
+        return list(int_mesh.triangles)
+
+    ##  Returns the planar regions of the selected mesh, or None if they're not computed yet
+    def getPlanarRegions(self):
+        return self._planar_regions
+
     def _onSelectedFaceChanged(self, curr_sf=None):
         if not self.getEnabled():
             return
@@ -103,6 +234,11 @@ class SmartSliceSelectTool(Tool):
 
         scene_node, face_id = curr_sf
 
+        if self._mesh_job is not None:
+            Logger.log("d", "Interactive mesh not ready yet, queuing face {}".format(face_id))
+            self._pending_faces.append((self._handle._connector.propertyHandler._selection_mode, scene_node, face_id))
+            return
+
         self._handle._connector.propertyHandler.onSelectedFaceChanged(scene_node, face_id)
 
         #self.setFaceVisible(scene_node, face_id)
@@ -82,6 +82,18 @@ Item {
         //checked: constraintsRoot.loadActive
     }
 
+    Label {
+        id: labelAnalyzingGeometry
+
+        visible: SmartSlice.Cloud.analyzingGeometry
+
+        anchors.verticalCenter: selectLoadButton.verticalCenter
+        anchors.left: selectLoadButton.right
+        anchors.leftMargin: UM.Theme.getSize("default_margin").width
+
+        text: catalog.i18nc("@label", "Analyzing geometry…") + " " + Math.round(SmartSlice.Cloud.analyzingGeometryProgress * 100) + "%"
+    }
+
 
     Rectangle {
         id: applyLoadDialog
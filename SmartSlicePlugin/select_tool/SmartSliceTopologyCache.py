@@ -0,0 +1,162 @@
+#   SmartSliceTopologyCache.py
+#   Teton Simulation
+
+#
+#  Contains an on-disk cache of the planar region index of meshes, keyed by the hash
+#  of the mesh data they were computed from
+#
+
+import os
+import json
+import struct
+import tempfile
+
+import numpy
+
+from UM.Logger import Logger
+from UM.Resources import Resources
+
+from .SmartSlicePlanarRegions import SmartSlicePlanarRegions
+
+'''
+  class SmartSliceTopologyCache
+
+    Stores each SmartSlicePlanarRegions as a single file:
+      * Magic bytes and the length of the header
+      * JSON header with version stamp, tolerances and the layout of the arrays
+      * The raw arrays, aligned to 64 bytes, so they can be memory mapped on load
+
+    A file is only used if its version stamp and tolerances match. The least
+    recently used files are removed as soon as the total exceeds 'max_size' bytes.
+'''
+class SmartSliceTopologyCache():
+    FormatVersion = 1
+    Magic = b"SSTOPO"
+    Alignment = 64
+    Suffix = ".sstopo"
+
+    Arrays = ("triangle_regions", "region_offsets", "region_triangles", "region_normals", "region_areas")
+
+    def __init__(self, max_size : int = 1024 * 1024 * 1024, directory : str = None):
+        self.max_size = max_size
+        self.directory = directory or os.path.join(Resources.getCacheStoragePath(), "smartslice", "topology")
+
+        #  Invalidates the cache as soon as the file layout or the computation of the regions changes
+        self.version = "{}-{}".format(self.FormatVersion, SmartSlicePlanarRegions.AlgorithmVersion)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.Suffix)
+
+    '''
+      load(key, angle_tolerance, distance_tolerance)
+        Returns the memory mapped planar regions for 'key' or None
+    '''
+    def load(self, key, angle_tolerance : float, distance_tolerance : float):
+        path = self._path(key)
+
+        if not os.path.isfile(path):
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                if f.read(len(self.Magic)) != self.Magic:
+                    raise ValueError("Bad magic bytes")
+                header_size, = struct.unpack("<I", f.read(4))
+                header = json.loads(f.read(header_size).decode())
+
+            if header["version"] != self.version or \
+               header["angle_tolerance"] != angle_tolerance or \
+               header["distance_tolerance"] != distance_tolerance:
+                Logger.log("d", "Outdated topology cache entry {}".format(key))
+                return None
+
+            arrays = {}
+            for name in self.Arrays:
+                dtype, shape, offset = header["arrays"][name]
+                if 0 in shape:
+                    arrays[name] = numpy.zeros(shape, dtype=dtype)
+                else:
+                    arrays[name] = numpy.memmap(path, dtype=dtype, mode="r", offset=offset, shape=tuple(shape))
+
+            # Keep track of the last use for the eviction
+            os.utime(path)
+        except Exception as exc:
+            Logger.log("w", "Unable to read topology cache entry {}: {}".format(key, exc))
+            return None
+
+        Logger.log("d", "Loaded topology of {} from cache".format(key))
+
+        return SmartSlicePlanarRegions(**arrays)
+
+    '''
+      save(key, planar_regions, angle_tolerance, distance_tolerance)
+        Writes 'planar_regions' to the cache and evicts old entries if needed
+    '''
+    def save(self, key, planar_regions : SmartSlicePlanarRegions, angle_tolerance : float, distance_tolerance : float):
+        arrays = [(name, numpy.ascontiguousarray(getattr(planar_regions, name))) for name in self.Arrays]
+
+        header = {
+            "version": self.version,
+            "angle_tolerance": angle_tolerance,
+            "distance_tolerance": distance_tolerance,
+            "arrays": {},
+        }
+
+        # The header size depends on the offsets, so lay out the arrays behind a generously sized header
+        data_start = self._align(len(self.Magic) + 4 + 1024 + 64 * len(arrays))
+        offset = data_start
+        for name, array in arrays:
+            header["arrays"][name] = (array.dtype.str, array.shape, offset)
+            offset = self._align(offset + array.nbytes)
+
+        header_bytes = json.dumps(header).encode()
+        if len(self.Magic) + 4 + len(header_bytes) > data_start:
+            Logger.log("w", "Topology cache header of {} is too large".format(key))
+            return
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.Magic)
+                f.write(struct.pack("<I", len(header_bytes)))
+                f.write(header_bytes)
+                for name, array in arrays:
+                    f.seek(header["arrays"][name][2])
+                    f.write(memoryview(array).cast("B") if array.size else b"")
+
+            os.replace(tmp_path, self._path(key))
+        except OSError as exc:
+            Logger.log("w", "Unable to write topology cache entry {}: {}".format(key, exc))
+            return
+
+        self.evict()
+
+    '''
+      evict()
+        Removes the least recently used entries until the cache fits into 'max_size'
+    '''
+    def evict(self):
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(self.Suffix)]
+        except OSError:
+            return
+
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        total_size = sum(entry.stat().st_size for entry in entries)
+
+        for entry in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                entry_size = entry.stat().st_size
+                os.remove(entry.path)
+                total_size -= entry_size
+                Logger.log("d", "Evicted {} from topology cache".format(entry.name))
+            except OSError:
+                # Might still be mapped on some platforms
+                pass
+
+    def _align(self, offset):
+        return (offset + self.Alignment - 1) // self.Alignment * self.Alignment
@@ -1,35 +1,143 @@
 
-from UM.Mesh.MeshData import MeshData
+import re
+import hashlib
+import operator
+import functools
+import itertools
 
-def makeInteractiveMesh(mesh_data : MeshData) -> 'pywim.geom.tri.Mesh':
+import numpy
+
+# Nothing in here imports Uranium, Cura or pywim at module level, so the helpers can be
+# used and tested without them.
+
+def makeInteractiveMeshFromArrays(vertices : numpy.ndarray, indices : numpy.ndarray = None, triangle_ids : numpy.ndarray = None) -> 'pywim.geom.tri.Mesh':
+    """
+    Builds the interactive mesh straight from the vertex and index buffers of a MeshData.
+    Triangle ids are the row numbers of 'indices', so the face ids match the ones Cura
+    reports for the selected face. When 'indices' is None every three consecutive
+    vertices form one triangle.
+    If 'triangle_ids' is given, only these triangles are added to the mesh. They keep
+    their ids, while their vertices are numbered from zero.
+    """
     import pywim
 
     int_mesh = pywim.geom.tri.Mesh()
 
-    verts = mesh_data.getVertices()
+    vertices = numpy.asarray(vertices).reshape(-1, 3)
 
-    for i in range(mesh_data.getVertexCount()):
-        int_mesh.add_vertex(i, verts[i][0], verts[i][1], verts[i][2])
+    if indices is not None:
+        faces = numpy.asarray(indices).reshape(-1, 3)
+    else:
+        faces = numpy.arange(len(vertices) - len(vertices) % 3).reshape(-1, 3)
 
-    faces = mesh_data.getIndices()
+    if triangle_ids is not None:
+        faces = faces[triangle_ids]
+        used_vertices, faces = numpy.unique(faces, return_inverse=True)
+        vertices = vertices[used_vertices]
+        faces = faces.reshape(-1, 3)
+        face_ids = numpy.asarray(triangle_ids).tolist()
+    else:
+        face_ids = range(len(faces))
 
-    if faces is not None:
-        for i in range(mesh_data.getFaceCount()):
-            v1 = int_mesh.vertices[faces[i][0]]
-            v2 = int_mesh.vertices[faces[i][1]]
-            v3 = int_mesh.vertices[faces[i][2]]
+    # Converting the buffers to Python lists in one go is much cheaper than
+    # indexing the numpy arrays element by element.
+    verts = vertices.tolist()
+    faces = faces.tolist()
 
-            int_mesh.add_triangle(i, v1, v2, v3)
-    else:
-        for i in range(0, len(int_mesh.vertices), 3):
-            v1 = int_mesh.vertices[i]
-            v2 = int_mesh.vertices[i+1]
-            v3 = int_mesh.vertices[i+2]
+    add_vertex = int_mesh.add_vertex
+    for i, (x, y, z) in enumerate(verts):
+        add_vertex(i, x, y, z)
 
-            int_mesh.add_triangle(i // 3, v1, v2, v3)
+    add_triangle = int_mesh.add_triangle
+    mesh_vertices = int_mesh.vertices
+    for i, (i1, i2, i3) in zip(face_ids, faces):
+        add_triangle(i, mesh_vertices[i1], mesh_vertices[i2], mesh_vertices[i3])
 
     # Cura keeps around degenerate triangles, so we need to as well
     # so we don't end up with a mismatch in triangle ids
     int_mesh.analyze_mesh(remove_degenerate_triangles=False)
 
     return int_mesh
+
+def meshDataHash(mesh_data : 'UM.Mesh.MeshData.MeshData') -> str:
+    return meshArraysHash(mesh_data.getVertices(), mesh_data.getIndices())
+
+def meshArraysHash(vertices : numpy.ndarray, indices : numpy.ndarray = None) -> str:
+    """
+    Returns a hex digest of the vertex and index buffers. Two meshes with the same
+    digest have the same geometry and the same triangle ids.
+    """
+    mesh_hash = hashlib.blake2b(digest_size=16)
+
+    for buffer in (vertices, indices):
+        if buffer is None:
+            mesh_hash.update(b"none")
+            continue
+        buffer = numpy.ascontiguousarray(buffer)
+        mesh_hash.update("{}{}".format(buffer.dtype.str, buffer.shape).encode())
+        mesh_hash.update(memoryview(buffer))
+
+    return mesh_hash.hexdigest()
+
+def modifierMeshArrays(modifier_mesh) -> (numpy.ndarray, numpy.ndarray):
+    """
+    Returns the vertices (float32) and triangles (int32) of a modifier mesh of an
+    analysis result, both with three columns. The coordinates and vertex indices are
+    streamed into preallocated arrays, without building a list per vertex or triangle.
+    Meshes decoded from a binary result archive already carry their arrays.
+    """
+    vertex_array = getattr(modifier_mesh, "vertex_array", None)
+    triangle_array = getattr(modifier_mesh, "triangle_array", None)
+    if vertex_array is not None and triangle_array is not None:
+        return vertex_array, triangle_array
+
+    vertices = modifier_mesh.vertices
+    triangles = modifier_mesh.triangles
+
+    vertex_array = numpy.fromiter(itertools.chain.from_iterable(map(operator.attrgetter("x", "y", "z"), vertices)),
+                                  dtype=numpy.float32, count=3 * len(vertices))
+    index_array = numpy.fromiter(itertools.chain.from_iterable(map(operator.attrgetter("v1", "v2", "v3"), triangles)),
+                                 dtype=numpy.int32, count=3 * len(triangles))
+
+    return vertex_array.reshape(-1, 3), index_array.reshape(-1, 3)
+
+_LIST_NUMBER = re.compile(r"[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?")
+
+def parseListSetting(value) -> tuple:
+    """
+    Parses the value of a Cura list setting such as 'skin_angles' or 'infill_angles',
+    e.g. "[]", "[45, 135]" or "[ 0.5,-45 ]", without eval(). Values which are no
+    strings are returned as tuple. Raises ValueError for anything but a list of numbers.
+    """
+    if type(value) is not str:
+        return tuple(value)
+    return _parseListString(value)
+
+@functools.lru_cache(maxsize=256)
+def _parseListString(value : str) -> tuple:
+    value = value.strip()
+    if not value.startswith("[") or not value.endswith("]"):
+        raise ValueError("Not a list: {!r}".format(value))
+
+    if not value[1:-1].strip():
+        return ()
+
+    items = value[1:-1].split(",")
+    # A single trailing comma is fine, like in Python
+    if len(items) > 1 and not items[-1].strip():
+        items.pop()
+
+    result = []
+    for item in items:
+        item = item.strip()
+        if not _LIST_NUMBER.fullmatch(item):
+            raise ValueError("Not a number in list {!r}: {!r}".format(value, item))
+        if "." in item or "e" in item or "E" in item:
+            result.append(float(item))
+        elif item.lstrip("+-").startswith("0") and item.strip("+-0"):
+            # Python doesn't allow leading zeros in integers either
+            raise ValueError("Not a number in list {!r}: {!r}".format(value, item))
+        else:
+            result.append(int(item))
+
+    return tuple(result)
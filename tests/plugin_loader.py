@@ -0,0 +1,25 @@
+#   plugin_loader.py
+#   Teton Simulation
+
+#
+#  Imports modules of the plugin for the tests without running the __init__.py of
+#  the plugin, which registers the extension and its tools with Cura
+#
+
+import os
+import sys
+import types
+import importlib
+
+PluginDirectory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SmartSlicePlugin")
+PluginPackage = "SmartSlicePlugin"
+
+# #  Returns the module 'name' of the plugin, e.g. "utils" or "SmartSliceCloudConnector"
+#    Raises ImportError if Uranium, Cura or pywim aren't available where the module needs them.
+def loadPluginModule(name : str):
+    if PluginPackage not in sys.modules:
+        package = types.ModuleType(PluginPackage)
+        package.__path__ = [os.path.realpath(PluginDirectory)]
+        sys.modules[PluginPackage] = package
+
+    return importlib.import_module("{}.{}".format(PluginPackage, name))
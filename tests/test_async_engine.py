@@ -0,0 +1,191 @@
+#   test_async_engine.py
+#   Teton Simulation
+
+#
+#  Drives the SmartSliceAsyncEngine end to end against the stand-in server
+#  (tools/stand_in_server.py): submits a job, follows its status until it is
+#  finished and fetches its result, and cancels jobs while their submit request
+#  is in flight and while they are polled
+#
+
+import os
+import sys
+import json
+import time
+import types
+import threading
+import unittest
+import http.client
+
+from plugin_loader import loadPluginModule
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools"))
+
+import stand_in_server
+
+try:
+    import pywim
+    from PyQt5.QtCore import QCoreApplication
+
+    engine_module = loadPluginModule("SmartSliceAsyncEngine")
+    client_pool_module = loadPluginModule("SmartSliceClientPool")
+except ImportError:
+    engine_module = None
+
+TaskDuration = 1.
+Latency = 0.2
+Timeout = 15.
+
+'''
+  class StandInClient
+
+    Offers the requests of pywim.http.thor.Client2020POC the engine uses, sent to
+    the endpoints of the stand-in server.
+'''
+class StandInClient():
+    def __init__(self, hostname : str, port : int):
+        self.address = "http://{}:{}".format(hostname, port)
+        self.submit = types.SimpleNamespace(post=self._submit)
+        self.status = types.SimpleNamespace(get=self._status)
+        self.result = types.SimpleNamespace(get=self._result)
+
+        self._connection = http.client.HTTPConnection(hostname, port, timeout=30)
+
+    def _submit(self, threemf_data):
+        return self._request("POST", "/submit", threemf_data)
+
+    def _status(self, id):
+        return self._request("GET", "/status/{}".format(id))
+
+    def _result(self, id):
+        return self._request("GET", "/result/{}".format(id))
+
+    def _request(self, method, path, body = None):
+        self._connection.request(method, path, body=body)
+        response = self._connection.getresponse()
+        data = response.read()
+        if response.status != 200:
+            raise RuntimeError("{} {} answered {}: {}".format(method, path, response.status, data.decode()))
+
+        task = json.loads(data.decode())
+        return types.SimpleNamespace(id=task["id"],
+                                     status=getattr(pywim.http.thor.TaskStatus, task["status"]),
+                                     result=task.get("result"))
+
+class QuickPolling():
+    def next(self, task = None) -> float:
+        return 0.1
+
+class DrivenJob():
+    def __init__(self, cancel : str = None):
+        self.cancel = cancel # None, "submitting" or "running"
+        self.statuses = []
+        self.outcome = None # "finished", "canceled" or "failed"
+        self.task = None
+        self.prepared_on = None # Thread the finished callback ran on
+        self.submitted = None
+        self.ended = None
+
+    @property
+    def duration(self) -> float:
+        return self.ended - self.submitted
+
+@unittest.skipIf(engine_module is None, "PyQt5, Uranium or pywim isn't available")
+class AsyncEngineTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+        cls.server = stand_in_server.serve(0, task_duration=TaskDuration, latency=Latency)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        test = self
+
+        class StandInClientPool(client_pool_module.SmartSliceClientPool):
+            def discard(self, client):
+                test.discarded += 1
+                super().discard(client)
+
+            def _createClient(self, protocol, hostname, port):
+                return StandInClient(hostname, port)
+
+        self.discarded = 0
+        self.client_pool = StandInClientPool()
+        self.client_pool.configure("http", "localhost", self.server.server_address[1])
+
+        self.engine = engine_module.SmartSliceAsyncEngine(self.client_pool, QuickPolling, finished_callback=self._onPrepared)
+        self.engine.jobStatusChanged.connect(self._onStatusChanged)
+        self.engine.jobFinished.connect(lambda job, task: self._onEnded(job, "finished" if task is not None else "canceled", task))
+        self.engine.jobFailed.connect(lambda job, error: self._onEnded(job, "failed", error))
+
+    def tearDown(self):
+        self.engine.stop()
+
+    def _onStatusChanged(self, job, status):
+        job.statuses.append(status)
+        if job.cancel == "running" and status == pywim.http.thor.TaskStatus.running and job.ended is None:
+            self.engine.cancel(job)
+
+    def _onPrepared(self, task, job):
+        job.prepared_on = threading.current_thread()
+
+    def _onEnded(self, job, outcome, task = None):
+        job.outcome = outcome
+        job.task = task
+        job.ended = time.perf_counter()
+
+    def _run(self, job):
+        job.submitted = time.perf_counter()
+        self.engine.submit(job, os.urandom(64 * 1024))
+        if job.cancel == "submitting":
+            # Halfway through the submit request
+            threading.Timer(Latency / 2, self.engine.cancel, (job,)).start()
+
+        # The signals are delivered through the event loop of the main thread
+        while job.ended is None and time.perf_counter() - job.submitted < Timeout:
+            QCoreApplication.processEvents()
+            time.sleep(0.01)
+
+        self.assertIsNotNone(job.ended, "The job didn't end in time")
+
+    def testFinished(self):
+        job = DrivenJob()
+        self._run(job)
+
+        self.assertEqual(job.outcome, "finished", job.task)
+        self.assertEqual(job.task.status, pywim.http.thor.TaskStatus.finished)
+        self.assertTrue(job.task.result)
+        self.assertIn(pywim.http.thor.TaskStatus.running, job.statuses)
+        self.assertEqual(self.discarded, 0)
+
+        # The result is prepared off the main thread
+        self.assertIsNotNone(job.prepared_on)
+        self.assertIsNot(job.prepared_on, threading.main_thread())
+
+    def testCanceledWhileSubmitting(self):
+        job = DrivenJob(cancel="submitting")
+        self._run(job)
+
+        # Canceled without waiting for the answer to the submit request
+        self.assertEqual(job.outcome, "canceled")
+        self.assertLess(job.duration, Latency)
+        self.assertEqual(job.statuses, [])
+        self.assertIsNone(job.prepared_on)
+        self.assertEqual(self.discarded, 1)
+
+    def testCanceledWhileRunning(self):
+        job = DrivenJob(cancel="running")
+        self._run(job)
+
+        self.assertEqual(job.outcome, "canceled")
+        self.assertLess(job.duration, Latency + TaskDuration)
+        self.assertEqual(self.discarded, 1)
+
+if __name__ == "__main__":
+    unittest.main()
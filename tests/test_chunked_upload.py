@@ -0,0 +1,92 @@
+#   test_chunked_upload.py
+#   Teton Simulation
+
+#
+#  Uploads packages against the stand-in server (tools/stand_in_server.py): in
+#  chunks from a memory mapped file, even with dropped connections, and as delta
+#  upload, which falls back right away if the server rejects it
+#
+
+import os
+import sys
+import mmap
+import time
+import tempfile
+import threading
+import unittest
+
+from plugin_loader import loadPluginModule
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools"))
+
+import stand_in_server
+
+try:
+    upload_module = loadPluginModule("SmartSliceChunkedUpload")
+except ImportError:
+    upload_module = None
+
+ChunkSize = 64 * 1024
+
+# #  Stands in for a server, which fails every delta submit
+class RejectingHandler(stand_in_server.StandInHandler):
+    def do_POST(self):
+        if self.path == "/submit-delta":
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self._reply(503, {"error": "Delta uploads are unavailable"})
+            return
+        super().do_POST()
+
+@unittest.skipIf(upload_module is None, "Uranium isn't available")
+class ChunkedUploadTest(unittest.TestCase):
+    def _serve(self, handler = None, **kwargs):
+        server = stand_in_server.serve(0, **kwargs)
+        if handler:
+            server.RequestHandlerClass = handler
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def _mappedPackage(self, data : bytes):
+        with tempfile.TemporaryFile() as package_file:
+            package_file.write(data)
+            package_file.flush()
+            return mmap.mmap(package_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def testMemoryMappedPackage(self):
+        server = self._serve(drop_every=3)
+        data = os.urandom(10 * ChunkSize + 123)
+        package = self._mappedPackage(data)
+
+        upload = upload_module.SmartSliceChunkedUpload("http", "localhost", server.server_address[1], chunk_size=ChunkSize)
+        task_id = upload.upload(package)
+
+        self.assertEqual(server.state.tasks[task_id][1], len(data))
+        self.assertEqual(bytes(server.state.uploads[task_id][1]), data)
+        self.assertGreater(server.state.drops, 0)
+
+    def testDeltaUpload(self):
+        server = self._serve()
+        package = self._mappedPackage(os.urandom(ChunkSize))
+
+        upload = upload_module.SmartSliceDeltaUpload("http", "localhost", server.server_address[1])
+        self.assertIsNotNone(upload.submit("mesh", b"{}", package))
+        self.assertTrue(upload.blob_uploaded)
+        self.assertEqual(server.state.blobs["mesh"], package[:])
+
+        self.assertIsNotNone(upload.submit("mesh", b"{}", package))
+        self.assertFalse(upload.blob_uploaded)
+
+    def testRejectedDeltaUpload(self):
+        server = self._serve(RejectingHandler)
+
+        start_time = time.perf_counter()
+        upload = upload_module.SmartSliceDeltaUpload("http", "localhost", server.server_address[1])
+        self.assertIsNone(upload.submit("mesh", b"{}", b"3MF"))
+
+        # Without retrying, so the full upload isn't delayed
+        self.assertLess(time.perf_counter() - start_time, 0.5)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+#   test_cloud_job_cancel.py
+#   Teton Simulation
+
+#
+#  Tests that a cloud job, which isn't the current job anymore, neither applies its
+#  result nor cancels the job which replaced it
+#
+
+import unittest
+import unittest.mock
+
+from plugin_loader import loadPluginModule
+
+try:
+    connector_module = loadPluginModule("SmartSliceCloudConnector")
+except ImportError:
+    connector_module = None
+
+@unittest.skipIf(connector_module is None, "Cura isn't available")
+class CloudJobCancelTest(unittest.TestCase):
+    def setUp(self):
+        self.current = None
+        self.connector = unittest.mock.MagicMock()
+        self.connector.isCurrentJob.side_effect = lambda job: job is self.current
+
+        patcher = unittest.mock.patch.object(connector_module, "Message")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _job(self):
+        job = connector_module.SmartSliceCloudVerificationJob(self.connector)
+        job._process_analysis_result = unittest.mock.MagicMock()
+        return job
+
+    def testStaleResultIsDropped(self):
+        stale, self.current = self._job(), self._job()
+
+        stale.applyResult(unittest.mock.MagicMock())
+
+        stale._process_analysis_result.assert_not_called()
+        self.connector.prepareOptimization.assert_not_called()
+
+    def testCurrentResultIsApplied(self):
+        job = self.current = self._job()
+
+        job.applyResult(unittest.mock.MagicMock())
+
+        job._process_analysis_result.assert_called_once()
+
+    def testCanceledJobKeepsItsSuccessor(self):
+        canceled, self.current = self._job(), self._job()
+        canceled.canceled = True
+
+        self.assertIsNone(canceled.checkCloudTask(unittest.mock.MagicMock()))
+        self.connector.cancelCurrentJob.assert_not_called()
+
+    def testCanceledJobDoesNotRun(self):
+        job = self.current = self._job()
+        job.job_type = unittest.mock.MagicMock()
+        job.canceled = True
+
+        job.run()
+
+        self.connector.job_cache.getResult.assert_not_called()
+        job._process_analysis_result.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+#   test_gcode_template.py
+#   Teton Simulation
+
+#
+#  Compares GcodeTemplate, which parses start/end g-code only once, with
+#  GcodeStartEndFormatter.format, which it replaces
+#
+
+import random
+import unittest
+
+from plugin_loader import loadPluginModule
+
+try:
+    connector_module = loadPluginModule("SmartSliceCloudConnector")
+except ImportError:
+    connector_module = None
+
+Settings = {
+    "-1": {
+        "material_bed_temperature": 60,
+        "material_print_temperature": 200,
+        "layer_height": 0.2,
+        "machine_name": "Printer",
+        "number_format": ".2f",
+        "initial_extruder_nr": 0,
+        "extruder_nr": "1",
+        "speed_travel": 150.0,
+        "infill_angles": [45, 135],
+        "time": "10:00:00",
+    },
+    "0": {
+        "material_print_temperature": 210,
+        "material_standby_temperature": 175,
+        "layer_height": 0.1,
+        "speed_travel": 120.5,
+    },
+    "1": {
+        "material_print_temperature": 230,
+        "material_diameter": 1.75,
+    },
+}
+
+# Start/end g-code like Cura's machine definitions have them, and the edge cases
+Templates = (
+    "",
+    "G28 ; home all axes",
+    ";FLAVOR:Marlin\nM140 S{material_bed_temperature}\nM104 S{material_print_temperature}\nG28\n",
+    "M109 S{material_print_temperature, 0}\nM109 T1 S{material_print_temperature, 1}",
+    "M104 S{material_print_temperature, -1}",
+    "M104 S{material_print_temperature,initial_extruder_nr}",
+    "M104 S{material_print_temperature, extruder_nr}",
+    "M104 S{material_print_temperature, machine_name}",
+    "M104 S{material_print_temperature, 7}",
+    "M104 S{material_standby_temperature}",
+    "G1 Z{layer_height:.3f} F{speed_travel:>8.1f}",
+    "G1 Z{layer_height:{number_format}}",
+    "; {machine_name!r} {machine_name!s:>12}",
+    "; {infill_angles[1]} {infill_angles}",
+    "; {unknown_setting} {unknown_setting, 0}",
+    "; {material_print_temperature, 0, 1}",
+    "{{escaped}} {{material_bed_temperature}} {time}",
+)
+
+# Templates both reject, e.g. with unbalanced braces
+BrokenTemplates = (
+    "M104 S{material_print_temperature",
+    "M104 S}",
+    "M104 S{}",
+    "M104 S{0}",
+    "M104 S{material_print_temperature!x}",
+    "G1 Z{layer_height:d}",
+    "G1 Z{layer_height:{machine_name}}",
+    "; {infill_angles[5]}",
+)
+
+@unittest.skipIf(connector_module is None, "Cura isn't available")
+class GcodeTemplateTest(unittest.TestCase):
+    def _format(self, template, default_extruder_nr):
+        formatter = connector_module.GcodeStartEndFormatter(default_extruder_nr=default_extruder_nr)
+        return formatter.format(template, **Settings)
+
+    def _render(self, template, default_extruder_nr):
+        return connector_module.GcodeTemplate.compile(template).render(default_extruder_nr, Settings)
+
+    def assertRendersLikeFormatter(self, template):
+        for default_extruder_nr in (-1, 0, 1, "0"):
+            self.assertEqual(self._render(template, default_extruder_nr),
+                             self._format(template, default_extruder_nr),
+                             "{!r} with default extruder {!r}".format(template, default_extruder_nr))
+
+    def testTemplates(self):
+        for template in Templates:
+            self.assertRendersLikeFormatter(template)
+
+    def testFallbacks(self):
+        self.assertEqual(self._render("{unknown_setting}", 0), "{unknown_setting}")
+        self.assertEqual(self._render("{material_print_temperature, 0, 1}", 0), "{material_print_temperature, 0, 1}")
+        # Missing in the extruder stack, taken from the global stack
+        self.assertEqual(self._render("{material_bed_temperature, 1}", 1), "60")
+        # Unknown extruder, also taken from the global stack
+        self.assertEqual(self._render("{material_print_temperature, 7}", 0), "200")
+
+    def testBrokenTemplates(self):
+        for template in BrokenTemplates:
+            with self.assertRaises(Exception, msg=template):
+                self._format(template, 0)
+            with self.assertRaises(Exception, msg=template):
+                self._render(template, 0)
+
+    def testCompiledOnce(self):
+        template = "M104 S{material_print_temperature}"
+        self.assertIs(connector_module.GcodeTemplate.compile(template), connector_module.GcodeTemplate.compile(template))
+
+    def testRandomTemplates(self):
+        rng = random.Random(19)
+        keys = [key for settings in Settings.values() for key in settings] + ["unknown_setting"]
+        extruders = ("", ", 0", ", 1", ",1", ", -1", ", 7", ", initial_extruder_nr", ", extruder_nr", ", machine_name")
+        specs = ("", "", ":>6", ":<4", ":^10", ":.2f", ":{number_format}", ":{machine_name}", "!r", "!s")
+        literals = ("", "G1 ", "\n", "; ", "{{", "}}", "M104 S", " X10 Y10 ")
+
+        for _ in range(3000):
+            template = ""
+            for _ in range(rng.randint(0, 6)):
+                template += rng.choice(literals)
+                template += "{" + rng.choice(keys) + rng.choice(extruders) + rng.choice(specs) + "}"
+            template += rng.choice(literals)
+
+            try:
+                expected = self._format(template, 0)
+            except (ValueError, TypeError):
+                with self.assertRaises((ValueError, TypeError), msg=template):
+                    self._render(template, 0)
+                continue
+
+            self.assertEqual(self._render(template, 0), expected, template)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+#   test_job_digest.py
+#   Teton Simulation
+
+#
+#  Tests that the digest of a job, which keys the job and result caches, doesn't
+#  change with the time the job was built
+#
+
+import json
+import unittest
+from unittest import mock
+
+from plugin_loader import loadPluginModule
+
+try:
+    connector_module = loadPluginModule("SmartSliceCloudConnector")
+except ImportError:
+    connector_module = None
+
+@unittest.skipIf(connector_module is None, "Cura isn't available")
+class JobDigestTest(unittest.TestCase):
+    def setUp(self):
+        self.values = {
+            "-1": {
+                "material_bed_temperature": 60,
+                "material_print_temperature": 210,
+                "speed_travel": 150,
+                "infill_angles": "[]",
+                "machine_start_gcode": "; {date} {time} {day}\nM140 S{material_bed_temperature}\nG1 F{travel_speed}",
+                "machine_end_gcode": "; done at {time}",
+            },
+            "0": {
+                "extruder_nr": 0,
+                "material_bed_temperature": 60,
+                "material_print_temperature": 210,
+                "speed_travel": 150,
+                "infill_angles": "[45]",
+                "machine_extruder_start_code": "; T{extruder_nr} at {time}\nM104 S{print_temperature}",
+                "machine_extruder_end_code": "",
+            },
+        }
+
+        self.connector = connector_module.SmartSliceCloudConnector.__new__(connector_module.SmartSliceCloudConnector)
+        self.connector.settings_snapshot = mock.Mock()
+        self.connector.settings_snapshot.take.side_effect = self._take
+        self.connector._poc_default_infill_direction = 0
+
+        application = mock.patch.object(connector_module, "Application")
+        self.addCleanup(application.stop)
+        application = application.start()
+        application.getInstance().getExtruderManager().getUsedExtruderStacks.return_value = [self._stack(0)]
+
+    def _take(self):
+        strings = {nr: {key: str(value) for key, value in settings.items()} for nr, settings in self.values.items()}
+        return self.values, strings
+
+    def _stack(self, extruder_nr):
+        stack = mock.Mock()
+        stack.getProperty.side_effect = lambda key, property_name: self.values[str(extruder_nr)][key]
+        stack.getMetaDataEntry.return_value = str(extruder_nr)
+        stack.material.getMetaDataEntry.return_value = "material-guid"
+        return stack
+
+    # #  Builds the slicer settings like buildJob and returns a job with them and its digest
+    def _buildJob(self, clock):
+        with mock.patch("time.strftime", side_effect=lambda fmt: clock[fmt]):
+            self.connector._cacheAllExtruderSettings()
+            global_settings = self.connector._buildGlobalSettingsMessage(stack=self._stack(-1))
+            extruder_settings = self.connector._buildExtruderMessage(self._stack(0))["settings"]
+
+        job = mock.Mock()
+        job.to_json.return_value = json.dumps({
+            "type": "validation",
+            "chop": {
+                "slicer": {
+                    "config": {"auxiliary": global_settings},
+                    "printer": {"extruders": [{"id": 0, "config": {"auxiliary": extruder_settings}}]}
+                }
+            }
+        })
+        return job, self.connector.jobDigest([], job, "mesh-digest")
+
+    def testDigestIsStableOverTime(self):
+        first, first_digest = self._buildJob({"%H:%M:%S": "09:59:59", "%d-%m-%Y": "31-12-2019", "%w": "2"})
+        second, second_digest = self._buildJob({"%H:%M:%S": "10:00:01", "%d-%m-%Y": "01-01-2020", "%w": "3"})
+
+        # The jobs differ in the expanded g-code ...
+        self.assertNotEqual(first.to_json(), second.to_json())
+        self.assertIn("31-12-2019 09:59:59 Tue", first.to_json())
+
+        # ... but they are the same job
+        self.assertEqual(first_digest, second_digest)
+
+    def testDigestChangesWithSettings(self):
+        clock = {"%H:%M:%S": "09:59:59", "%d-%m-%Y": "31-12-2019", "%w": "2"}
+        _, first_digest = self._buildJob(clock)
+
+        self.values["-1"]["material_bed_temperature"] = 70
+        _, second_digest = self._buildJob(clock)
+        self.assertNotEqual(first_digest, second_digest)
+
+        # Only used in the expanded g-code, which isn't hashed itself
+        self.values["0"]["machine_extruder_start_code"] = "; T{extruder_nr}"
+        _, third_digest = self._buildJob(clock)
+        self.assertNotEqual(second_digest, third_digest)
+
+if __name__ == "__main__":
+    unittest.main()
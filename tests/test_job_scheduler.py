@@ -0,0 +1,84 @@
+#   test_job_scheduler.py
+#   Teton Simulation
+
+#
+#  Tests that canceled jobs free their slot in the job scheduler
+#
+
+import unittest
+
+from plugin_loader import loadPluginModule
+
+try:
+    scheduler_module = loadPluginModule("SmartSliceJobScheduler")
+except ImportError:
+    scheduler_module = None
+
+# #  Behaves like a UM.Job.Job in the JobQueue, without any worker picking it up on its own
+class QueuedJob():
+    def __init__(self):
+        self.queued = False
+        self.running = False
+        self.finished = False
+
+    def start(self):
+        self.queued = True
+
+    def cancel(self):
+        # Job.cancel only removes the job from the JobQueue
+        self.queued = False
+
+    def isRunning(self):
+        return self.running
+
+    def isFinished(self):
+        return self.finished
+
+    def pickUp(self):
+        self.queued = False
+        self.running = True
+
+@unittest.skipIf(scheduler_module is None, "Uranium isn't available")
+class JobSchedulerCancelTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = scheduler_module.SmartSliceJobScheduler(max_concurrent=1)
+
+    def testCancelBeforePickUpFreesSlot(self):
+        first, second = QueuedJob(), QueuedJob()
+        self.scheduler.schedule(first)
+        self.assertTrue(first.queued)
+
+        first.cancel()
+        self.scheduler.cancel(first)
+        self.assertEqual(self.scheduler.runningCount, 0)
+
+        self.scheduler.schedule(second)
+        self.assertTrue(second.queued)
+        self.assertEqual(self.scheduler.runningCount, 1)
+
+    def testCancelWithoutJobCancelRemovesJobFromQueue(self):
+        job = QueuedJob()
+        self.scheduler.schedule(job)
+
+        self.scheduler.cancel(job)
+        self.assertFalse(job.queued)
+        self.assertEqual(self.scheduler.runningCount, 0)
+
+    def testRunningJobKeepsSlotUntilFinished(self):
+        first, second = QueuedJob(), QueuedJob()
+        self.scheduler.schedule(first)
+        first.pickUp()
+
+        self.scheduler.cancel(first)
+        self.scheduler.schedule(second)
+        self.assertFalse(second.queued)
+        self.assertEqual(self.scheduler.queuedCount, 1)
+
+        first.running = False
+        first.finished = True
+        self.scheduler.finish(first)
+        self.assertTrue(second.queued)
+        self.assertEqual(self.scheduler.queuedCount, 0)
+
+if __name__ == "__main__":
+    unittest.main()
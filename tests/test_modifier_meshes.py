@@ -0,0 +1,84 @@
+#   test_modifier_meshes.py
+#   Teton Simulation
+
+#
+#  Tests that the modifier meshes of a result are built off the main thread and
+#  inserted into the scene later, on the main thread, in one grouped operation
+#
+
+import threading
+import unittest
+from unittest import mock
+
+from plugin_loader import loadPluginModule
+
+try:
+    connector_module = loadPluginModule("SmartSliceCloudConnector")
+except ImportError:
+    connector_module = None
+
+@unittest.skipIf(connector_module is None, "Cura isn't available")
+class ModifierMeshesTest(unittest.TestCase):
+    def setUp(self):
+        self.connector = mock.MagicMock()
+        self.job = connector_module.SmartSliceCloudVerificationJob(self.connector)
+
+        self.built_on = []
+        def buildModifierMeshNode(modifier_mesh):
+            self.built_on.append(threading.current_thread())
+            return mock.Mock(name=modifier_mesh)
+        self.job._buildModifierMeshNode = buildModifierMeshNode
+
+        application = mock.patch.object(connector_module, "Application")
+        self.addCleanup(application.stop)
+        self.application = application.start().getInstance()
+
+    def _analysis(self, count):
+        analysis = mock.MagicMock()
+        analysis.modifier_meshes = ["modifier {}".format(i) for i in range(count)]
+        analysis.print_time = 0
+        return analysis
+
+    def testBuiltOnWorker(self):
+        analysis = self._analysis(3)
+
+        worker = threading.Thread(target=self.job.prepareResult, args=(analysis,))
+        worker.start()
+        worker.join()
+        self.assertEqual(self.built_on, [worker] * 3)
+
+        self.connector._calculateAdditionalMaterialInfo.return_value = [[0.], [0.], [0.]]
+        self.job._process_analysis_result(analysis, False)
+
+        # Only handed to the main thread, not inserted right away
+        self.application.callLater.assert_called_once()
+        insert, nodes, parent = self.application.callLater.call_args[0]
+        self.assertEqual(insert, self.job._insertModifierMeshNodes)
+        self.assertEqual(len(nodes), 3)
+        self.assertEqual(parent, self.connector.getSliceableNodes()[0])
+
+    def testNoModifierMeshes(self):
+        self.job.prepareResult(self._analysis(0))
+        self.connector._calculateAdditionalMaterialInfo.return_value = [[0.], [0.], [0.]]
+        self.job._process_analysis_result(self._analysis(0), False)
+
+        self.application.callLater.assert_not_called()
+
+    def testInsertedInOneOperation(self):
+        nodes = [mock.Mock(), mock.Mock()]
+        scene = self.application.getController().getScene()
+
+        with mock.patch.object(connector_module, "GroupedOperation") as grouped_operation, \
+             mock.patch.object(connector_module, "postponeSignals") as postpone_signals, \
+             mock.patch.object(connector_module, "AddSceneNodeOperation"), \
+             mock.patch.object(connector_module, "SetParentOperation"):
+            self.job._insertModifierMeshNodes(nodes, mock.Mock())
+
+        postpone_signals.assert_called_once()
+        self.assertEqual(postpone_signals.call_args[0], (scene.sceneChanged,))
+        self.assertIn("compress", postpone_signals.call_args[1])
+        grouped_operation.return_value.push.assert_called_once()
+        self.assertEqual(grouped_operation.return_value.addOperation.call_count, 2 * len(nodes))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+#   test_package_compression.py
+#   Teton Simulation
+
+#
+#  Checks the compression PackageCompression picks for the job package from the
+#  preference and the upload bandwidth
+#
+
+import io
+import zipfile
+import unittest
+
+from plugin_loader import loadPluginModule
+
+try:
+    connector_module = loadPluginModule("SmartSliceCloudConnector")
+except ImportError:
+    connector_module = None
+
+RawSize = 50 * 1024 * 1024
+
+@unittest.skipIf(connector_module is None, "Cura isn't available")
+class PackageCompressionTest(unittest.TestCase):
+    def fromPreference(self, mode, bandwidth = None):
+        return connector_module.PackageCompression.fromPreference(mode, RawSize, bandwidth)
+
+    def testModes(self):
+        self.assertTrue(self.fromPreference("default").isDefault)
+        self.assertEqual(self.fromPreference("store").compression, zipfile.ZIP_STORED)
+        self.assertEqual(self.fromPreference(" Store ").compression, zipfile.ZIP_STORED)
+        self.assertEqual(self.fromPreference("0").compression, zipfile.ZIP_STORED)
+        self.assertTrue(self.fromPreference("6").isDefault)
+
+        for level in (1, 2, 3, 4, 5, 7, 8, 9):
+            compression = self.fromPreference(str(level))
+            if connector_module.PackageCompression.LevelsSupported:
+                self.assertEqual((compression.compression, compression.level), (zipfile.ZIP_DEFLATED, level))
+            else:
+                self.assertTrue(compression.isDefault)
+
+    def testAuto(self):
+        # Nothing to go by without a measured bandwidth
+        self.assertTrue(self.fromPreference("auto").isDefault)
+        self.assertTrue(self.fromPreference("unknown").isDefault)
+
+        # A fast LAN isn't worth compressing for
+        self.assertEqual(self.fromPreference("auto", 1e9).compression, zipfile.ZIP_STORED)
+        self.assertEqual(self.fromPreference("unknown", 1e9).compression, zipfile.ZIP_STORED)
+
+        # A very slow upload takes the best compression
+        compression = self.fromPreference("auto", 10e3)
+        if connector_module.PackageCompression.LevelsSupported:
+            self.assertEqual(compression.level, 9)
+        else:
+            self.assertTrue(compression.isDefault)
+
+    def testZipArguments(self):
+        data = b"<vertex x=\"1.0\" y=\"2.0\" z=\"3.0\" />" * 10000
+        for mode in ("default", "store", "1", "9"):
+            compression = self.fromPreference(mode)
+            stream = io.BytesIO()
+            with zipfile.ZipFile(stream, 'w') as threemf_file:
+                threemf_file.writestr("3D/3dmodel.model", data, **compression.zipArguments())
+
+            with zipfile.ZipFile(stream, 'r') as threemf_file:
+                self.assertEqual(threemf_file.getinfo("3D/3dmodel.model").compress_type, compression.compression)
+                self.assertEqual(threemf_file.read("3D/3dmodel.model"), data)
+
+if __name__ == "__main__":
+    unittest.main()
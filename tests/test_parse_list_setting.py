@@ -0,0 +1,114 @@
+#   test_parse_list_setting.py
+#   Teton Simulation
+
+#
+#  Compares utils.parseListSetting, which parses list settings like skin_angles
+#  without eval(), with ast.literal_eval
+#
+
+import ast
+import random
+import unittest
+
+from plugin_loader import loadPluginModule
+
+utils = loadPluginModule("utils")
+
+# Values of the list settings as Cura writes them
+CuraValues = (
+    "[]",
+    "[ ]",
+    "[45]",
+    "[45,135]",
+    "[45, 135]",
+    "[0, 45, 90, 135]",
+    "[ 0.5,-45 ]",
+    "[-45, 45.0]",
+    "[22.5, 112.5, 1e1]",
+)
+
+RejectedValues = (
+    "",
+    "45",
+    "45, 135",
+    "[45",
+    "45]",
+    "[,]",
+    "[45,,135]",
+    "[,45]",
+    "[45 135]",
+    "[0045]",
+    "[1+2]",
+    "[1_000]",
+    "['45']",
+    "[[45]]",
+    "[True]",
+    "[None]",
+    "[nan]",
+    "[0x10]",
+    "[__import__('os')]",
+)
+
+class ParseListSettingTest(unittest.TestCase):
+    def assertSameAsLiteralEval(self, value):
+        expected = tuple(ast.literal_eval(value))
+        parsed = utils.parseListSetting(value)
+        self.assertEqual(parsed, expected, value)
+        self.assertEqual([type(item) for item in parsed], [type(item) for item in expected], value)
+
+    def testCuraValues(self):
+        for value in CuraValues:
+            self.assertSameAsLiteralEval(value)
+
+    def testNonStringValues(self):
+        self.assertEqual(utils.parseListSetting([45, 135]), (45, 135))
+        self.assertEqual(utils.parseListSetting(()), ())
+
+    def testRejectedValues(self):
+        for value in RejectedValues:
+            with self.assertRaises(ValueError, msg=value):
+                utils.parseListSetting(value)
+
+    def testRandomLists(self):
+        rng = random.Random(20)
+
+        for _ in range(5000):
+            items = [self._randomNumber(rng) for _ in range(rng.randint(0, 6))]
+            separators = [self._randomSpace(rng) + "," + self._randomSpace(rng) for _ in items]
+            value = "[" + self._randomSpace(rng) + "".join(item + separator for item, separator in zip(items, separators))
+            if items and rng.random() < 0.8:
+                # Mostly without trailing comma
+                value = value[:-len(separators[-1])]
+            value += self._randomSpace(rng) + "]"
+
+            self.assertSameAsLiteralEval(value)
+
+    def testRandomGarbage(self):
+        rng = random.Random(21)
+        alphabet = "[]0123456789.,+-eE _x'()"
+
+        for _ in range(20000):
+            value = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            try:
+                parsed = utils.parseListSetting(value)
+            except ValueError:
+                continue
+            # Whatever is accepted must mean the same as in Python
+            self.assertEqual(parsed, tuple(ast.literal_eval(value)), value)
+
+    def _randomNumber(self, rng):
+        sign = rng.choice(("", "", "-", "+"))
+        kind = rng.randrange(4)
+        if kind == 0:
+            return sign + str(rng.randint(0, 360))
+        if kind == 1:
+            return sign + "{:.{}f}".format(rng.uniform(0, 360), rng.randint(0, 4))
+        if kind == 2:
+            return sign + rng.choice(("", "0")) + "." + str(rng.randint(0, 99))
+        return sign + "{}{}{}".format(rng.randint(1, 9), rng.choice(("e", "E", "e-", "e+")), rng.randint(0, 3))
+
+    def _randomSpace(self, rng):
+        return rng.choice(("", "", " ", "  ", "\t"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+#   test_planar_regions.py
+#   Teton Simulation
+
+#
+#  Checks the planar regions of SmartSlicePlanarRegions.fromArrays on flat and
+#  curved meshes, and that they don't depend on where the mesh is placed
+#
+
+import math
+import unittest
+
+import numpy
+
+from plugin_loader import loadPluginModule
+
+planar_regions_module = loadPluginModule("select_tool.SmartSlicePlanarRegions")
+
+# #  Returns the vertex and index buffers of a closed cylinder around the y axis, its
+#    side made of 'segments' quads and its caps of triangle fans
+def cylinderMesh(segments : int, radius : float = 20., height : float = 10.):
+    angles = numpy.linspace(0., 2. * math.pi, segments, endpoint=False)
+    ring = numpy.stack((radius * numpy.cos(angles), numpy.zeros(segments), radius * numpy.sin(angles)), axis=1)
+    vertices = numpy.concatenate((ring, ring + [0., height, 0.], [[0., 0., 0.], [0., height, 0.]]))
+
+    i = numpy.arange(segments)
+    j = (i + 1) % segments
+    bottom_center = 2 * segments
+    top_center = bottom_center + 1
+    indices = numpy.concatenate((numpy.stack((i, i + segments, j + segments), axis=1),
+                                 numpy.stack((i, j + segments, j), axis=1),
+                                 numpy.stack((numpy.full(segments, bottom_center), i, j), axis=1),
+                                 numpy.stack((numpy.full(segments, top_center), j + segments, i + segments), axis=1)))
+
+    return vertices, indices
+
+# #  Returns the vertex and index buffers of a flat 'n' x 'n' grid in the plane y = 0
+def gridMesh(n : int, size : float = 100.):
+    steps = numpy.linspace(0., size, n + 1)
+    x, z = numpy.meshgrid(steps, steps)
+    vertices = numpy.stack((x.ravel(), numpy.zeros(x.size), z.ravel()), axis=1)
+
+    corners = (numpy.arange(n)[None, :] + (n + 1) * numpy.arange(n)[:, None]).ravel()
+    indices = numpy.concatenate((numpy.stack((corners, corners + n + 1, corners + n + 2), axis=1),
+                                 numpy.stack((corners, corners + n + 2, corners + 1), axis=1)))
+
+    return vertices, indices
+
+class PlanarRegionsTest(unittest.TestCase):
+    def fromArrays(self, vertices, indices):
+        return planar_regions_module.SmartSlicePlanarRegions.fromArrays(vertices, indices,
+                                                                       angle_tolerance=0.5, distance_tolerance=0.01)
+
+    def assertRegionsPlanar(self, vertices, indices, planar_regions):
+        corners = vertices[indices]
+        for region in range(planar_regions.regionCount):
+            triangles = planar_regions.trianglesOf(region)
+            seed = corners[triangles[0]]
+            normal = planar_regions.region_normals[region]
+            normals = numpy.cross(corners[triangles, 1] - corners[triangles, 0], corners[triangles, 2] - corners[triangles, 0])
+            normals /= numpy.linalg.norm(normals, axis=1)[:, None]
+            self.assertTrue(numpy.all(normals @ normal >= math.cos(math.radians(0.5)) - 1e-12), region)
+            self.assertLessEqual(numpy.abs((corners[triangles] - seed[0]) @ normal).max(), 0.01 + 1e-9, region)
+
+    def testFlatGrid(self):
+        vertices, indices = gridMesh(50)
+        planar_regions = self.fromArrays(vertices, indices)
+
+        self.assertEqual(planar_regions.regionCount, 1)
+        self.assertEqual(len(planar_regions.faceTriangles(1234)), len(indices))
+        self.assertAlmostEqual(planar_regions.region_areas[0], 100. * 100.)
+
+    def testCylinder(self):
+        vertices, indices = cylinderMesh(1000)
+        planar_regions = self.fromArrays(vertices, indices)
+
+        # Neighbouring segments are 0.36 degrees apart, so a region spans only a few
+        # of them, instead of creeping around the whole side
+        side = numpy.arange(2000)
+        side_regions = numpy.unique(planar_regions.triangle_regions[side])
+        self.assertGreater(len(side_regions), 300)
+        self.assertLessEqual(max(len(planar_regions.trianglesOf(region)) for region in side_regions), 6)
+
+        # Each cap is one face
+        self.assertEqual(len(planar_regions.faceTriangles(2000)), 1000)
+        self.assertEqual(len(planar_regions.faceTriangles(3000)), 1000)
+
+        self.assertRegionsPlanar(vertices, indices, planar_regions)
+
+    def testTranslated(self):
+        for vertices, indices in (cylinderMesh(1000), gridMesh(50)):
+            planar_regions = self.fromArrays(vertices, indices)
+            for offset in ((5., 0., 3.), (-120., 40., 75.5)):
+                translated = self.fromArrays(vertices + offset, indices)
+                numpy.testing.assert_array_equal(translated.triangle_regions, planar_regions.triangle_regions)
+
+    def testTiltedPlate(self):
+        # Both sides of a slightly bent plate are separate faces
+        vertices, indices = gridMesh(10)
+        vertices[:, 1] = numpy.where(vertices[:, 0] > 50., (vertices[:, 0] - 50.) * math.tan(math.radians(2.)), 0.)
+        planar_regions = self.fromArrays(vertices, indices)
+
+        self.assertEqual(planar_regions.regionCount, 2)
+        self.assertRegionsPlanar(vertices, indices, planar_regions)
+
+    def testDegenerateTriangles(self):
+        vertices, indices = gridMesh(4)
+        indices = numpy.concatenate((indices, [[0, 0, 1], [2, 2, 2]]))
+        planar_regions = self.fromArrays(vertices, indices)
+
+        self.assertEqual(planar_regions.regionCount, 3)
+        self.assertEqual(list(planar_regions.faceTriangles(len(indices) - 1)), [len(indices) - 1])
+
+if __name__ == "__main__":
+    unittest.main()
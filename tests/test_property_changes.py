@@ -0,0 +1,73 @@
+#   test_property_changes.py
+#   Teton Simulation
+
+#
+#  Tests that a batch of Global/Extruder property changes keeps the value of each
+#  key from the stack it changed on, and that the debounce interval follows its
+#  preference
+#
+
+import unittest
+from unittest import mock
+
+from plugin_loader import loadPluginModule
+
+try:
+    handler_module = loadPluginModule("SmartSlicePropertyHandler")
+except ImportError:
+    handler_module = None
+
+@unittest.skipIf(handler_module is None, "Cura isn't available")
+class PropertyChangesTest(unittest.TestCase):
+    def setUp(self):
+        self.preferences = {"smartslice/property_change_debounce": 0}
+
+        self.handler = handler_module.SmartSlicePropertyHandler.__new__(handler_module.SmartSlicePropertyHandler)
+        self.handler.connector = mock.Mock()
+        self.handler.connector.property_change_debounce_preference = "smartslice/property_change_debounce"
+        self.handler.connector.app_preferences.getValue.side_effect = self.preferences.get
+        self.handler._propertyChangeTimer = mock.Mock()
+
+        self.handler._globalStack = self._stack({"layer_height": 0.2})
+        self.handler._activeExtruder = self._stack({"layer_height": 0.1, "line_width": 0.4})
+        self.handler._global_cache = {"layer_height": 0.1}
+        self.handler._extruder_cache = {"line_width": 0.35}
+        self.handler._pendingGlobalKeys = ["layer_height"]
+        self.handler._pendingExtruderKeys = ["line_width"]
+        self.handler._propertiesChanged = []
+        self.handler._changedValues = []
+        self.handler._addProperties = True
+
+    def _stack(self, values):
+        stack = mock.Mock()
+        stack.getProperty.side_effect = lambda key, property_name: values[key]
+        return stack
+
+    def testChangedValuesDuringValidation(self):
+        self.handler.connector.status = handler_module.SmartSliceCloudStatus.Optimized
+
+        self.handler._processPropertyChanges()
+
+        self.assertEqual(self.handler._propertiesChanged, [handler_module.SmartSliceProperty.GlobalProperty,
+                                                           handler_module.SmartSliceProperty.ExtruderProperty])
+        self.assertEqual(self.handler._changedValues, [0.2, 0.4])
+        self.handler.connector.confirmPendingChanges.assert_called_once()
+
+    def testCacheUpdated(self):
+        self.handler.connector.status = handler_module.SmartSliceCloudStatus.ReadyToVerify
+
+        self.handler._processPropertyChanges()
+
+        self.assertEqual(self.handler._global_cache, {"layer_height": 0.2})
+        self.assertEqual(self.handler._extruder_cache, {"line_width": 0.4})
+        self.handler.connector.prepareValidation.assert_called_once()
+
+    def testDebounceFollowsPreference(self):
+        self.preferences["smartslice/property_change_debounce"] = "250"
+
+        self.handler.updatePropertyChangeDebounce()
+
+        self.handler._propertyChangeTimer.setInterval.assert_called_once_with(250)
+
+if __name__ == "__main__":
+    unittest.main()
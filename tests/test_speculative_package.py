@@ -0,0 +1,102 @@
+#   test_speculative_package.py
+#   Teton Simulation
+
+#
+#  Tests that the speculatively created package is only thrown away when the
+#  mesh or the placement of the part changes
+#
+
+import unittest
+from unittest import mock
+
+import numpy
+
+from plugin_loader import loadPluginModule
+
+try:
+    connector_module = loadPluginModule("SmartSliceCloudConnector")
+except ImportError:
+    connector_module = None
+
+# #  Stands in for cura.Scene.CuraSceneNode
+class FakeSceneNode(mock.Mock):
+    pass
+
+@unittest.skipIf(connector_module is None, "Cura isn't available")
+class SpeculativePackageTest(unittest.TestCase):
+    def setUp(self):
+        scene_node = mock.patch.object(connector_module, "CuraSceneNode", FakeSceneNode)
+        self.addCleanup(scene_node.stop)
+        scene_node.start()
+
+        self.connector = connector_module.SmartSliceCloudConnector.__new__(connector_module.SmartSliceCloudConnector)
+        self.connector._proxy = mock.Mock()
+        self.connector._proxy.sliceStatusEnum = connector_module.SmartSliceCloudStatus.ReadyToVerify
+        self.connector._requestSpeculativePackaging = mock.Mock()
+
+        self.node = self._node()
+        self.connector._speculative_job = None
+        self.connector._speculative_package = ("mesh-digest", b"3MF")
+        self.connector._speculative_placements = [self.connector._nodePlacement(self.node)]
+
+        application = mock.patch.object(connector_module, "Application")
+        self.addCleanup(application.stop)
+        self.global_stack = application.start().getInstance().getGlobalContainerStack()
+        self.machine = {"machine_width": 200, "machine_depth": 200}
+        self.global_stack.getProperty.side_effect = lambda key, property_name: self.machine[key]
+
+    def _node(self):
+        node = FakeSceneNode()
+        node.callDecoration.side_effect = lambda name: name == "isSliceable"
+        node.getMeshData.return_value = mock.Mock()
+        node.getLocalTransformation.return_value.getData.return_value = numpy.identity(4)
+        return node
+
+    def assertKept(self):
+        self.assertEqual(self.connector._speculative_package, ("mesh-digest", b"3MF"))
+        self.connector._requestSpeculativePackaging.assert_not_called()
+
+    def assertDropped(self):
+        self.assertIsNone(self.connector._speculative_package)
+        self.connector._requestSpeculativePackaging.assert_called_once()
+
+    def testCameraAndHandles(self):
+        # Neither the camera nor the select handle are sliceable scene nodes
+        self.connector._onSceneChangedSpeculative(mock.Mock())
+        self.assertKept()
+
+    def testUnchangedPart(self):
+        # E.g. selecting the part or one of its faces
+        self.connector._onSceneChangedSpeculative(self.node)
+        self.assertKept()
+
+    def testMovedPart(self):
+        moved = numpy.identity(4)
+        moved[0, 3] = 10.
+        self.node.getLocalTransformation.return_value.getData.return_value = moved
+
+        self.connector._onSceneChangedSpeculative(self.node)
+        self.assertDropped()
+
+    def testNewMesh(self):
+        self.node.getMeshData.return_value = mock.Mock()
+
+        self.connector._onSceneChangedSpeculative(self.node)
+        self.assertDropped()
+
+    def testOtherPart(self):
+        self.connector._onSceneChangedSpeculative(self._node())
+        self.assertDropped()
+
+    def testDigestCoversBuildPlate(self):
+        with mock.patch.object(connector_module, "meshDataHash", return_value="mesh"):
+            self.node.callDecoration.side_effect = lambda name: None
+            digest = self.connector.meshDigest([self.node])
+            self.assertEqual(self.connector.meshDigest([self.node]), digest)
+
+            # The 3MFWriter places the part relative to the corner of the build plate
+            self.machine["machine_width"] = 300
+            self.assertNotEqual(self.connector.meshDigest([self.node]), digest)
+
+if __name__ == "__main__":
+    unittest.main()
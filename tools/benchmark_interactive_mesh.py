@@ -0,0 +1,96 @@
+#   benchmark_interactive_mesh.py
+#   Teton Simulation
+
+#
+#  Compares building the interactive mesh (pywim.geom.tri.Mesh) from the whole
+#  vertex and index buffers (utils.makeInteractiveMeshFromArrays) with the
+#  previous element by element build, for meshes of 10k, 100k and 1M triangles.
+#  Both must give the same triangles.
+#
+#  Needs Cura's Python environment, i.e. Uranium and pywim.
+#
+#  Usage: python benchmark_interactive_mesh.py [--triangles 10000 100000 1000000] [--repeat 3]
+#
+
+import os
+import sys
+import time
+import argparse
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SmartSlicePlugin"))
+
+import pywim
+
+from utils import makeInteractiveMeshFromArrays
+
+# #  The previous build, indexing the numpy buffers element by element
+def makeInteractiveMeshPerElement(verts, faces):
+    int_mesh = pywim.geom.tri.Mesh()
+
+    for i in range(len(verts)):
+        int_mesh.add_vertex(i, verts[i][0], verts[i][1], verts[i][2])
+
+    for i in range(len(faces)):
+        v1 = int_mesh.vertices[faces[i][0]]
+        v2 = int_mesh.vertices[faces[i][1]]
+        v3 = int_mesh.vertices[faces[i][2]]
+
+        int_mesh.add_triangle(i, v1, v2, v3)
+
+    int_mesh.analyze_mesh(remove_degenerate_triangles=False)
+
+    return int_mesh
+
+# #  Returns the vertex and index buffers of a wavy grid with about 'triangle_count' triangles,
+#    in the layout of Cura's MeshData
+def gridMesh(triangle_count : int):
+    n = max(int((triangle_count / 2) ** 0.5), 1)
+
+    x, y = numpy.meshgrid(numpy.arange(n + 1, dtype=numpy.float32), numpy.arange(n + 1, dtype=numpy.float32))
+    z = numpy.sin(x * 0.1) * numpy.cos(y * 0.1)
+    vertices = numpy.stack((x.ravel(), z.ravel(), y.ravel()), axis=1)
+
+    corners = (numpy.arange(n)[None, :] + (n + 1) * numpy.arange(n)[:, None]).ravel()
+    lower = numpy.stack((corners, corners + 1, corners + n + 2), axis=1)
+    upper = numpy.stack((corners, corners + n + 2, corners + n + 1), axis=1)
+    indices = numpy.concatenate((lower, upper)).astype(numpy.int32)
+
+    return vertices, indices
+
+def triangleIds(int_mesh):
+    return [getattr(triangle, "id", triangle) for triangle in int_mesh.triangles]
+
+def timed(function, repeat : int):
+    best = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = function()
+        duration = time.perf_counter() - start_time
+        best = duration if best is None else min(best, duration)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Times building the interactive mesh")
+    parser.add_argument("--triangles", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3, help="Best of this many runs")
+    args = parser.parse_args()
+
+    print("{:>10} {:>14} {:>14} {:>8}".format("triangles", "per element", "from arrays", "speedup"))
+    for triangle_count in args.triangles:
+        vertices, indices = gridMesh(triangle_count)
+
+        before, expected = timed(lambda: makeInteractiveMeshPerElement(vertices, indices), args.repeat)
+        after, result = timed(lambda: makeInteractiveMeshFromArrays(vertices, indices), args.repeat)
+
+        if triangleIds(result) != triangleIds(expected):
+            print("Meshes of {} triangles differ".format(len(indices)))
+            return 1
+
+        print("{:>10} {:>12.3f} s {:>12.3f} s {:>7.1f}x".format(len(indices), before, after, before / after))
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
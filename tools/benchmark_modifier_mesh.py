@@ -0,0 +1,181 @@
+#   benchmark_modifier_mesh.py
+#   Teton Simulation
+
+#
+#  Times taking the modifier meshes of a synthetic result with 1M triangles into
+#  the scene, in the steps SmartSliceCloudJob does:
+#    * converting the modifier mesh into arrays (utils.modifierMeshArrays),
+#      compared with the previous list per vertex and triangle, for results
+#      decoded from JSON and from a binary result archive
+#    * building the MeshData and CuraSceneNode, on a worker thread
+#    * inserting the nodes into the scene, on the main thread, like
+#      SmartSliceCloudJob._insertModifierMeshNodes, counting the sceneChanged emits
+#
+#  Needs Cura's Python environment, i.e. Uranium and Cura.
+#
+#  Usage: python benchmark_modifier_mesh.py [--triangles 1000000] [--modifiers 1] [--repeat 3]
+#
+
+import os
+import sys
+import time
+import types
+import argparse
+import threading
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SmartSlicePlugin"))
+
+from PyQt5.QtCore import QCoreApplication
+
+from UM.Math.Vector import Vector
+from UM.Mesh.MeshBuilder import MeshBuilder
+from UM.Operations.AddSceneNodeOperation import AddSceneNodeOperation
+from UM.Operations.GroupedOperation import GroupedOperation
+from UM.Scene.Scene import Scene
+from UM.Scene.SceneNode import SceneNode
+from UM.Signal import postponeSignals, CompressTechnique
+
+from cura.Operations.SetParentOperation import SetParentOperation
+from cura.Scene.CuraSceneNode import CuraSceneNode
+
+from utils import modifierMeshArrays
+
+# #  Returns the vertex and index buffers of a wavy grid with about 'triangle_count' triangles
+def gridMesh(triangle_count : int):
+    n = max(int((triangle_count / 2) ** 0.5), 1)
+
+    x, y = numpy.meshgrid(numpy.arange(n + 1, dtype=numpy.float32), numpy.arange(n + 1, dtype=numpy.float32))
+    z = numpy.sin(x * 0.1) * numpy.cos(y * 0.1)
+    vertices = numpy.stack((x.ravel(), z.ravel(), y.ravel()), axis=1)
+
+    corners = (numpy.arange(n)[None, :] + (n + 1) * numpy.arange(n)[:, None]).ravel()
+    lower = numpy.stack((corners, corners + 1, corners + n + 2), axis=1)
+    upper = numpy.stack((corners, corners + n + 2, corners + n + 1), axis=1)
+    indices = numpy.concatenate((lower, upper)).astype(numpy.int32)
+
+    return vertices, indices
+
+# #  Returns a modifier mesh as decoded from a JSON result, with an object per vertex and triangle
+def decodedModifierMesh(vertices, indices):
+    return types.SimpleNamespace(
+        vertices=[types.SimpleNamespace(x=x, y=y, z=z) for x, y, z in vertices.tolist()],
+        triangles=[types.SimpleNamespace(v1=v1, v2=v2, v3=v3) for v1, v2, v3 in indices.tolist()]
+    )
+
+# #  Returns a modifier mesh as decoded from a binary result archive
+def archivedModifierMesh(vertices, indices):
+    return types.SimpleNamespace(vertex_array=vertices, triangle_array=indices)
+
+# #  The previous conversion, building a list per vertex and triangle
+def modifierMeshLists(modifier_mesh):
+    modifier_mesh_vertices = [[v.x, v.y, v.z] for v in modifier_mesh.vertices]
+    modifier_mesh_indices = [[triangle.v1, triangle.v2, triangle.v3] for triangle in modifier_mesh.triangles]
+    return numpy.asarray(modifier_mesh_vertices, dtype=numpy.float32), numpy.asarray(modifier_mesh_indices, dtype=numpy.int32)
+
+# #  The mesh part of SmartSliceCloudJob._buildModifierMeshNode. The decorators and
+#    per-object settings need the running application and are left out.
+def buildModifierMeshNode(modifier_mesh):
+    modifier_mesh_node = CuraSceneNode()
+    modifier_mesh_node.setName("SmartSliceMeshModifier")
+    modifier_mesh_node.setSelectable(True)
+    modifier_mesh_node.setCalculateBoundingBox(True)
+
+    modifier_mesh_vertices, modifier_mesh_indices = modifierMeshArrays(modifier_mesh)
+
+    modifier_mesh_data = MeshBuilder()
+    modifier_mesh_data.setVertices(modifier_mesh_vertices)
+    modifier_mesh_data.setIndices(modifier_mesh_indices)
+    modifier_mesh_data.calculateNormals()
+
+    modifier_mesh_node.setMeshData(modifier_mesh_data.build())
+    modifier_mesh_node.calculateBoundingBoxMesh()
+
+    return modifier_mesh_node
+
+# #  Builds the nodes of 'modifier_meshes' on a worker thread, like SmartSliceCloudJob.prepareResult
+def buildOnWorker(modifier_meshes):
+    nodes = []
+    worker = threading.Thread(target=lambda: nodes.extend(buildModifierMeshNode(modifier_mesh) for modifier_mesh in modifier_meshes))
+    worker.start()
+    worker.join()
+    return nodes
+
+# #  Same as SmartSliceCloudJob._insertModifierMeshNodes. The grouped operation is
+#    redone directly, pushing it needs the operation stack of the application.
+def insertModifierMeshNodes(scene, modifier_mesh_nodes, parent_node):
+    with postponeSignals(scene.sceneChanged, compress=CompressTechnique.CompressSingle):
+        op = GroupedOperation()
+        for modifier_mesh_node in modifier_mesh_nodes:
+            op.addOperation(AddSceneNodeOperation(modifier_mesh_node, scene.getRoot()))
+            op.addOperation(SetParentOperation(modifier_mesh_node, parent_node))
+        op.redo()
+
+        parent_node_position = parent_node.getWorldPosition()
+        for modifier_mesh_node in modifier_mesh_nodes:
+            modifier_mesh_node.setPosition(parent_node_position, SceneNode.TransformSpace.World)
+
+def timed(function, repeat : int):
+    best = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = function()
+        duration = time.perf_counter() - start_time
+        best = duration if best is None else min(best, duration)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Times taking modifier meshes into the scene")
+    parser.add_argument("--triangles", type=int, default=1000000, help="Triangles of all modifier meshes together")
+    parser.add_argument("--modifiers", type=int, default=1, help="Number of modifier meshes")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of this many runs")
+    args = parser.parse_args()
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+
+    vertices, indices = gridMesh(args.triangles // args.modifiers)
+    decoded = [decodedModifierMesh(vertices, indices) for _ in range(args.modifiers)]
+    archived = [archivedModifierMesh(vertices, indices) for _ in range(args.modifiers)]
+    print("{} modifier meshes with {} vertices and {} triangles each".format(args.modifiers, len(vertices), len(indices)))
+
+    lists, expected = timed(lambda: [modifierMeshLists(modifier_mesh) for modifier_mesh in decoded], args.repeat)
+    arrays, result = timed(lambda: [modifierMeshArrays(modifier_mesh) for modifier_mesh in decoded], args.repeat)
+    for (expected_vertices, expected_indices), (result_vertices, result_indices) in zip(expected, result):
+        if not numpy.array_equal(expected_vertices, result_vertices) or not numpy.array_equal(expected_indices, result_indices):
+            print("The converted arrays differ")
+            return 1
+    archive, _ = timed(lambda: [modifierMeshArrays(modifier_mesh) for modifier_mesh in archived], args.repeat)
+
+    print("Conversion from JSON, lists:  {:8.3f} s".format(lists))
+    print("Conversion from JSON, arrays: {:8.3f} s ({:.1f}x)".format(arrays, lists / arrays))
+    print("Conversion from archive:      {:8.3f} s".format(archive))
+
+    build, _ = timed(lambda: buildOnWorker(archived), args.repeat)
+    print("Build on worker thread:       {:8.3f} s".format(build))
+
+    insertion = None
+    for _ in range(args.repeat):
+        scene = Scene()
+        parent_node = CuraSceneNode(scene.getRoot())
+        parent_node.setPosition(Vector(10, 0, 20))
+        nodes = buildOnWorker(archived)
+
+        emits = []
+        scene.sceneChanged.connect(emits.append)
+
+        start_time = time.perf_counter()
+        insertModifierMeshNodes(scene, nodes, parent_node)
+        duration = time.perf_counter() - start_time
+        insertion = duration if insertion is None else min(insertion, duration)
+
+        if len(emits) != 1:
+            print("Inserting emitted sceneChanged {} times".format(len(emits)))
+            return 1
+
+    print("Insertion on main thread:     {:8.3f} s (1 sceneChanged)".format(insertion))
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#   benchmark_planar_regions.py
+#   Teton Simulation
+
+#
+#  Compares selecting the planar face of a clicked triangle through the
+#  precomputed planar regions (SmartSlicePlanarRegions) with the flood fill of
+#  the interactive mesh (pywim.geom.tri.Mesh.select_planar_face), on a plate
+#  whose large flat base consists of many triangles. Both must select the same
+#  triangles.
+#
+#  Needs Cura's Python environment, i.e. Uranium and pywim.
+#
+#  Usage: python benchmark_planar_regions.py [--grid 100 300] [--clicks 10]
+#
+
+import os
+import sys
+import time
+import argparse
+
+import numpy
+
+plugin_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SmartSlicePlugin")
+sys.path.insert(0, plugin_directory)
+sys.path.insert(0, os.path.join(plugin_directory, "select_tool"))
+
+from utils import makeInteractiveMeshFromArrays
+from SmartSlicePlanarRegions import SmartSlicePlanarRegions
+
+# #  Returns the vertex and index buffers of a plate with 'n' x 'n' quads on its base
+#    and top, in the layout of Cura's MeshData (y is up), and the id of a base triangle
+def plateMesh(n : int, size : float = 200., height : float = 5.):
+    steps = numpy.linspace(0., size, n + 1, dtype=numpy.float32)
+    x, z = numpy.meshgrid(steps, steps)
+    layer = numpy.stack((x.ravel(), numpy.zeros(x.size, dtype=numpy.float32), z.ravel()), axis=1)
+    top_layer = layer + numpy.array([0., height, 0.], dtype=numpy.float32)
+    vertices = numpy.concatenate((layer, top_layer))
+    top = len(layer)
+
+    corners = (numpy.arange(n)[None, :] + (n + 1) * numpy.arange(n)[:, None]).ravel()
+    base = numpy.concatenate((numpy.stack((corners, corners + n + 2, corners + 1), axis=1),
+                              numpy.stack((corners, corners + n + 1, corners + n + 2), axis=1)))
+    cover = base[:, ::-1] + top
+
+    # Walking around the border of the grid
+    border = numpy.concatenate((numpy.arange(n),
+                                n + (n + 1) * numpy.arange(n),
+                                (n + 1) * (n + 1) - 1 - numpy.arange(n),
+                                (n + 1) * (n - numpy.arange(n))))
+    following = numpy.roll(border, -1)
+    sides = numpy.concatenate((numpy.stack((border, following, following + top), axis=1),
+                               numpy.stack((border, following + top, border + top), axis=1)))
+
+    indices = numpy.concatenate((base, cover, sides)).astype(numpy.int32)
+
+    return vertices, indices, 0
+
+def triangleIds(triangles):
+    return sorted(getattr(triangle, "id", triangle) for triangle in triangles)
+
+def main():
+    parser = argparse.ArgumentParser(description="Times selecting a planar face")
+    parser.add_argument("--grid", type=int, nargs="+", default=[100, 300], help="Quads along each side of the base")
+    parser.add_argument("--clicks", type=int, default=10, help="Selections of the base per mesh")
+    args = parser.parse_args()
+
+    print("{:>10} {:>12} {:>14} {:>14} {:>14} {:>14}".format("triangles", "base", "mesh build",
+                                                          "flood fill", "regions build", "region lookup"))
+    for n in args.grid:
+        vertices, indices, face_id = plateMesh(n)
+
+        start_time = time.perf_counter()
+        int_mesh = makeInteractiveMeshFromArrays(vertices, indices)
+        mesh_build = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for _ in range(args.clicks):
+            flood_fill = list(int_mesh.select_planar_face(face_id))
+        flood_fill_time = (time.perf_counter() - start_time) / args.clicks
+
+        start_time = time.perf_counter()
+        planar_regions = SmartSlicePlanarRegions.fromArrays(vertices, indices)
+        regions_build = time.perf_counter() - start_time
+
+        # Like SmartSliceSelectTool.selectPlanarFace, including the interactive mesh of the face
+        start_time = time.perf_counter()
+        for _ in range(args.clicks):
+            triangle_ids = planar_regions.faceTriangles(face_id)
+            face_mesh = makeInteractiveMeshFromArrays(vertices, indices, triangle_ids=triangle_ids)
+        lookup_time = (time.perf_counter() - start_time) / args.clicks
+
+        if triangleIds(flood_fill) != triangleIds(face_mesh.triangles):
+            print("The selections of the base of the {} x {} plate differ".format(n, n))
+            return 1
+
+        print("{:>10} {:>12} {:>12.3f} s {:>12.3f} s {:>12.3f} s {:>12.4f} s".format(len(indices), len(triangle_ids),
+                                                                                    mesh_build, flood_fill_time,
+                                                                                    regions_build, lookup_time))
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
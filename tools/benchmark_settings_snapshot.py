@@ -0,0 +1,193 @@
+#   benchmark_settings_snapshot.py
+#   Teton Simulation
+
+#
+#  Compares reading the settings of all stacks for a job through the
+#  SmartSliceSettingsSnapshot with the previous approach, which walked all
+#  settings of all stacks six times per job (once for the global settings
+#  message, four times for the start/end g-code tokens and once for the
+#  extruder messages) and stringified them for the messages.
+#
+#  The stacks are synthetic, with a configurable cost of a single getProperty
+#  call, since the cost of resolving a setting through Cura's container stacks
+#  varies with the profiles.
+#
+#  Needs Cura's Python environment, i.e. Uranium and Cura.
+#
+#  Usage: python benchmark_settings_snapshot.py [--settings 700] [--extruders 2] [--property-cost 10] [--jobs 5]
+#
+
+import os
+import sys
+import time
+import random
+import argparse
+import types
+import unittest.mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SmartSlicePlugin"))
+
+from UM.Settings.SettingRelation import RelationType
+
+import SmartSliceSettingsSnapshot
+
+# #  Walks of all settings of all stacks per job before the snapshot
+WalksPerJob = 6
+
+class FakeSignal():
+    def __init__(self):
+        self._receivers = []
+
+    def connect(self, receiver):
+        self._receivers.append(receiver)
+
+    def disconnect(self, receiver):
+        self._receivers.remove(receiver)
+
+    def emit(self, *args):
+        for receiver in list(self._receivers):
+            receiver(*args)
+
+'''
+  class FakeStack
+
+    Offers the parts of a ContainerStack the snapshot uses. Every getProperty
+    call takes 'property_cost' seconds, like resolving the setting through the
+    containers of the stack would.
+'''
+class FakeStack():
+    def __init__(self, values : dict, definitions : dict, property_cost : float):
+        self.propertyChanged = FakeSignal()
+        self.containersChanged = FakeSignal()
+
+        self._values = values
+        self._definitions = definitions
+        self._property_cost = property_cost
+
+    def getAllKeys(self):
+        return set(self._values)
+
+    def hasProperty(self, key, property_name):
+        return key in self._values
+
+    def getProperty(self, key, property_name):
+        end_time = time.perf_counter() + self._property_cost
+        while time.perf_counter() < end_time:
+            pass
+        return self._values.get(key)
+
+    def getSettingDefinition(self, key):
+        return self._definitions.get(key)
+
+    def setProperty(self, key, value):
+        self._values[key] = value
+        self.propertyChanged.emit(key, "value")
+
+# #  Returns the definitions of 'settings' settings, each with a few settings depending on it
+def settingDefinitions(settings : int, rng):
+    keys = ["setting_{}".format(i) for i in range(settings)]
+
+    definitions = {}
+    for i, key in enumerate(keys):
+        dependent = rng.sample(keys[i + 1:], min(rng.randint(0, 3), len(keys) - i - 1))
+        relations = [types.SimpleNamespace(type=RelationType.RequiredByTarget,
+                                           role="value",
+                                           target=types.SimpleNamespace(key=dependent_key))
+                     for dependent_key in dependent]
+        definitions[key] = types.SimpleNamespace(key=key, relations=relations)
+
+    return definitions
+
+# #  Returns the global stack and the extruder stacks
+def fakeStacks(settings : int, extruders : int, property_cost : float):
+    rng = random.Random(17)
+    definitions = settingDefinitions(settings, rng)
+
+    def values(extruder_nr):
+        result = {}
+        for i, key in enumerate(definitions):
+            kind = i % 4
+            if kind == 0:
+                result[key] = rng.uniform(0., 300.)
+            elif kind == 1:
+                result[key] = rng.randint(0, 100)
+            elif kind == 2:
+                result[key] = rng.choice((True, False))
+            else:
+                result[key] = "[{}, {}]".format(rng.randint(0, 180), rng.randint(0, 180))
+        result["extruder_nr"] = extruder_nr
+        return result
+
+    global_stack = FakeStack(values(0), definitions, property_cost)
+    extruder_stacks = [FakeStack(values(i), definitions, property_cost) for i in range(extruders)]
+
+    return global_stack, extruder_stacks
+
+# #  The previous approach: all settings of all stacks read for every message builder
+def readEveryTime(global_stack, extruder_stacks):
+    for _ in range(WalksPerJob):
+        settings = {"-1": {key: global_stack.getProperty(key, "value") for key in global_stack.getAllKeys()}}
+        for stack in extruder_stacks:
+            settings[str(stack.getProperty("extruder_nr", "value"))] = {
+                key: stack.getProperty(key, "value") for key in stack.getAllKeys()
+            }
+
+    return {extruder_nr: {key: str(value) for key, value in values.items()} for extruder_nr, values in settings.items()}
+
+def timed(function):
+    start_time = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start_time, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Times reading the settings for a job")
+    parser.add_argument("--settings", type=int, default=700, help="Settings per stack")
+    parser.add_argument("--extruders", type=int, default=2)
+    parser.add_argument("--property-cost", type=float, default=10., help="Microseconds per getProperty call")
+    parser.add_argument("--jobs", type=int, default=5, help="Jobs per measurement, averaged")
+    args = parser.parse_args()
+
+    global_stack, extruder_stacks = fakeStacks(args.settings, args.extruders, args.property_cost * 1e-6)
+
+    application = unittest.mock.MagicMock()
+    application.getInstance.return_value.getGlobalContainerStack.return_value = global_stack
+    extruder_manager = unittest.mock.MagicMock()
+    extruder_manager.getInstance.return_value.getActiveExtruderStacks.return_value = extruder_stacks
+
+    with unittest.mock.patch.object(SmartSliceSettingsSnapshot, "Application", application), \
+         unittest.mock.patch.object(SmartSliceSettingsSnapshot, "ExtruderManager", extruder_manager):
+
+        before = sum(timed(lambda: readEveryTime(global_stack, extruder_stacks))[0] for _ in range(args.jobs)) / args.jobs
+        expected = readEveryTime(global_stack, extruder_stacks)
+
+        snapshot = SmartSliceSettingsSnapshot.SmartSliceSettingsSnapshot()
+        first, (values, strings) = timed(snapshot.take)
+        if strings != expected:
+            print("The snapshot differs from the settings read directly")
+            return 1
+
+        unchanged = sum(timed(snapshot.take)[0] for _ in range(args.jobs)) / args.jobs
+
+        changed = 0.
+        for job in range(args.jobs):
+            # A setting with relations, changed on the global stack
+            key = "setting_{}".format(job)
+            global_stack.setProperty(key, float(job))
+            duration, (values, strings) = timed(snapshot.take)
+            changed += duration
+            if strings["-1"][key] != str(float(job)):
+                print("The snapshot misses the change of {}".format(key))
+                return 1
+        changed /= args.jobs
+
+    print("{} settings on {} stacks, {:.0f} us per getProperty".format(args.settings, len(extruder_stacks) + 1,
+                                                                       args.property_cost))
+    print("{:>36} {:>10.4f} s".format("before, per job", before))
+    print("{:>36} {:>10.4f} s".format("snapshot, first job", first))
+    print("{:>36} {:>10.4f} s".format("snapshot, nothing changed", unchanged))
+    print("{:>36} {:>10.4f} s".format("snapshot, one setting changed", changed))
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
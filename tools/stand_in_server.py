@@ -0,0 +1,243 @@
+#   stand_in_server.py
+#   Teton Simulation
+
+#
+#  Local stand-in for the Smart Slice API, e.g. to try the chunked upload
+#  (smartslice/chunked_upload) against unreliable connections, the delta upload
+#  (smartslice/delta_upload) or the async engine (tests/test_async_engine.py).
+#
+#  Usage: python stand_in_server.py [--port 8000] [--drop-every N] [--task-duration S] [--latency S]
+#
+#  With --drop-every N every N-th PATCH request stores only half of its chunk and
+#  then drops the connection without an answer.
+#
+#  Every submitted package becomes a task, which is "queued" for the first fifth
+#  of --task-duration, then "running" and afterwards "finished":
+#    * POST /submit         package as body -> 200, task
+#    * GET  /status/<id>    -> 200, task
+#    * GET  /result/<id>    -> 200, task with a made up "result", 409 if it isn't finished
+#  With --latency all GET and POST requests are answered only after that many seconds.
+#
+
+import os
+import json
+import time
+import uuid
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StandInState():
+    def __init__(self, drop_every : int = 0, directory : str = None, task_duration : float = 2., latency : float = 0.):
+        self.drop_every = drop_every
+        self.directory = directory
+        self.task_duration = task_duration
+        self.latency = latency
+
+        self.lock = threading.Lock()
+        self.uploads = {} # upload id -> [expected length, bytearray]
+        self.blobs = {} # mesh digest -> package
+        self.tasks = {} # task id -> [time of submission, package size]
+        self.status_requests = 0
+        self.patches = 0
+        self.drops = 0
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> StandInState:
+        return self.server.state
+
+    def _reply(self, status, body = None, headers = None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, str(value))
+        self.send_header("Content-Length", str(len(data)))
+        if data:
+            self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        if data and self.command != "HEAD":
+            self.wfile.write(data)
+
+    def _upload(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) < 2 or parts[0] != "uploads":
+            return None, parts
+        with self.state.lock:
+            return self.state.uploads.get(parts[1]), parts
+
+    def _createTask(self, size, task_id = None):
+        task_id = task_id or uuid.uuid4().hex
+        with self.state.lock:
+            self.state.tasks[task_id] = [time.monotonic(), size]
+        return task_id
+
+    def _task(self, task_id):
+        with self.state.lock:
+            task = self.state.tasks.get(task_id)
+        if task is None:
+            return None
+
+        submitted, size = task
+        elapsed = time.monotonic() - submitted
+        if elapsed < 0.2 * self.state.task_duration:
+            status = "queued"
+        elif elapsed < self.state.task_duration:
+            status = "running"
+        else:
+            status = "finished"
+
+        return {"id": task_id,
+                "status": status,
+                "size": size,
+                "eta": max(self.state.task_duration - elapsed, 0.)}
+
+    def _delay(self):
+        if self.state.latency:
+            time.sleep(self.state.latency)
+
+    def do_GET(self):
+        self._delay()
+
+        parts = self.path.strip("/").split("/")
+        task = self._task(parts[1]) if len(parts) == 2 and parts[0] in ("status", "result") else None
+        if task is None:
+            self._reply(404)
+            return
+
+        if parts[0] == "status":
+            with self.state.lock:
+                self.state.status_requests += 1
+            self._reply(200, task)
+            return
+
+        if task["status"] != "finished":
+            self._reply(409, {"error": "Task {} is {}".format(task["id"], task["status"])})
+            return
+
+        task["result"] = {"structural": {"min_safety_factor": 2.5, "max_displacement": 0.1},
+                          "modifier_meshes": []}
+        self._reply(200, task)
+
+    def do_PUT(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] != "blobs":
+            self._reply(404)
+            return
+
+        data = self.rfile.read(int(self.headers["Content-Length"]))
+        with self.state.lock:
+            self.state.blobs[parts[1]] = data
+        print("Stored mesh {} ({} bytes)".format(parts[1], len(data)))
+        self._reply(201)
+
+    def do_POST(self):
+        self._delay()
+
+        if self.path == "/submit":
+            data = self.rfile.read(int(self.headers["Content-Length"]))
+            task_id = self._createTask(len(data))
+            print("Received package {} ({} bytes)".format(task_id, len(data)))
+            self._reply(200, self._task(task_id))
+            return
+
+        if self.path == "/submit-delta":
+            job_json = self.rfile.read(int(self.headers["Content-Length"]))
+            with self.state.lock:
+                known = self.headers["Mesh-Digest"] in self.state.blobs
+            if not known:
+                self._reply(404, {"error": "Unknown mesh"})
+                return
+            task_id = self._createTask(len(job_json))
+            print("Received job {} for mesh {} ({} bytes)".format(task_id, self.headers["Mesh-Digest"], len(job_json)))
+            self._reply(200, {"id": task_id})
+            return
+
+        if self.path == "/uploads":
+            upload_id = uuid.uuid4().hex
+            with self.state.lock:
+                self.state.uploads[upload_id] = [int(self.headers["Upload-Length"]), bytearray()]
+            self._reply(201, {"id": upload_id}, {"Location": "/uploads/{}".format(upload_id)})
+            return
+
+        upload, parts = self._upload()
+        if upload is None or len(parts) != 3 or parts[2] != "submit":
+            self._reply(404)
+            return
+
+        length, data = upload
+        if len(data) != length:
+            self._reply(409, {"error": "Upload incomplete: {} of {} bytes".format(len(data), length)})
+            return
+
+        if self.state.directory:
+            with open(os.path.join(self.state.directory, "{}.3mf".format(parts[1])), "wb") as f:
+                f.write(data)
+
+        self._createTask(length, parts[1])
+        print("Received package {} ({} bytes)".format(parts[1], length))
+        self._reply(200, {"id": parts[1]})
+
+    def do_HEAD(self):
+        upload, _ = self._upload()
+        if upload is None:
+            self._reply(404)
+            return
+        self._reply(200, headers={"Upload-Offset": len(upload[1]), "Upload-Length": upload[0]})
+
+    def do_PATCH(self):
+        upload, _ = self._upload()
+        if upload is None:
+            self._reply(404)
+            return
+
+        size = int(self.headers["Content-Length"])
+        offset = int(self.headers["Upload-Offset"])
+        if offset != len(upload[1]):
+            self.rfile.read(size)
+            self._reply(409, headers={"Upload-Offset": len(upload[1])})
+            return
+
+        with self.state.lock:
+            self.state.patches += 1
+            drop = self.state.drop_every and self.state.patches % self.state.drop_every == 0
+
+        if drop:
+            # Keep what "made it through" and hang up
+            upload[1] += self.rfile.read(size // 2)
+            with self.state.lock:
+                self.state.drops += 1
+            print("Dropping connection at {} bytes".format(len(upload[1])))
+            self.close_connection = True
+            self.connection.close()
+            return
+
+        upload[1] += self.rfile.read(size)
+        self._reply(204, headers={"Upload-Offset": len(upload[1])})
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(port : int = 8000, drop_every : int = 0, directory : str = None,
+          task_duration : float = 2., latency : float = 0.) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("localhost", port), StandInHandler)
+    server.state = StandInState(drop_every, directory, task_duration, latency)
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Smart Slice API")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--drop-every", type=int, default=0, help="Drop the connection on every N-th chunk")
+    parser.add_argument("--directory", help="Save the received packages here")
+    parser.add_argument("--task-duration", type=float, default=2., help="Seconds until a task is finished")
+    parser.add_argument("--latency", type=float, default=0., help="Seconds to wait before answering a request")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.drop_every, args.directory, args.task_duration, args.latency)
+    print("Serving on http://localhost:{}".format(args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass